@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the Food Cost Calculator API.
+
+Measures, in fresh interpreters, how long `import main` takes and how long
+the first request to the home page takes after that, and reports whether
+pandas was loaded by startup.
+
+Usage: python bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs inside a fresh interpreter; prints import ms, first request ms, pandas loaded
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+request_start = time.perf_counter()
+client.get("/", headers={"accept-encoding": "gzip"})
+first_request = time.perf_counter()
+print((imported - start) * 1000, (first_request - request_start) * 1000, "pandas" in sys.modules)
+"""
+
+def run_probe() -> tuple:
+    env = dict(os.environ, FOOD_COST_HISTORY="0")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    import_ms, request_ms, pandas_loaded = out.split()
+    return float(import_ms), float(request_ms), pandas_loaded == "True"
+
+def main(runs: int = 5):
+    print(f"⏱️  Measuring cold start over {runs} runs")
+    imports, requests = [], []
+    pandas_loaded = False
+    for _ in range(runs):
+        import_ms, request_ms, loaded = run_probe()
+        imports.append(import_ms)
+        requests.append(request_ms)
+        pandas_loaded = pandas_loaded or loaded
+    print(f"import main:        median {statistics.median(imports):.0f} ms (min {min(imports):.0f} ms)")
+    print(f"first GET /:        median {statistics.median(requests):.1f} ms (min {min(requests):.1f} ms)")
+    print(f"pandas at startup:  {'loaded' if pandas_loaded else 'deferred'}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
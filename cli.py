@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Command-line entry point for the Food Cost Calculator.
+
+Costs whole directory trees without the API: every subfolder of DIR is one
+brand's set of files (costings, recipes, menu, variants; CSV or Excel),
+and files directly in DIR are shared by every brand folder (e.g. one
+estate-wide product list). Brand folders are processed in parallel worker
+processes and results are written per folder and for the whole estate.
+
+`watch` keeps the results of one folder fresh instead: changed files are
+re-parsed on their own and only the affected results are recalculated and
+written again.
+
+Usage:
+    python cli.py batch DIR [--out OUT] [--format csv,parquet,html] [--workers N]
+    python cli.py watch DIR [--out OUT] [--format csv,html] [--interval S] [--debounce S]
+
+Exit status is 0 when every brand folder was costed, 1 when any failed and
+2 for invalid arguments.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.watcher import INPUT_EXTENSIONS
+
+FORMATS = ["csv", "parquet", "html"]
+
+def _input_files(folder: str, recursive: bool) -> list:
+    """Input files in a folder (and its subfolders when recursive), sorted by path."""
+    if not recursive:
+        names = sorted(name for name in os.listdir(folder) if os.path.isfile(os.path.join(folder, name)))
+        return [os.path.join(folder, name) for name in names if name.lower().endswith(INPUT_EXTENSIONS)]
+    found = []
+    for root, dirs, names in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        found.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(INPUT_EXTENSIONS))
+    return found
+
+def find_brand_folders(root: str, out_dir: str = None) -> tuple:
+    """
+    Brand folders under root and the files shared by all of them.
+
+    Returns:
+        tuple: ({folder name: [file paths]}, [shared file paths])
+    """
+    out_dir = os.path.abspath(out_dir) if out_dir else None
+    folders = {}
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if name.startswith(".") or not os.path.isdir(path) or os.path.abspath(path) == out_dir:
+            continue
+        files = _input_files(path, recursive=True)
+        if files:
+            folders[name] = files
+    return folders, _input_files(root, recursive=False)
+
+def _read_files(paths: list, root: str) -> list:
+    uploads = []
+    for path in paths:
+        with open(path, "rb") as f:
+            uploads.append((os.path.relpath(path, root), f.read()))
+    return uploads
+
+def write_results(brand_groups: dict, out_dir: str, formats: list, rollup=None, folder: str = None):
+    """
+    Write results as results.csv / results.parquet / report.html in out_dir.
+    A "Folder" column is added when folder is given.
+    """
+    import pandas as pd
+    from utils.html_formatter import make_html_table
+
+    os.makedirs(out_dir, exist_ok=True)
+    records = pd.DataFrame.from_records([item for items in brand_groups.values() for item in items])
+    if folder is not None:
+        records.insert(0, "Folder", folder)
+    if "csv" in formats:
+        records.to_csv(os.path.join(out_dir, "results.csv"), index=False)
+    if "parquet" in formats:
+        records.to_parquet(os.path.join(out_dir, "results.parquet"), index=False)
+    if "html" in formats:
+        with open(os.path.join(out_dir, "report.html"), "w", encoding="utf-8") as f:
+            f.write(make_html_table(brand_groups, rollup))
+
+def cost_folder(folder: str, paths: list, root: str, out_dir: str, formats: list, sourcing: dict, aliases: dict, verbose: bool = False) -> dict:
+    """
+    Read, parse and cost one brand folder and write its outputs.
+    Runs in a worker process; failures are returned, not raised.
+
+    Returns:
+        dict: "folder", "ok", "seconds", "items" and "rollup", or "error"
+    """
+    from utils.pipeline import load_uploads, missing_data_error
+    from utils.calculator import calculate_gp
+    from utils.rollups import GPRollup
+
+    start = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(sys.stdout if verbose else log):
+            data = load_uploads(_read_files(paths, root), sourcing=sourcing)
+            error = missing_data_error(data)
+            if error:
+                raise ValueError(error)
+            rollup = GPRollup()
+            brand_groups = calculate_gp(data["costings"], data["recipes"], data["menu"], aliases, data["variants"], rollup)
+            write_results(brand_groups, os.path.join(out_dir, folder), formats, rollup)
+    except Exception as e:
+        return {"folder": folder, "ok": False, "seconds": time.perf_counter() - start, "error": f"{type(e).__name__}: {e}"}
+    return {
+        "folder": folder, "ok": True, "seconds": time.perf_counter() - start,
+        "items": sum(len(items) for items in brand_groups.values()),
+        "brand_groups": brand_groups, "rollup": rollup,
+    }
+
+def _progress(done: int, total: int, label: str, width: int = 30):
+    """Redraw a one-line progress bar on stderr."""
+    filled = int(width * done / total) if total else width
+    sys.stderr.write(f"\r[{'#' * filled}{'.' * (width - filled)}] {done}/{total} {label[:40]:<40}")
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+def run_batch(args) -> int:
+    """Cost every brand folder under args.dir; returns the exit status."""
+    from utils.sourcing import SOURCING_POLICY, PREFERRED_SUPPLIERS
+    from utils.aliases import load_alias_table, alias_lookup
+
+    root = args.dir
+    if not os.path.isdir(root):
+        print(f"Not a directory: {root}", file=sys.stderr)
+        return 2
+    formats = [name.strip().lower() for name in args.format.split(",") if name.strip()]
+    unknown = sorted(set(formats) - set(FORMATS))
+    if unknown or not formats:
+        print(f"Unknown output format(s) {unknown}; use {FORMATS}", file=sys.stderr)
+        return 2
+    if "parquet" in formats:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Parquet output needs pyarrow (pip install pyarrow)", file=sys.stderr)
+            return 2
+
+    out_dir = args.out or os.path.join(root, "output")
+    folders, shared = find_brand_folders(root, out_dir)
+    if not folders:
+        if not shared:
+            print(f"No input files under {root}", file=sys.stderr)
+            return 2
+        # A flat directory is a single brand folder
+        folders, shared = {os.path.basename(os.path.abspath(root)): shared}, []
+
+    sourcing = {
+        "policy": args.policy or SOURCING_POLICY,
+        "preferred": [name.strip() for name in args.preferred.split(",") if name.strip()] if args.preferred is not None else PREFERRED_SUPPLIERS,
+        "tolerance_pct": args.tolerance,
+    }
+    aliases = alias_lookup(load_alias_table())
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(folders)))
+    print(f"Costing {len(folders)} brand folder(s) with {workers} worker(s); {len(shared)} shared file(s)")
+
+    start = time.perf_counter()
+    results = []
+    jobs = [(folder, shared + paths, root, out_dir, formats, sourcing, aliases, args.verbose) for folder, paths in folders.items()]
+    _progress(0, len(jobs), "")
+    if workers == 1:
+        for job in jobs:
+            results.append(cost_folder(*job))
+            _progress(len(results), len(jobs), job[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(cost_folder, *job) for job in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+                _progress(len(results), len(jobs), results[-1]["folder"])
+
+    from utils.rollups import GPRollup
+
+    estate = GPRollup()
+    estate_groups = {}
+    failed = 0
+    for result in sorted(results, key=lambda r: r["folder"]):
+        if result["ok"]:
+            print(f"✅ {result['folder']:<30} {result['items']:>6} items  {result['seconds']:7.2f}s")
+            estate.merge(result["rollup"])
+            for brand, items in result["brand_groups"].items():
+                estate_groups.setdefault(brand, []).extend({"Folder": result["folder"], **item} for item in items)
+        else:
+            failed += 1
+            print(f"❌ {result['folder']:<30} {result['error']}  ({result['seconds']:.2f}s)")
+
+    if estate_groups:
+        write_results(estate_groups, out_dir, [name for name in formats if name != "html"])
+        with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(estate.to_dict(), f, indent=2)
+    print(f"Done in {time.perf_counter() - start:.2f}s: {len(results) - failed} ok, {failed} failed. Output in {out_dir}")
+    return 1 if failed else 0
+
+def run_watch(args) -> int:
+    """Watch args.dir and rewrite the outputs after every change, until interrupted."""
+    from utils.sourcing import SOURCING_POLICY, PREFERRED_SUPPLIERS
+    from utils.aliases import load_alias_table, alias_lookup
+    from utils.watcher import FolderWatcher, WatchedModel
+
+    if not os.path.isdir(args.dir):
+        print(f"Not a directory: {args.dir}", file=sys.stderr)
+        return 2
+    formats = [name.strip().lower() for name in args.format.split(",") if name.strip()]
+    unknown = sorted(set(formats) - set(FORMATS))
+    if unknown or not formats:
+        print(f"Unknown output format(s) {unknown}; use {FORMATS}", file=sys.stderr)
+        return 2
+
+    out_dir = os.path.abspath(args.out or os.path.join(args.dir, "output"))
+    sourcing = {"policy": args.policy or SOURCING_POLICY, "preferred": PREFERRED_SUPPLIERS, "tolerance_pct": 0.0}
+    aliases = alias_lookup(load_alias_table())
+    model = WatchedModel(args.dir)
+    watcher = FolderWatcher(args.dir, args.interval, args.debounce, exclude=out_dir)
+    print(f"Watching {args.dir} every {args.interval}s; writing {','.join(formats)} to {out_dir} (Ctrl+C to stop)")
+
+    while True:
+        try:
+            batch = watcher.poll()
+            if batch:
+                changed, removed = batch
+                start = time.perf_counter()
+                try:
+                    with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+                        summary = model.update(changed, removed, aliases, sourcing)
+                        if summary["mode"] != "none":
+                            write_results(model.results, out_dir, formats, model.rollup)
+                except Exception as e:
+                    # One bad batch must not stop the watch
+                    print(f"❌ {time.strftime('%H:%M:%S')} update failed: {e}")
+                    time.sleep(args.interval)
+                    continue
+                print(f"{time.strftime('%H:%M:%S')} {len(changed)} changed, {len(removed)} removed: "
+                      f"{summary['mode']} update of {summary['recalculated']} records in {time.perf_counter() - start:.2f}s")
+                for path, error in summary["errors"].items():
+                    print(f"❌ {path}: {error}")
+            time.sleep(args.interval)
+        except KeyboardInterrupt:
+            return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Food Cost Calculator command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="cost every brand folder under a directory")
+    batch.add_argument("dir", help="directory of brand folders (files directly in it are shared)")
+    batch.add_argument("--out", help="output directory (default: DIR/output)")
+    batch.add_argument("--format", default="csv,html", help=f"comma-separated output formats from {FORMATS} (default: csv,html)")
+    batch.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    batch.add_argument("--policy", choices=["cheapest", "contract"], help="sourcing policy (default: FOOD_COST_SOURCING_POLICY)")
+    batch.add_argument("--preferred", help="comma-separated preferred suppliers (default: FOOD_COST_PREFERRED_SUPPLIERS)")
+    batch.add_argument("--tolerance", type=float, default=0.0, help="price premium %% accepted for preferred suppliers")
+    batch.add_argument("--verbose", action="store_true", help="show parser output")
+    batch.set_defaults(run=run_batch)
+
+    watch = commands.add_parser("watch", help="keep results fresh as files in a folder change")
+    watch.add_argument("dir", help="folder to watch (searched recursively)")
+    watch.add_argument("--out", help="output directory (default: DIR/output)")
+    watch.add_argument("--format", default="csv,html", help=f"comma-separated output formats from {FORMATS} (default: csv,html)")
+    watch.add_argument("--interval", type=float, default=2.0, help="seconds between scans (default: 2)")
+    watch.add_argument("--debounce", type=float, default=1.0, help="quiet seconds before a change is processed (default: 1)")
+    watch.add_argument("--policy", choices=["cheapest", "contract"], help="sourcing policy (default: FOOD_COST_SOURCING_POLICY)")
+    watch.add_argument("--verbose", action="store_true", help="show parser output")
+    watch.set_defaults(run=run_watch)
+    return parser
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,21 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, Request
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import pandas as pd
-import io
-from utils.detect_type import detect_file_type
-from utils.parse_costings import parse_costings
-from utils.parse_recipes import parse_recipes
-from utils.parse_menu import parse_menu_prices
-from utils.calculator import calculate_gp
+import os
+import threading
+import time
+from utils.jobs import JobQueue, QueueFullError
+from utils.limits import MAX_REQUEST_BYTES, MAX_SALES_BYTES, RequestSizeLimit, UploadTooLargeError, ServerBusyError, read_limited, work_slot
+from utils.aliases import build_alias_table, load_alias_table, save_alias_table, alias_lookup
 from utils.html_formatter import make_html_table
+from utils.rollups import GPRollup
+from utils.http_cache import CachedBody, ResponseCache, json_bytes
+
+# pandas-backed modules (utils.pipeline, utils.calculator, utils.history) are
+# imported inside the functions that use them, so cold starts only pay for
+# them on the first upload or query that needs them.
 
 app = FastAPI(title="Hungry Tum | Food Cost Generator")
 
@@ -22,87 +28,915 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject bodies over the request limit before any parsing; POS sales
+# exports are streamed from disk, so they get their own limit
+app.add_middleware(RequestSizeLimit, limit=MAX_REQUEST_BYTES, path_limits={"/sales": MAX_SALES_BYTES})
+
 # Serve static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # In-memory store
-db = {"costings": None, "recipes": None, "menu": None, "results": None}
+db = {"costings": None, "recipes": None, "menu": None, "variants": None, "results": None, "summary": None}
+
+# Held by every read-modify-write of db (uploads, price patches, sourcing,
+# the watch folder, site prices, sales) from its reads to its publish, so
+# concurrent work slots never see or build on a half-updated model. New
+# state is published with one db.update; readers needing several keys take
+# a consistent copy with model_state().
+db_lock = threading.RLock()
+
+def model_state() -> dict:
+    """Consistent shallow copy of db (tables and results are shared, not copied)."""
+    with db_lock:
+        return dict(db)
+
+# Bumped on every results update; keys the cached /results and /report bodies
+db["version"] = 0
+db["updated_at"] = None
+
+# {menu item: unrounded food cost} from the last calculation, reused by price patches
+db["item_costs"] = None
+
+# Every supplier's costings rows; db["costings"] holds the row picked per
+# ingredient under the current sourcing policy
+db["costings_all"] = None
+db["sourcing"] = None
+
+# Sparse per-site unit-cost overrides on top of db["costings"]
+db["site_overrides"] = None
+db["site_version"] = 0
+_site_costs = {}
+
+# {menu item: {Ingredient_norm: quantity}} for the current results, built on first use
+_item_usage = {}
+_cost_breakdown = {}
+
+# DuckDB tables over the current data, registered on first /sql use
+_sql_catalog = {}
+
+# Aggregated POS sales (item x site x period) and their load stats
+db["sales"] = None
+db["sales_stats"] = None
+db["sales_version"] = 0
+
+# Compressed response bodies, rebuilt only when their version changes
+responses = ResponseCache()
+
+# Stored ingredient aliases, loaded once and refreshed when edited
+db["aliases"] = alias_lookup(load_alias_table())
+
+# Worker processes for brand-parallel costing (1 = single process)
+CALC_WORKERS = int(os.environ.get("FOOD_COST_CALC_WORKERS", "1"))
+
+# Append-only snapshots of every calculation (set FOOD_COST_HISTORY=0 to disable)
+HISTORY_ENABLED = os.environ.get("FOOD_COST_HISTORY", "1") != "0"
+_history = []
+
+def get_history():
+    """Create the history store on first use."""
+    if not _history:
+        from utils.history import HistoryStore
+        _history.append(HistoryStore())
+    return _history[0]
+
+# Snapshot of the parsed model and results for fast restarts (set FOOD_COST_SNAPSHOT=0 to disable)
+SNAPSHOT_ENABLED = os.environ.get("FOOD_COST_SNAPSHOT", "1") != "0"
+SNAPSHOT_DIR = os.environ.get("FOOD_COST_SNAPSHOT_DIR", "data/snapshot")
+_snapshots = []
+
+def get_snapshot_writer():
+    """Create the background snapshot writer on first use."""
+    if not _snapshots:
+        from utils.snapshot import SnapshotWriter
+        _snapshots.append(SnapshotWriter(SNAPSHOT_DIR))
+    return _snapshots[0]
+
+def store_results(brand_results: dict, rollup: GPRollup = None, **state):
+    """
+    Make results and their summary current, append them to the history
+    store and snapshot the model for new workers.
+
+    Args:
+        brand_results: Results grouped by brand
+        rollup: Their GP rollups, built from the results if omitted
+        **state: Other db keys (inputs, item costs) published with the results
+    """
+    summary = (rollup or GPRollup.from_results(brand_results)).to_dict()
+    with db_lock:
+        db.update(state, results=brand_results, summary=summary, updated_at=time.time(), version=db["version"] + 1)
+        snapshot = dict(db)
+    if HISTORY_ENABLED:
+        try:
+            version = get_history().append(brand_results)
+            print(f"Stored history snapshot v{version}")
+        except OSError as e:
+            # Read-only filesystems (e.g. serverless) still serve current results
+            print(f"Warning: could not store history snapshot: {e}")
+    if SNAPSHOT_ENABLED:
+        # Written in the background; requests never wait for the disk
+        get_snapshot_writer().submit(snapshot)
+
+# Set once the saved model has been restored (or there was none to restore)
+_restored = []
+
+def restore_snapshot():
+    """
+    Serve the last saved model instead of waiting for an upload. Runs once,
+    before the first request that reads the model (see RestoreSnapshot), so
+    startup does not load pandas; a model published before then (the watch
+    folder) is kept. Without a saved snapshot nothing is imported.
+    """
+    with db_lock:
+        if _restored:
+            return
+        _restored.append(True)
+        if not SNAPSHOT_ENABLED or db["version"] or not os.path.exists(os.path.join(SNAPSHOT_DIR, "CURRENT")):
+            return
+        from utils.snapshot import load_snapshot
+        try:
+            snapshot = load_snapshot(SNAPSHOT_DIR)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: could not load model snapshot: {e}")
+            return
+        if snapshot is None:
+            return
+        keys = ["costings", "costings_all", "recipes", "menu", "variants", "item_costs", "results", "summary"]
+        db.update({key: snapshot[key] for key in keys}, updated_at=snapshot["created"], version=db["version"] + 1)
+    print(f"Restored model snapshot v{snapshot['version']}")
+
+# Routes that never read the model, served without restoring it
+NO_MODEL_PATHS = ("/static/", "/templates/")
+
+class RestoreSnapshot:
+    """ASGI middleware restoring the saved model before the first request that reads it."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not _restored and scope["path"] != "/" and not scope["path"].startswith(NO_MODEL_PATHS):
+            await run_in_threadpool(restore_snapshot)
+        await self.app(scope, receive, send)
+
+app.add_middleware(RestoreSnapshot)
+
+# Watched input folder (FOOD_COST_WATCH_DIR); started with the app
+watcher = {}
+
+@app.on_event("startup")
+def start_watcher():
+    """Keep the results fresh from the files in FOOD_COST_WATCH_DIR, if set."""
+    from utils.watcher import WATCH_DIR, FolderWatcher, WatchedModel
+    
+    if not WATCH_DIR:
+        return
+    if not os.path.isdir(WATCH_DIR):
+        print(f"Warning: watch folder {WATCH_DIR} does not exist")
+        return
+    model = WatchedModel(WATCH_DIR)
+    
+    def apply(changed, removed):
+        # Waits for running uploads instead of being rejected
+        with work_slot(blocking=True):
+            summary = model.update(changed, removed, db["aliases"], sourcing_options())
+            print(f"Watch folder: {len(summary['files'])} changed, {len(summary['removed'])} removed, "
+                  f"{summary['mode']} update of {summary['recalculated']} records")
+            for path, error in summary["errors"].items():
+                print(f"Watch folder: {path}: {error}")
+            if summary["mode"] != "none":
+                store_results(model.results, model.rollup, **model.data, item_costs=model.item_costs)
+    
+    watcher["folder"] = FolderWatcher(WATCH_DIR)
+    watcher["folder"].start(apply)
+    print(f"Watching {WATCH_DIR} for input files")
+
+@app.on_event("shutdown")
+def stop_watcher():
+    if "folder" in watcher:
+        watcher.pop("folder").stop()
+
+@app.on_event("shutdown")
+def flush_snapshot():
+    """Finish writing the last model snapshot before the worker exits."""
+    if _snapshots:
+        _snapshots[0].flush()
+
+def sourcing_options() -> dict:
+    """Current resolve_sources options: the stored choice, else the configured defaults."""
+    from utils.sourcing import SOURCING_POLICY, PREFERRED_SUPPLIERS
+    return db["sourcing"] or {"policy": SOURCING_POLICY, "preferred": PREFERRED_SUPPLIERS, "tolerance_pct": 0.0}
+
+def run_calculation(costings, recipes, menu, variants=None, rollup=None):
+    """
+    Cost all menu items, partitioned by brand when CALC_WORKERS > 1.
+
+    Returns:
+        tuple: (brand_results, item_costs), the item costs to keep in
+        db["item_costs"] for incremental price patches
+    """
+    from utils.calculator import calculate_gp, calculate_gp_parallel
+    
+    item_costs = {}
+    if CALC_WORKERS > 1:
+        brand_results = calculate_gp_parallel(costings, recipes, menu, db["aliases"], variants, rollup, max_workers=CALC_WORKERS, known_costs=item_costs)
+    else:
+        brand_results = calculate_gp(costings, recipes, menu, db["aliases"], variants, rollup, item_costs)
+    return brand_results, item_costs
+
+def process_uploads(uploads: list, progress=None):
+    """
+    Parse, cost and render a set of uploaded files, storing them in db.
+
+    Args:
+        uploads: List of (filename, content) tuples
+        progress: Optional callback receiving progress event dicts
+
+    Returns:
+        tuple: (brand_results, html_table)
+
+    Raises:
+        ValueError: If costings or recipes are missing
+    """
+    from utils.pipeline import load_uploads, missing_data_error
+    
+    data = load_uploads(uploads, progress, sourcing_options())
+    
+    # Validate required data
+    error_msg = missing_data_error(data)
+    if error_msg:
+        print(error_msg)
+        raise ValueError(error_msg)
+    
+    # Calculate results (now returns brand-grouped data)
+    rollup = GPRollup()
+    brand_results, item_costs = run_calculation(data["costings"], data["recipes"], data["menu"], data["variants"], rollup)
+    
+    print(f"Calculated results for brands: {list(brand_results.keys())}")
+    if progress:
+        for brand, items in brand_results.items():
+            progress({"stage": "brand", "brand": brand, "items": len(items)})
+    
+    # The previous model keeps serving until the new one is published whole
+    store_results(brand_results, rollup, **data, item_costs=item_costs)
+    
+    # Generate HTML table with brand sections
+    return brand_results, make_html_table(brand_results, rollup)
+
+def html_body(html: str) -> CachedBody:
+    """Compressed HTML report body, last modified at the current results."""
+    return CachedBody(html.encode("utf-8"), "text/html; charset=utf-8", db["updated_at"])
 
 @app.post("/upload")
-async def upload_files(files: list[UploadFile] = File(...)):
+async def upload_files(request: Request, files: list[UploadFile] = File(...)):
     """
     Upload and process CSV/XLSX files.
     Auto-detects file types and calculates food costs.
     """
     try:
         print(f"Received {len(files)} files for upload")
+        uploads = await read_limited(files)
         
-        # Reset database
-        db["costings"] = None
-        db["recipes"] = None
-        db["menu"] = None
-        db["results"] = None
+        with work_slot():
+            # Heavy work runs off the event loop so other requests stay responsive
+            _, html_table = await run_in_threadpool(process_uploads, uploads)
         
-        # Process each uploaded file
-        for i, file in enumerate(files):
-            print(f"Processing file {i+1}: {file.filename}")
-            content = await file.read()
-            file_type = detect_file_type(content, file.filename)
-            print(f"File {file.filename} detected as: {file_type}")
-            
-            # Parse based on file extension
-            if file.filename.endswith(".csv"):
-                df = pd.read_csv(io.BytesIO(content))
-            else:
-                df = pd.read_excel(io.BytesIO(content))
-            
-            print(f"File {file.filename} has {len(df)} rows and columns: {list(df.columns)}")
-            
-            # Store based on detected type
-            if file_type == "costings":
-                db["costings"] = parse_costings(df)
-                print(f"Stored costings data: {len(db['costings'])} rows")
-            elif file_type == "recipes":
-                db["recipes"] = parse_recipes(df)
-                print(f"Stored recipes data: {len(db['recipes'])} rows")
-            elif file_type == "menu":
-                db["menu"] = parse_menu_prices(df)
-                print(f"Stored menu data: {len(db['menu'])} rows")
-            else:
-                print(f"Warning: Could not detect type for {file.filename}")
-        
-        # Debug: Check what we have
-        print(f"Final state - Costings: {db['costings'] is not None}, Recipes: {db['recipes'] is not None}, Menu: {db['menu'] is not None}")
-        
-        # Validate required data
-        if db["costings"] is None or db["recipes"] is None:
-            error_msg = f"Need at least costings and recipes data. Got: costings={db['costings'] is not None}, recipes={db['recipes'] is not None}, menu={db['menu'] is not None}"
-            print(error_msg)
-            return JSONResponse({"error": error_msg}, status_code=400)
-        
-        # Calculate results (now returns brand-grouped data)
-        brand_results = calculate_gp(db["costings"], db["recipes"], db["menu"])
-        db["results"] = brand_results
-        
-        print(f"Calculated results for brands: {list(brand_results.keys())}")
-        
-        # Generate HTML table with brand sections
-        html_table = make_html_table(brand_results)
-        
-        return HTMLResponse(content=html_table)
+        return html_body(html_table).response(request)
         
+    except UploadTooLargeError as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except ServerBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "5"})
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
     except Exception as e:
         print(f"Upload error: {str(e)}")
         import traceback
         traceback.print_exc()
         return JSONResponse({"error": str(e)}, status_code=500)
 
+def _run_job(uploads: list, progress) -> dict:
+    """Job handler: run the upload pipeline and keep both result formats."""
+    # Jobs wait for a work slot instead of being rejected
+    with work_slot(blocking=True):
+        brand_results, html_table = process_uploads(uploads, progress)
+    return {"results": brand_results, "html": html_table}
+
+# Background upload jobs, drained by a bounded worker pool
+jobs = JobQueue(
+    _run_job,
+    workers=int(os.environ.get("FOOD_COST_JOB_WORKERS", "2")),
+    max_depth=int(os.environ.get("FOOD_COST_JOB_QUEUE_DEPTH", "16")),
+)
+
+@app.post("/jobs")
+async def submit_job(files: list[UploadFile] = File(...)):
+    """
+    Queue files for processing and return a job id immediately.
+    Poll /jobs/{job_id} or stream /jobs/{job_id}/events for progress.
+    """
+    try:
+        uploads = await read_limited(files)
+    except UploadTooLargeError as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    try:
+        job = jobs.submit(uploads)
+    except QueueFullError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "5"})
+    return JSONResponse({"job_id": job.id, "status": job.status, "queue_depth": jobs.depth}, status_code=202)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get job status and progress events."""
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream job progress as server-sent events until the job finishes."""
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return StreamingResponse(jobs.stream(job), media_type="text/event-stream")
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, format: str = "json"):
+    """Get the results of a finished job as JSON or as the HTML report."""
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    if job.status == "failed":
+        return JSONResponse({"error": job.error}, status_code=400)
+    if job.status != "done":
+        return JSONResponse({"error": f"Job is {job.status}"}, status_code=409)
+    if format == "html":
+        return HTMLResponse(content=job.result["html"])
+    return Response(json_bytes(job.result["results"]), media_type="application/json")
+
 @app.get("/results")
-async def get_results():
-    """Get results as JSON."""
+async def get_results(request: Request):
+    """Get results as JSON; compressed, with ETag/Last-Modified for cheap polling."""
+    if db["results"] is None:
+        return JSONResponse({"error": "No results yet. Upload files first."}, status_code=400)
+    # Serialized once per results version, straight from the result records
+    body = responses.get("results", db["version"], lambda: CachedBody(
+        json_bytes(db["results"]), "application/json", db["updated_at"]))
+    return body.response(request)
+
+@app.get("/report")
+async def get_report(request: Request):
+    """Get the HTML report of the latest results."""
+    if db["results"] is None:
+        return JSONResponse({"error": "No results yet. Upload files first."}, status_code=400)
+    body = responses.get("report", db["version"], lambda: html_body(make_html_table(db["results"])))
+    return body.response(request)
+
+def apply_price_patch(filename: str, content: bytes) -> dict:
+    """
+    Upsert a supplier price-update file into the costings and recalculate
+    only the menu items that can depend on the changed rows.
+    """
+    from utils.readers import read_upload
+    from utils.limits import check_table_size
+    from utils.parse_costings import parse_costings
+    from utils.price_updates import upsert_costings, recalculate_dirty
+    from utils.sourcing import SUPPLIER_COLUMNS, tag_supplier, resolve_sources
+    
+    updates = read_upload(content, filename, "costings")
+    check_table_size(updates, filename)
+    updates = parse_costings(updates)
+    
+    with db_lock:
+        if db["costings_all"] is None:
+            costings, changed, updated, added = upsert_costings(db["costings"], updates)
+            state = {"costings": costings}
+        else:
+            # Rows are matched within a supplier only when the update names one
+            if any(str(col).strip().lower() in SUPPLIER_COLUMNS for col in updates.columns):
+                updates = tag_supplier(updates, filename)
+            costings_all, changed, updated, added = upsert_costings(db["costings_all"], updates)
+            costings = resolve_sources(costings_all, **sourcing_options())
+            state = {"costings": costings, "costings_all": costings_all}
+        summary = {"updated": updated, "added": added, "dirty_items": [], "recalculated": 0}
+        print(f"Price patch {filename}: {updated} updated, {added} added")
+        
+        if db["results"] is None or db["recipes"] is None or db["item_costs"] is None:
+            db.update(state)
+            return summary
+        
+        # Updated on a copy: readers may be using the published item costs
+        item_costs = dict(db["item_costs"])
+        results, summary["dirty_items"], summary["recalculated"] = recalculate_dirty(
+            db["results"], item_costs, costings, db["recipes"], db["menu"], db["variants"], db["aliases"], changed)
+        if results is not None:
+            store_results(results, **state, item_costs=item_costs)
+        else:
+            db.update(state)
+    return summary
+
+@app.post("/costings/patch")
+async def patch_costings(file: UploadFile = File(...)):
+    """
+    Upload a supplier price update holding only changed rows (same columns
+    as the product list, optionally with a SKU column). Rows are upserted by
+    SKU or ingredient name and dependent menu items are recalculated.
+    """
+    if db["costings"] is None:
+        return JSONResponse({"error": "Upload a full costings list first."}, status_code=400)
+    try:
+        [(filename, content)] = await read_limited([file])
+        with work_slot():
+            return await run_in_threadpool(apply_price_patch, filename, content)
+    except UploadTooLargeError as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except ServerBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "5"})
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+def _sourcing_totals(brand_results: dict) -> dict:
+    rollup = GPRollup.from_results(brand_results)
+    return {"overall": rollup.overall_summary(), "brands": {brand: rollup.brand_summary(brand) for brand in brand_results}}
+
+def compare_sourcing() -> dict:
+    """
+    Cost the whole menu under contract and cheapest sourcing, without
+    changing the current results.
+    """
+    from utils.calculator import calculate_gp
+    from utils.sourcing import resolve_sources, supplier_choices
+    
+    state = model_state()
+    options = state["sourcing"] or sourcing_options()
+    costs = {}
+    totals = {}
+    for policy in ["contract", "cheapest"]:
+        costings = resolve_sources(state["costings_all"], policy, options["preferred"], options["tolerance_pct"])
+        costs[policy] = {}
+        totals[policy] = _sourcing_totals(calculate_gp(costings, state["recipes"], state["menu"], state["aliases"], state["variants"], known_costs=costs[policy]))
+    
+    items = [
+        {"item": name, "contract_cost": round(cost, 2), "cheapest_cost": round(costs["cheapest"][name], 2), "saving": round(cost - costs["cheapest"][name], 2)}
+        for name, cost in costs["contract"].items()
+        if name in costs["cheapest"] and round(cost - costs["cheapest"][name], 4)
+    ]
+    items.sort(key=lambda item: item["saving"], reverse=True)
+    choices = supplier_choices(state["costings_all"], options["preferred"], options["tolerance_pct"])
+    return {
+        "preferred": options["preferred"],
+        "tolerance_pct": options["tolerance_pct"],
+        "contract": totals["contract"],
+        "cheapest": totals["cheapest"],
+        "items": items,
+        "ingredients": choices.round(4).to_dict(orient="records"),
+    }
+
+@app.get("/sourcing")
+async def get_sourcing():
+    """Current sourcing policy and the suppliers in the costings."""
+    if db["costings_all"] is None:
+        return JSONResponse({"error": "Upload costings first."}, status_code=400)
+    suppliers = db["costings_all"]["Supplier"].value_counts()
+    chosen = db["costings"]["Supplier"].value_counts()
+    return {
+        **sourcing_options(),
+        "suppliers": [{"supplier": name, "rows": int(rows), "chosen": int(chosen.get(name, 0))} for name, rows in suppliers.items()],
+    }
+
+@app.post("/sourcing")
+async def set_sourcing(policy: str = "cheapest", preferred: str = "", tolerance_pct: float = 0.0):
+    """
+    Re-pick every ingredient's supplier and recalculate the whole menu.
+    policy: "cheapest" or "contract"; preferred: comma-separated supplier
+    names, highest priority first; tolerance_pct: premium a preferred
+    supplier may charge over the cheapest and still be chosen.
+    """
+    from utils.sourcing import resolve_sources
+    
+    if db["costings_all"] is None or db["recipes"] is None:
+        return JSONResponse({"error": "Upload costings and recipes first."}, status_code=400)
+    options = {"policy": policy.lower(), "preferred": [name.strip() for name in preferred.split(",") if name.strip()], "tolerance_pct": tolerance_pct}
+    
+    def apply():
+        with db_lock:
+            costings = resolve_sources(db["costings_all"], **options)
+            rollup = GPRollup()
+            brand_results, item_costs = run_calculation(costings, db["recipes"], db["menu"], db["variants"], rollup)
+            store_results(brand_results, rollup, sourcing=options, costings=costings, item_costs=item_costs)
+            return {**options, "ingredients": len(costings), "summary": db["summary"]["overall"]}
+    
+    try:
+        with work_slot():
+            return await run_in_threadpool(apply)
+    except ServerBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "5"})
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+@app.get("/sourcing/compare")
+async def get_sourcing_compare(request: Request):
+    """
+    Whole-menu food cost and GP under contract vs cheapest sourcing, with
+    the items and ingredients that would change.
+    """
+    if db["costings_all"] is None or db["recipes"] is None:
+        return JSONResponse({"error": "Upload costings and recipes first."}, status_code=400)
+    
+    def build():
+        return CachedBody(json_bytes(compare_sourcing()), "application/json")
+    
+    try:
+        with work_slot():
+            body = await run_in_threadpool(responses.get, "sourcing-compare", db["version"], build)
+    except ServerBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "5"})
+    return body.response(request)
+
+def get_item_usage():
+    """Ingredient usage of every item for the current results."""
+    from utils.calculator import ingredient_usage
+    
+    state = model_state()
+    if _item_usage.get("key") != state["version"]:
+        _item_usage["value"] = ingredient_usage(state["costings"], state["recipes"], state["aliases"], state["variants"])
+        _item_usage["key"] = state["version"]
+    return _item_usage["value"]
+
+def get_site_costs():
+    """
+    Per-site costs for the current results and overrides, built on first
+    use after either changes.
+    """
+    from utils.sites import SiteCosts
+    
+    state = model_state()
+    key = (state["version"], state["site_version"])
+    if _site_costs.get("key") != key:
+        _site_costs["value"] = SiteCosts(state["results"], state["item_costs"] or {}, get_item_usage(), state["costings"], state["site_overrides"])
+        _site_costs["key"] = key
+    return _site_costs["value"]
+
+def _sites_error():
+    if db["results"] is None or db["recipes"] is None:
+        return JSONResponse({"error": "No results yet. Upload files first."}, status_code=400)
+    if db["site_overrides"] is None:
+        return JSONResponse({"error": "No site prices yet. Upload them to /sites/prices first."}, status_code=400)
+    return None
+
+@app.post("/sites/prices")
+async def upload_site_prices(file: UploadFile = File(...), replace: bool = True):
+    """
+    Upload per-site price differences: a Site column plus the product list
+    columns, with only the rows that differ from the base costings. Sites
+    share the base catalogue; pass replace=false to add to the stored overrides.
+    """
+    from utils.readers import read_upload
+    from utils.limits import check_table_size
+    from utils.sites import parse_site_overrides
+    
+    try:
+        [(filename, content)] = await read_limited([file])
+        df = read_upload(content, filename)
+        check_table_size(df, filename)
+        overrides = parse_site_overrides(df)
+    except UploadTooLargeError as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    
+    def apply(overrides):
+        with db_lock:
+            if not replace and db["site_overrides"] is not None:
+                import pandas as pd
+                overrides = pd.concat([db["site_overrides"], overrides], ignore_index=True)
+                overrides = overrides.drop_duplicates(["Site", "Ingredient_norm"], keep="last").reset_index(drop=True)
+            db.update(site_overrides=overrides, site_version=db["site_version"] + 1)
+            return overrides, db["costings"]
+    
+    overrides, costings = await run_in_threadpool(apply, overrides)
+    known = set(costings["Ingredient_norm"]) if costings is not None else set()
+    return {
+        "sites": overrides["Site"].nunique(),
+        "overrides": len(overrides),
+        "unknown_ingredients": sorted(overrides.loc[~overrides["Ingredient_norm"].isin(known), "Ingredient"].astype(str).unique()),
+    }
+
+@app.get("/sites")
+async def list_sites(request: Request):
+    """Food cost and GP per site against the base menu, for every site at once."""
+    error = _sites_error()
+    if error:
+        return error
+    
+    def build():
+        return CachedBody(json_bytes(get_site_costs().overview()), "application/json")
+    
+    body = await run_in_threadpool(responses.get, "sites", (db["version"], db["site_version"]), build)
+    return body.response(request)
+
+@app.get("/sites/{site}/results")
+async def get_site_results(site: str):
+    """Results for one site: base results with its overrides applied."""
+    error = _sites_error()
+    if error:
+        return error
+    site_costs = await run_in_threadpool(get_site_costs)
+    try:
+        return Response(json_bytes(site_costs.site_results(site)), media_type="application/json")
+    except KeyError:
+        return JSONResponse({"error": f"No price overrides for site {site}"}, status_code=404)
+
+@app.get("/sites/{site}/summary")
+async def get_site_summary(site: str):
+    """GP rollups for one site."""
+    error = _sites_error()
+    if error:
+        return error
+    site_costs = await run_in_threadpool(get_site_costs)
+    try:
+        return site_costs.site_summary(site)
+    except KeyError:
+        return JSONResponse({"error": f"No price overrides for site {site}"}, status_code=404)
+
+@app.post("/sales")
+async def upload_sales(file: UploadFile = File(...), period: str = "W"):
+    """
+    Upload a POS sales export (CSV, CSV.gz or Excel) with item, date, site,
+    qty and net revenue columns. Lines are aggregated chunk by chunk into
+    per item, site and period (D, W or M) totals; the raw lines are not kept.
+    """
+    from utils.sales import read_sales
+    
+    def load():
+        # The upload is already spooled to a temporary file; read it in chunks from there
+        sales, stats = read_sales(file.file, file.filename, period)
+        with db_lock:
+            db.update(sales=sales, sales_stats=stats, sales_version=db["sales_version"] + 1)
+        return sales, stats
+    
+    try:
+        with work_slot():
+            sales, stats = await run_in_threadpool(load)
+    except ServerBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "5"})
+    except UploadTooLargeError as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    
+    print(f"Sales {file.filename}: {stats['lines']} lines into {len(sales)} item/site/period rows")
+    return stats
+
+@app.get("/sales/periods")
+async def get_sales_periods(item: str = None, site: str = None, start: str = None, end: str = None):
+    """Units and net revenue per period, for one menu item or all of them."""
+    if db["sales"] is None:
+        return JSONResponse({"error": "No sales yet. Upload a sales export first."}, status_code=400)
+    from utils.sales import filter_sales, period_volumes
+    return period_volumes(filter_sales(db["sales"], site, start, end), item)
+
+@app.get("/menu-engineering")
+async def get_menu_engineering(request: Request, site: str = None, start: str = None, end: str = None):
+    """
+    Sales-weighted GP and menu-engineering quadrants (Star, Plowhorse,
+    Puzzle, Dog) per brand, from the uploaded sales and current costs.
+    Optionally limited to one site and to periods starting in [start, end].
+    """
+    if db["results"] is None:
+        return JSONResponse({"error": "No results yet. Upload files first."}, status_code=400)
+    if db["sales"] is None:
+        return JSONResponse({"error": "No sales yet. Upload a sales export first."}, status_code=400)
+    from utils.sales import filter_sales, menu_engineering
+    
+    def build():
+        report = menu_engineering(db["results"], filter_sales(db["sales"], site, start, end))
+        return CachedBody(json_bytes(report), "application/json")
+    
+    if site or start or end:
+        return build().response(request)
+    return responses.get("menu-engineering", (db["version"], db["sales_version"]), build).response(request)
+
+def get_cost_breakdown():
+    """
+    Item x ingredient cost contributions for the current results, weighted
+    by the loaded sales, built on first use after either changes.
+    """
+    from utils.calculator import usage_costs
+    from utils.drivers import CostBreakdown
+    
+    state = model_state()
+    key = (state["version"], state["sales_version"])
+    if _cost_breakdown.get("key") != key:
+        weights = None
+        if state["sales"] is not None:
+            weights = state["sales"].groupby("Item_norm")["Qty"].sum().to_dict()
+        _cost_breakdown["value"] = CostBreakdown(state["results"], usage_costs(get_item_usage(), state["costings"]), state["costings"], weights)
+        _cost_breakdown["key"] = key
+    return _cost_breakdown["value"]
+
+@app.get("/drivers")
+async def get_drivers(request: Request, k: int = 5):
+    """
+    Top-k cost drivers (ingredients by cost contribution) per item, per brand
+    and estate-wide, plus every ingredient's estate-wide exposure. Exposure is
+    weighted by units sold once a sales export is loaded.
+    """
+    if db["results"] is None or db["recipes"] is None:
+        return JSONResponse({"error": "No results yet. Upload files first."}, status_code=400)
+    if not 1 <= k <= 50:
+        return JSONResponse({"error": "k must be between 1 and 50"}, status_code=400)
+    
+    def build():
+        return CachedBody(json_bytes(get_cost_breakdown().report(k)), "application/json")
+    
+    try:
+        with work_slot():
+            body = await run_in_threadpool(responses.get, ("drivers", k), (db["version"], db["sales_version"]), build)
+    except ServerBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "5"})
+    return body.response(request)
+
+@app.post("/reprice")
+async def reprice_menu(options: dict):
+    """
+    Solve selling prices that reach target GP % from the current food costs,
+    without recalculating. Nothing is stored.
+    Body: {"rules": [{"brand": "...", "category": "...", "gp_pct": 72}],
+           "default_gp_pct": 70, "endings": [0.49, 0.99], "ladder": [4.99, 5.49, ...],
+           "only_increase": false}
+    """
     if db["results"] is None:
         return JSONResponse({"error": "No results yet. Upload files first."}, status_code=400)
-    return db["results"]
+    from utils.reprice import reprice
+    
+    known = {"rules", "default_gp_pct", "endings", "ladder", "only_increase"}
+    unknown = sorted(set(options) - known)
+    if unknown:
+        return JSONResponse({"error": f"Unknown options {unknown}; use {sorted(known)}"}, status_code=400)
+    if not isinstance(options.get("rules", []), list):
+        return JSONResponse({"error": "rules must be a list"}, status_code=400)
+    
+    try:
+        report = await run_in_threadpool(reprice, db["results"], db["item_costs"] or {}, **options)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return Response(json_bytes(report), media_type="application/json")
+
+@app.post("/aliases/build")
+async def build_aliases(save: bool = False, min_score: float = 0.3):
+    """
+    Propose aliases for recipe ingredient names not yet in the stored table.
+    Review the proposals, then PUT /aliases; save=true stores them unreviewed
+    (listed by GET /aliases, but not used for matching until confirmed).
+    """
+    if db["costings"] is None or db["recipes"] is None:
+        return JSONResponse({"error": "Upload costings and recipes first."}, status_code=400)
+    
+    from utils.calculator import recipe_ingredient_names
+    
+    def build(recipes, costings):
+        # Trigram matching and the table file stay off the event loop
+        table = load_alias_table()
+        names = [name for name in recipe_ingredient_names(recipes) if name not in table]
+        proposals = build_alias_table(names, costings["Ingredient_norm"], min_score)
+        if save:
+            table.update(proposals)
+            save_alias_table(table)
+            db["aliases"] = alias_lookup(table)
+        return proposals
+    
+    return await run_in_threadpool(build, db["recipes"], db["costings"])
+
+@app.get("/aliases")
+async def get_aliases():
+    """Get the stored alias table."""
+    return load_alias_table()
+
+@app.put("/aliases")
+async def update_aliases(entries: dict):
+    """
+    Save reviewed aliases.
+    Body: {"recipe ingredient name": "costings ingredient name" or null for no match}
+    """
+    invalid = [name for name, target in entries.items() if target is not None and not isinstance(target, str)]
+    if invalid:
+        return JSONResponse({"error": f"Alias targets must be ingredient names or null: {', '.join(invalid)}"}, status_code=400)
+    
+    table = load_alias_table()
+    for name, target in entries.items():
+        key = name.lower().strip()
+        table[key] = {
+            "ingredient": target.lower().strip() if target else None,
+            "score": table.get(key, {}).get("score"),
+            "reviewed": True,
+        }
+    save_alias_table(table)
+    db["aliases"] = alias_lookup(table)
+    return {"saved": len(entries), "total": len(table)}
+
+@app.get("/summary")
+async def get_summary():
+    """Get precomputed GP rollups per brand, per category and overall."""
+    if db["summary"] is None:
+        return JSONResponse({"error": "No results yet. Upload files first."}, status_code=400)
+    return db["summary"]
+
+@app.get("/history")
+async def list_history():
+    """List stored result snapshots."""
+    history = await run_in_threadpool(get_history)
+    return await run_in_threadpool(history.versions)
+
+@app.get("/history/item")
+async def item_history(name: str, weeks: int = 52, brand: str = None):
+    """GP history for a menu item over the last N weeks."""
+    history = await run_in_threadpool(get_history)
+    return await run_in_threadpool(history.item_trend, name, weeks, brand)
+
+@app.get("/history/brands/drift")
+async def brand_gp_drift(points: float = 2.0, weeks: int = 52):
+    """Brands whose average GP % dropped by more than N points over the last N weeks."""
+    history = await run_in_threadpool(get_history)
+    return await run_in_threadpool(history.brand_drift, points, weeks)
+
+def get_sql_catalog():
+    """
+    SQL tables over the current data (costings, recipe lines, menu, variants,
+    results and sales), registered on first use after it changes.
+    """
+    from utils.sql import SQLCatalog, results_frame
+    from utils.calculator import explode_recipe_lines
+    
+    state = model_state()
+    key = (state["version"], state["sales_version"])
+    if _sql_catalog.get("key") != key:
+        _sql_catalog["value"] = SQLCatalog({
+            "costings": state["costings"],
+            "costings_all": state["costings_all"],
+            "recipe_lines": explode_recipe_lines(state["recipes"]) if state["recipes"] is not None else None,
+            "menu": state["menu"],
+            "variants": state["variants"],
+            "results": results_frame(state["results"]),
+            "sales": state["sales"],
+        })
+        _sql_catalog["key"] = key
+    return _sql_catalog["value"]
+
+def _sql_error():
+    from utils.sql import duckdb
+    
+    if duckdb is None:
+        return JSONResponse({"error": "SQL queries need duckdb installed (pip install duckdb)."}, status_code=501)
+    if db["results"] is None:
+        return JSONResponse({"error": "No data loaded."}, status_code=400)
+    return None
+
+@app.post("/sql")
+async def run_sql(options: dict):
+    """
+    Run a read-only SQL query (DuckDB dialect) over the stored tables.
+    Body: {"query": "SELECT Brand, avg(\"GP %\") FROM results GROUP BY Brand",
+           "max_rows": 1000, "timeout": 5}
+    max_rows and timeout can only lower FOOD_COST_SQL_MAX_ROWS / FOOD_COST_SQL_TIMEOUT.
+    """
+    error = _sql_error()
+    if error:
+        return error
+    from utils.sql import SQL_MAX_ROWS, SQL_TIMEOUT, QueryTimeoutError
+    
+    query = options.get("query")
+    if not isinstance(query, str) or not query.strip():
+        return JSONResponse({"error": "Body needs a query string"}, status_code=400)
+    try:
+        max_rows = min(int(options.get("max_rows", SQL_MAX_ROWS)), SQL_MAX_ROWS)
+        timeout = min(float(options.get("timeout", SQL_TIMEOUT)), SQL_TIMEOUT)
+    except (TypeError, ValueError):
+        return JSONResponse({"error": "max_rows and timeout must be numbers"}, status_code=400)
+    if max_rows < 1 or timeout <= 0:
+        return JSONResponse({"error": "max_rows and timeout must be positive"}, status_code=400)
+    
+    def run():
+        return get_sql_catalog().query(query, max_rows, timeout)
+    
+    try:
+        with work_slot():
+            result = await run_in_threadpool(run)
+    except ServerBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "5"})
+    except QueryTimeoutError as e:
+        return JSONResponse({"error": str(e)}, status_code=408)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return Response(json_bytes(result), media_type="application/json")
+
+@app.get("/sql/tables")
+async def sql_tables():
+    """Tables available to /sql with their row counts and column types."""
+    error = _sql_error()
+    if error:
+        return error
+    catalog = await run_in_threadpool(get_sql_catalog)
+    return catalog.schema()
 
 @app.get("/query")
 async def query_data(q: str):
@@ -151,10 +985,8 @@ async def query_data(q: str):
     
     return {"message": "Query not recognised. Try: 'cheese cost', 'chicken pizza gp', or 'items under 70'"}
 
-@app.get("/")
-async def home():
-    """Main page with direct input and file upload interface."""
-    return HTMLResponse("""
+# Home page markup; compressed once and served from the response cache
+HOME_PAGE_HTML = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -607,10 +1439,16 @@ async def home():
         </script>
     </body>
     </html>
-    """)
+    """
+
+@app.get("/")
+async def home(request: Request):
+    """Main page with direct input and file upload interface."""
+    page = responses.get("home", 0, lambda: CachedBody(HOME_PAGE_HTML.encode("utf-8"), "text/html; charset=utf-8"))
+    return page.response(request)
 
 @app.post("/calculate-direct")
-async def calculate_direct(data: dict):
+async def calculate_direct(request: Request, data: dict):
     """Calculate GP from direct input data."""
     try:
         brand_name = data.get("brand_name", "Unknown Brand")
@@ -620,104 +1458,115 @@ async def calculate_direct(data: dict):
         if not ingredients_data or not menu_items_data:
             return JSONResponse({"error": "Please provide both ingredients and menu items"}, status_code=400)
         
-        # Convert to DataFrames
-        import pandas as pd
-        
-        # Create costings DataFrame
-        costings_df = pd.DataFrame(ingredients_data)
-        costings_df.columns = ["Ingredient", "Our Price (£)", "Pack Size", "Unit"]
-        costings_df["Our Price (£)"] = pd.to_numeric(costings_df["Our Price (£)"], errors='coerce')
-        costings_df["Pack Size"] = pd.to_numeric(costings_df["Pack Size"], errors='coerce')
-        costings_df = costings_df.dropna()
-        
-        # Create recipes DataFrame
-        recipes_data = []
-        for menu_item in menu_items_data:
-            item_name = menu_item["item"]
-            category = menu_item["category"]
-            ingredients_str = menu_item["ingredients"]
+        def calculate():
+            # Convert to DataFrames
+            import pandas as pd
+            
+            # Create costings DataFrame
+            costings_df = pd.DataFrame(ingredients_data)
+            costings_df.columns = ["Ingredient", "Our Price (£)", "Pack Size", "Unit"]
+            costings_df["Our Price (£)"] = pd.to_numeric(costings_df["Our Price (£)"], errors='coerce')
+            costings_df["Pack Size"] = pd.to_numeric(costings_df["Pack Size"], errors='coerce')
+            costings_df = costings_df.dropna()
             
-            # Parse ingredients string (e.g., "Cheese: 3 slices; Flour: 0.3 kg")
-            if ingredients_str:
-                ingredient_parts = ingredients_str.split(";")
-                for part in ingredient_parts:
-                    part = part.strip()
-                    if ":" in part:
-                        ingredient_name, qty_unit = part.split(":", 1)
-                        ingredient_name = ingredient_name.strip()
-                        qty_unit = qty_unit.strip()
+            # Create recipes DataFrame
+            recipes_data = []
+            for menu_item in menu_items_data:
+                item_name = menu_item["item"]
+                category = menu_item["category"]
+                ingredients_str = menu_item["ingredients"]
+            
+                # Parse ingredients string (e.g., "Cheese: 3 slices; Flour: 0.3 kg")
+                if ingredients_str:
+                    ingredient_parts = ingredients_str.split(";")
+                    for part in ingredient_parts:
+                        part = part.strip()
+                        if ":" in part:
+                            ingredient_name, qty_unit = part.split(":", 1)
+                            ingredient_name = ingredient_name.strip()
+                            qty_unit = qty_unit.strip()
                         
-                        # Split quantity and unit
-                        qty_unit_parts = qty_unit.split()
-                        if len(qty_unit_parts) >= 2:
-                            qty = qty_unit_parts[0]
-                            unit = " ".join(qty_unit_parts[1:])
-                        else:
-                            qty = qty_unit_parts[0] if qty_unit_parts else "0"
-                            unit = "unit"
+                            # Split quantity and unit
+                            qty_unit_parts = qty_unit.split()
+                            if len(qty_unit_parts) >= 2:
+                                qty = qty_unit_parts[0]
+                                unit = " ".join(qty_unit_parts[1:])
+                            else:
+                                qty = qty_unit_parts[0] if qty_unit_parts else "0"
+                                unit = "unit"
                         
-                        recipes_data.append({
-                            "Menu Item": item_name,
-                            "Brand": brand_name,
-                            "Category": category,
-                            "Ingredient": ingredient_name,
-                            "Quantity": qty,
-                            "Unit": unit
-                        })
-        
-        recipes_df = pd.DataFrame(recipes_data)
-        if not recipes_df.empty:
-            recipes_df["Quantity"] = pd.to_numeric(recipes_df["Quantity"], errors='coerce')
-            recipes_df = recipes_df.dropna()
+                            recipes_data.append({
+                                "Menu Item": item_name,
+                                "Brand": brand_name,
+                                "Category": category,
+                                "Ingredient": ingredient_name,
+                                "Quantity": qty,
+                                "Unit": unit
+                            })
             
-            # Group by menu item and create ingredients string
-            recipes_grouped = recipes_df.groupby(["Menu Item", "Brand", "Category"]).apply(
-                lambda x: "; ".join([f"{row['Ingredient']}: {row['Quantity']} {row['Unit']}" 
-                                   for _, row in x.iterrows()])
-            ).reset_index()
-            recipes_grouped.columns = ["Menu Item", "Brand", "Category", "Ingredients (qty+unit)"]
-            recipes_df = recipes_grouped
-        
-        # Create menu DataFrame
-        menu_df = pd.DataFrame(menu_items_data)
-        menu_df.columns = ["Menu Item", "Category", "Selling Price (£)"]
-        menu_df["Selling Price (£)"] = pd.to_numeric(menu_df["Selling Price (£)"], errors='coerce')
-        menu_df["Brand"] = brand_name
-        menu_df = menu_df.dropna()
-        
-        # Store in database
-        db["costings"] = costings_df
-        db["recipes"] = recipes_df
-        db["menu"] = menu_df
-        
-        # Calculate GP
-        from utils.calculator import calculate_gp
-        brand_results = calculate_gp(costings_df, recipes_df, menu_df)
-        
-        # Store results
-        db["results"] = brand_results
-        
-        # Format as HTML
-        from utils.html_formatter import make_html_table
-        html_result = make_html_table(brand_results)
-        
-        return HTMLResponse(html_result)
+            recipes_df = pd.DataFrame(recipes_data)
+            if not recipes_df.empty:
+                recipes_df["Quantity"] = pd.to_numeric(recipes_df["Quantity"], errors='coerce')
+                recipes_df = recipes_df.dropna()
+            
+                # Group by menu item and create ingredients string
+                recipes_grouped = recipes_df.groupby(["Menu Item", "Brand", "Category"]).apply(
+                    lambda x: "; ".join([f"{row['Ingredient']}: {row['Quantity']} {row['Unit']}" 
+                                       for _, row in x.iterrows()])
+                ).reset_index()
+                recipes_grouped.columns = ["Menu Item", "Brand", "Category", "Ingredients (qty+unit)"]
+                recipes_df = recipes_grouped
+            
+            # Create menu DataFrame
+            menu_df = pd.DataFrame(menu_items_data)
+            menu_df.columns = ["Menu Item", "Category", "Selling Price (£)"]
+            menu_df["Selling Price (£)"] = pd.to_numeric(menu_df["Selling Price (£)"], errors='coerce')
+            menu_df["Brand"] = brand_name
+            menu_df = menu_df.dropna()
+            
+            # Calculate GP
+            from utils.calculator import calculate_gp
+            rollup = GPRollup()
+            item_costs = {}
+            brand_results = calculate_gp(costings_df, recipes_df, menu_df, rollup=rollup, known_costs=item_costs)
+            
+            # Store the inputs with their results
+            store_results(brand_results, rollup, costings=costings_df, costings_all=None, recipes=recipes_df,
+                          menu=menu_df, variants=None, item_costs=item_costs)
+            
+            # Format as HTML
+            return make_html_table(brand_results, rollup)
         
+        # Heavy work runs in a work slot, off the event loop
+        with work_slot():
+            html_result = await run_in_threadpool(calculate)
+        return html_body(html_result).response(request)
+    
+    except ServerBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "5"})
     except Exception as e:
         print(f"Error in calculate_direct: {e}")
         return JSONResponse({"error": f"Calculation error: {str(e)}"}, status_code=500)
 
 @app.get("/templates/{filename}")
-async def download_template(filename: str):
+async def download_template(request: Request, filename: str):
     """Download template files."""
-    from fastapi.responses import FileResponse
-    import os
+    import mimetypes
     
     template_path = f"templates/{filename}"
-    if os.path.exists(template_path):
-        return FileResponse(template_path, filename=filename)
-    else:
+    if not os.path.isfile(template_path):
         return JSONResponse({"error": "Template not found"}, status_code=404)
+    
+    # Cached until the file changes on disk
+    modified = os.path.getmtime(template_path)
+    
+    def build():
+        with open(template_path, "rb") as f:
+            content = f.read()
+        media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return CachedBody(content, media_type, modified, {"Content-Disposition": f'attachment; filename="{filename}"'})
+    
+    return responses.get(("template", filename), modified, build).response(request)
 
 @app.get("/api")
 async def api_info():
@@ -0,0 +1,50 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+sys.path.insert(0, ROOT)
+
+# Keep the suite off the real data/ directory
+_state = tempfile.mkdtemp(prefix="food-cost-tests-")
+os.environ.setdefault("FOOD_COST_HISTORY", "0")
+os.environ.setdefault("FOOD_COST_SNAPSHOT", "0")
+os.environ.setdefault("FOOD_COST_SCHEMA_CACHE_PATH", os.path.join(_state, "schema_cache.json"))
+os.environ.setdefault("FOOD_COST_ALIASES_PATH", os.path.join(_state, "aliases.json"))
+os.environ.setdefault("FOOD_COST_SNAPSHOT_DIR", os.path.join(_state, "snapshot"))
+os.environ.setdefault("FOOD_COST_HISTORY_DIR", os.path.join(_state, "history"))
+
+def fixture_bytes(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+def quiet(fn, *args, **kwargs):
+    """Call fn with the pipeline's progress prints silenced."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+@pytest.fixture
+def tables():
+    """Parsed fixture costings, recipes, menu and variants."""
+    from utils.pipeline import load_uploads
+    uploads = [(name, fixture_bytes(name)) for name in ["costings.csv", "recipes.csv", "menu.csv", "variants.csv"]]
+    return quiet(load_uploads, uploads)
+
+def upload_files(names: list) -> list:
+    return [("files", (name, fixture_bytes(name))) for name in names]
+
+@pytest.fixture
+def client(monkeypatch):
+    """TestClient for the app with the fixture files uploaded."""
+    from fastapi.testclient import TestClient
+    monkeypatch.chdir(ROOT)  # static/ is mounted relative to the working directory
+    import main
+    with TestClient(main.app) as client:
+        response = quiet(client.post, "/upload", files=upload_files(["costings.csv", "recipes.csv", "menu.csv", "variants.csv"]))
+        assert response.status_code == 200, response.text
+        yield client
@@ -0,0 +1,10 @@
+from utils.aliases import alias_lookup, build_alias_table
+
+def test_alias_lookup_uses_reviewed_entries_only():
+    table = build_alias_table(["chedar", "sumac"], ["cheddar", "flour"])
+    assert table["chedar"]["ingredient"] == "cheddar" and not table["chedar"]["reviewed"]
+    assert alias_lookup(table) == {}
+
+    table["chedar"]["reviewed"] = True
+    table["sumac"]["reviewed"] = True
+    assert alias_lookup(table) == {"chedar": "cheddar", "sumac": None}
@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from conftest import ROOT, quiet
+from utils.calculator import RECIPE_LINES, calc_item_cost, calculate_gp, calculate_gp_parallel, explode_recipe_lines, parse_recipe_lines
+
+def test_explode_recipe_lines_one_row_per_token(tables):
+    recipes = tables["recipes"]
+    tokens = sum(len([t for t in str(s).split(";") if ":" in t]) for s in recipes["Ingredients (qty+unit)"])
+    lines = explode_recipe_lines(recipes)
+    assert len(lines) == tokens
+    margherita = lines[lines["Menu Item"] == "Margherita Pizza"]
+    assert list(margherita["Ingredient"]) == ["cheese", "flour", "tomato sauce", "olive oil"]
+    assert margherita["Quantity"].tolist() == [3.0, 0.3, 0.1, 0.02]
+
+def test_explode_recipe_lines_repo_sample():
+    recipes = pd.read_csv(os.path.join(ROOT, "recipes.csv"))
+    counts = explode_recipe_lines(recipes).groupby("Menu Item").size()
+    assert counts["Margherita Pizza"] == 8
+    assert counts["Chicken Wings"] == 5
+    assert counts.sum() == 42
+
+def test_parse_recipe_lines():
+    lines = parse_recipe_lines("Cheese: 3 slices; Flour:0.3kg; Basil: a pinch")
+    assert lines[:2] == (("Cheese", "cheese", 3.0, "slices", None), ("Flour", "flour", 0.3, "kg", None))
+    assert lines[2][0] == "Basil: a pinch" and lines[2][4]
+    assert parse_recipe_lines("") is None and parse_recipe_lines("nan") is None
+
+def test_recipes_are_costed_from_their_parsed_lines(tables):
+    recipes = tables["recipes"]
+    assert RECIPE_LINES in recipes.columns
+    row = recipes.iloc[0].copy()
+    expected = calc_item_cost(row, tables["costings"])
+    # The stored lines are used as they are; the string is not parsed again
+    row["Ingredients (qty+unit)"] = "not parsed"
+    assert calc_item_cost(row, tables["costings"]) == expected
+
+def test_variant_of_unknown_base_is_kept_with_a_note(tables):
+    variants = pd.concat([tables["variants"], tables["variants"].iloc[:1].assign(**{"Menu Item": "Mystery Wings", "Base Item": "Mystery"})], ignore_index=True)
+    results = calculate_gp(tables["costings"], tables["recipes"], tables["menu"], variants_df=variants)
+    mystery = [item for item in results["Unknown"] if item["Menu Item"] == "Mystery Wings"]
+    assert len(mystery) == 1
+    assert "ASSUMED: unknown base item Mystery" in mystery[0]["Notes"]
+
+def test_parallel_costing_matches_serial(tables):
+    recipes = pd.concat([tables["recipes"], tables["recipes"].iloc[:1].assign(**{"Menu Item": "House Special", "Brand": "Unknown"})], ignore_index=True)
+    variants = pd.concat([tables["variants"], tables["variants"].iloc[:1].assign(**{"Menu Item": "Mystery Wings", "Base Item": "Mystery"})], ignore_index=True)
+    serial = calculate_gp(tables["costings"], recipes, tables["menu"], variants_df=variants)
+    parallel = calculate_gp_parallel(tables["costings"], recipes, tables["menu"], variants_df=variants, max_workers=2)
+    assert {brand: sorted(items, key=lambda i: i["Menu Item"]) for brand, items in parallel.items()} == \
+        {brand: sorted(items, key=lambda i: i["Menu Item"]) for brand, items in serial.items()}
+
+def test_parallel_costing_keeps_recipes_without_a_brand(tables):
+    recipes = pd.concat([tables["recipes"], tables["recipes"].iloc[:1].assign(**{"Menu Item": "Staff Pizza", "Brand": np.nan})], ignore_index=True)
+    variants = pd.concat([tables["variants"], tables["variants"].iloc[:1].assign(**{"Menu Item": "Staff Wings", "Base Item": "Staff Pizza"})], ignore_index=True)
+    serial_costs, parallel_costs = {}, {}
+    serial = quiet(calculate_gp, tables["costings"], recipes, tables["menu"], variants_df=variants, known_costs=serial_costs)
+    parallel = quiet(calculate_gp_parallel, tables["costings"], recipes, tables["menu"], variants_df=variants, max_workers=2, known_costs=parallel_costs)
+    assert parallel_costs == serial_costs and "staff pizza" in {name.lower() for name in parallel_costs}
+    assert {brand: sorted(items, key=lambda i: i["Menu Item"]) for brand, items in parallel.items()} == \
+        {brand: sorted(items, key=lambda i: i["Menu Item"]) for brand, items in serial.items()}
@@ -0,0 +1,37 @@
+import os
+
+import pandas as pd
+
+import cli
+from conftest import fixture_bytes, quiet
+
+def _write(path, name):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(fixture_bytes(name))
+
+def test_batch_costs_every_brand_folder_with_shared_costings(tmp_path):
+    _write(tmp_path / "costings.csv", "costings.csv")
+    for folder in ["north", "south"]:
+        _write(tmp_path / folder / "recipes.csv", "recipes.csv")
+        _write(tmp_path / folder / "menu.csv", "menu.csv")
+
+    assert quiet(cli.main, ["batch", str(tmp_path), "--workers", "2", "--format", "csv"]) == 0
+    north = pd.read_csv(tmp_path / "output" / "north" / "results.csv")
+    estate = pd.read_csv(tmp_path / "output" / "results.csv")
+    assert len(estate) == 2 * len(north)
+    assert set(estate["Folder"]) == {"north", "south"}
+    assert os.path.exists(tmp_path / "output" / "summary.json")
+
+def test_batch_reports_a_folder_without_recipes(tmp_path):
+    _write(tmp_path / "costings.csv", "costings.csv")
+    _write(tmp_path / "good" / "recipes.csv", "recipes.csv")
+    _write(tmp_path / "broken" / "menu.csv", "menu.csv")
+
+    assert quiet(cli.main, ["batch", str(tmp_path), "--workers", "1", "--format", "csv"]) == 1
+    assert os.path.exists(tmp_path / "output" / "good" / "results.csv")
+    assert not os.path.exists(tmp_path / "output" / "broken")
+
+def test_batch_rejects_unknown_formats(tmp_path):
+    _write(tmp_path / "costings.csv", "costings.csv")
+    assert quiet(cli.main, ["batch", str(tmp_path), "--format", "xml"]) == 2
@@ -0,0 +1,23 @@
+import pytest
+
+from utils.calculator import calculate_gp, ingredient_usage, usage_costs
+from utils.drivers import CostBreakdown
+
+def test_drivers_add_up_to_each_items_food_cost(tables):
+    results = calculate_gp(tables["costings"], tables["recipes"], tables["menu"], None, tables["variants"])
+    breakdown = usage_costs(ingredient_usage(tables["costings"], tables["recipes"], None, tables["variants"]), tables["costings"])
+    report = CostBreakdown(results, breakdown, tables["costings"]).report(k=10)
+
+    for item in report["items"]:
+        assert sum(driver["cost"] for driver in item["drivers"]) == pytest.approx(item["food_cost"], abs=0.01)
+    wings = next(item for item in report["items"] if item["item"] == "Chicken Wings")
+    assert wings["drivers"][0]["ingredient"] == "Chicken Breast"
+    assert report["weighted_by"] == "items"
+    assert [row["cost"] for row in report["exposure"]] == sorted((row["cost"] for row in report["exposure"]), reverse=True)
+
+def test_exposure_is_weighted_by_units_sold(tables):
+    results = calculate_gp(tables["costings"], tables["recipes"], tables["menu"])
+    breakdown = usage_costs(ingredient_usage(tables["costings"], tables["recipes"]), tables["costings"])
+    report = CostBreakdown(results, breakdown, tables["costings"], weights={"chicken wings": 10.0}).report()
+    assert report["weighted_by"] == "sales"
+    assert {row["ingredient"] for row in report["exposure"] if row["cost"]} == {"Chicken Breast", "Garlic"}
@@ -0,0 +1,29 @@
+from utils.history import HistoryStore
+
+def _results(gp_pct: float) -> dict:
+    return {
+        "Pizza Co": [
+            {"Brand": "Pizza Co", "Menu Item": "Margherita", "Category": "main", "Food Cost (£)": 1.0, "Selling Price (£)": 10.0, "GP £": 9.0, "GP %": gp_pct},
+            {"Brand": "Pizza Co", "Menu Item": "Garlic Bread", "Category": "side", "Food Cost (£)": 0.5, "Selling Price (£)": 4.0, "GP £": 3.5, "GP %": 87.5},
+        ],
+        "Wing Shack": [
+            {"Brand": "Wing Shack", "Menu Item": "Chicken Wings", "Category": "main", "Food Cost (£)": 2.0, "Selling Price (£)": 8.0, "GP £": 6.0, "GP %": 75.0},
+        ],
+    }
+
+def test_appends_are_indexed_like_a_fresh_load(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append(_results(90.0))
+    assert [row["gp_pct"] for row in store.item_trend("Margherita")] == [90.0]
+
+    # Indexed incrementally once the history is loaded
+    store.append(_results(80.0))
+    store.append(_results(70.0))
+    fresh = HistoryStore(str(tmp_path))
+    for item in ["margherita", "Chicken Wings", "missing"]:
+        assert store.item_trend(item) == fresh.item_trend(item)
+    assert [row["version"] for row in store.item_trend("Margherita")] == [1, 2, 3]
+
+    drift = store.brand_drift(points=2.0)
+    assert drift == fresh.brand_drift(points=2.0)
+    assert [d["brand"] for d in drift] == ["Pizza Co"] and drift[0]["change_points"] == -10.0
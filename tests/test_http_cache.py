@@ -0,0 +1,43 @@
+import gzip
+import json
+
+import numpy as np
+from starlette.requests import Request
+
+from utils.http_cache import CachedBody, ResponseCache, json_bytes
+
+def _request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+def test_each_encoding_has_its_own_etag():
+    body = CachedBody(b'{"results": []}' * 100, "application/json")
+    plain = body.response(_request())
+    gzipped = body.response(_request(accept_encoding="gzip"))
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert plain.headers["etag"] != gzipped.headers["etag"]
+
+    assert body.response(_request(accept_encoding="gzip", if_none_match=gzipped.headers["etag"])).status_code == 304
+    # A cached gzip body must not be revalidated for a client without gzip
+    assert body.response(_request(if_none_match=gzipped.headers["etag"])).status_code == 200
+    assert body.response(_request(if_none_match=plain.headers["etag"])).status_code == 304
+
+def test_compressed_body_round_trips():
+    body = CachedBody(b"<p>report</p>" * 200, "text/html")
+    assert gzip.decompress(body.encoded["gzip"]) == body.body
+    assert len(body.encoded["gzip"]) < len(body.body)
+
+def test_response_cache_rebuilds_only_for_a_new_version():
+    cache, builds = ResponseCache(), []
+
+    def build():
+        builds.append(1)
+        return CachedBody(b"{}", "application/json")
+
+    first = cache.get("results", 1, build)
+    assert cache.get("results", 1, build) is first
+    assert cache.get("results", 2, build) is not first
+    assert len(builds) == 2
+
+def test_json_bytes_writes_nan_and_numpy_values():
+    assert json.loads(json_bytes({"gp": float("nan"), "count": np.int64(3), "cost": np.float64(1.5)})) == {"gp": None, "count": 3, "cost": 1.5}
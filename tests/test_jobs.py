@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+
+from conftest import quiet
+from utils.jobs import JobQueue, QueueFullError
+
+def test_jobs_run_in_workers_and_stream_their_events():
+    def handler(payload, progress):
+        progress({"stage": "file", "file": payload})
+        if payload == "bad.csv":
+            raise ValueError("unreadable")
+        return {"rows": 3}
+
+    async def run():
+        queue = JobQueue(handler, workers=1)
+        ok, bad = queue.submit("menu.csv"), queue.submit("bad.csv")
+        events = [event async for event in queue.stream(ok, poll_interval=0.01)]
+        async for _ in queue.stream(bad, poll_interval=0.01):
+            pass
+        return ok, bad, events
+
+    ok, bad, events = quiet(asyncio.run, run())
+    assert (ok.status, ok.result) == ("done", {"rows": 3})
+    assert (bad.status, bad.error) == ("failed", "unreadable")
+    assert [event.count("stage") for event in events] == [1, 1]
+    assert '"done"' in events[-1] and ok.payload is None
+
+def test_submit_beyond_the_queue_depth_is_rejected():
+    release = threading.Event()
+
+    async def run():
+        queue = JobQueue(lambda payload, progress: release.wait(5), workers=1, max_depth=1)
+        queue.submit("running")
+        await asyncio.sleep(0.05)  # picked up by the worker
+        queue.submit("waiting")
+        with pytest.raises(QueueFullError):
+            queue.submit("rejected")
+        release.set()
+
+    asyncio.run(run())
@@ -0,0 +1,112 @@
+import os
+import subprocess
+import sys
+import threading
+
+from conftest import ROOT, fixture_bytes, quiet, upload_files
+
+def test_failed_upload_keeps_serving_previous_model(client):
+    before = client.get("/results").json()
+    response = quiet(client.post, "/upload", files=upload_files(["menu.csv"]))
+    assert response.status_code == 400
+    assert client.get("/results").json() == before
+
+def test_readers_never_see_a_half_published_upload(client):
+    import main
+
+    seen, done = [], threading.Event()
+
+    def read():
+        while not done.is_set():
+            state = main.model_state()
+            seen.append(state["results"] is None or state["costings"] is None or state["item_costs"] is None)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for _ in range(3):
+            response = quiet(client.post, "/upload", files=upload_files(["costings.csv", "recipes.csv", "menu.csv"]))
+            assert response.status_code == 200
+    finally:
+        done.set()
+        reader.join()
+    assert seen and not any(seen)
+    assert main.db["variants"] is None  # published whole: the new upload had none
+
+def test_price_patch_publishes_costings_with_results(client):
+    import main
+
+    patch = b"Item Name,Purchase Price,Quantity,Unit\nCheese,20.00,100,slices\n"
+    response = quiet(client.post, "/costings/patch", files={"file": ("patch.csv", patch)})
+    assert response.status_code == 200, response.text
+    assert response.json()["recalculated"] > 0
+    state = main.model_state()
+    cheese = state["costings"].loc[state["costings"]["Ingredient_norm"] == "cheese", "UnitCost"].iloc[0]
+    assert round(cheese, 4) == 0.2
+
+def test_chunked_body_over_the_limit_is_rejected(client, monkeypatch):
+    import main
+
+    # No Content-Length: the body is only counted as it arrives
+    def chunks():
+        for _ in range(8):
+            yield b"x" * 1024
+
+    middleware = next(m for m in main.app.user_middleware if m.cls.__name__ == "RequestSizeLimit")
+    monkeypatch.setitem(middleware.options, "limit", 4096)
+    main.app.middleware_stack = main.app.build_middleware_stack()
+    try:
+        response = client.post("/calculate-direct", content=chunks(), headers={"Content-Type": "application/json"})
+        assert response.status_code == 413
+        assert response.json() == {"error": "Request exceeds 4096 bytes"}
+    finally:
+        monkeypatch.undo()
+        main.app.middleware_stack = main.app.build_middleware_stack()
+
+def test_calculate_direct_needs_a_work_slot(client):
+    import contextlib
+    from utils.limits import MAX_CONCURRENT_WORK, work_slot
+
+    data = {"brand_name": "Direct", "ingredients": [["Cheese", 10, 100, "slices"]], "menu_items": [["Toastie", "main", 5]]}
+    with contextlib.ExitStack() as slots:
+        for _ in range(MAX_CONCURRENT_WORK):
+            slots.enter_context(work_slot())
+        response = client.post("/calculate-direct", json=data)
+    assert response.status_code == 429
+
+def test_alias_targets_must_be_names(client):
+    response = client.put("/aliases", json={"mozzarella": 3})
+    assert response.status_code == 400
+    assert "mozzarella" not in client.get("/aliases").json()
+
+def test_snapshot_is_restored_before_the_first_request(client, tables, monkeypatch):
+    import main
+    from utils import snapshot
+
+    results = {"Pizza Co": [{"Brand": "Pizza Co", "Menu Item": "Saved Pizza", "Category": "main", "Food Cost (£)": 1.0,
+                             "Selling Price (£)": 9.0, "GP £": 8.0, "GP %": 88.89, "Notes": ""}]}
+    snapshot.save_snapshot({**tables, "item_costs": {"Saved Pizza": 1.0}, "results": results, "summary": {}}, snapshot.SNAPSHOT_DIR)
+    monkeypatch.setattr(main, "SNAPSHOT_ENABLED", True)
+    monkeypatch.setattr(main, "_restored", [])
+    monkeypatch.setitem(main.db, "version", 0)
+
+    assert main.db["results"] != results
+    quiet(client.get, "/aliases")
+    assert main._restored and main.db["results"] == results
+
+def test_importing_the_app_does_not_load_pandas():
+    code = "import sys, main; print('pandas' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+def test_first_requests_without_a_snapshot_do_not_load_pandas(tmp_path):
+    code = (
+        "import sys, main\n"
+        "from fastapi.testclient import TestClient\n"
+        "client = TestClient(main.app)\n"
+        "client.get('/'); client.get('/aliases')\n"
+        "print(bool(main._restored), 'pandas' in sys.modules)"
+    )
+    env = {**os.environ, "FOOD_COST_SNAPSHOT": "1", "FOOD_COST_SNAPSHOT_DIR": str(tmp_path)}
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == "True False"
@@ -0,0 +1,23 @@
+import os
+
+import pandas as pd
+
+from conftest import FIXTURES
+from utils.calculator import calculate_gp
+from utils.parse_recipes import parse_recipes
+
+def test_yield_and_batch_recipes(tables):
+    recipes = parse_recipes(pd.read_csv(os.path.join(FIXTURES, "recipes_long.csv")))
+    results = calculate_gp(tables["costings"], recipes)
+    assert list(results) == ["Pizza Co"]  # batches are not menu items
+    [pizza] = results["Pizza Co"]
+    # 0.3 kg flour at 75% yield is bought as 0.4 kg (£0.20); the sauce batch
+    # costs £3.30 for 10 portions, of which the pizza uses 2 (£0.66)
+    assert pizza["Food Cost (£)"] == 0.86
+
+def test_batch_notes_are_reported_on_the_items_using_them(tables):
+    rows = pd.read_csv(os.path.join(FIXTURES, "recipes_long.csv"))
+    saffron = rows.iloc[:1].assign(Ingredient="Saffron", Quantity=1, Unit="g")
+    recipes = parse_recipes(pd.concat([rows, saffron], ignore_index=True))
+    [pizza] = calculate_gp(tables["costings"], recipes)["Pizza Co"]
+    assert "House Sauce: ASSUMED: no match for Saffron" in pizza["Notes"]
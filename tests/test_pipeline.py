@@ -0,0 +1,48 @@
+import io
+
+import pandas as pd
+from openpyxl import Workbook
+
+from conftest import fixture_bytes, quiet
+from utils import pipeline
+from utils.calculator import calculate_gp
+from utils.schema_cache import SchemaCache
+
+def _workbook(sheets: dict) -> bytes:
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, name in sheets.items():
+        df = pd.read_csv(io.BytesIO(fixture_bytes(name)))
+        worksheet = workbook.create_sheet(title)
+        worksheet.append(list(df.columns))
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+            worksheet.append(list(row))
+    content = io.BytesIO()
+    workbook.save(content)
+    return content.getvalue()
+
+def test_workbook_sheets_load_like_separate_files(tables):
+    content = _workbook({"Costings": "costings.csv", "Recipes": "recipes.csv", "Menu": "menu.csv"})
+    data = quiet(pipeline.load_uploads, [("estate.xlsx", content)])
+    assert all(data[table] is not None for table in ["costings", "recipes", "menu"])
+    expected = quiet(calculate_gp, tables["costings"], tables["recipes"], tables["menu"])
+    assert quiet(calculate_gp, data["costings"], data["recipes"], data["menu"]) == expected
+
+def test_known_header_layout_is_read_from_the_schema_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "schema_cache", SchemaCache(str(tmp_path / "schema_cache.json")))
+    first = quiet(pipeline.read_tables, "costings.csv", fixture_bytes("costings.csv"))
+    assert first[0][4] is None
+    quiet(pipeline.parse_file, "costings.csv", fixture_bytes("costings.csv"))
+
+    again = quiet(pipeline.read_tables, "costings.csv", fixture_bytes("costings.csv"))
+    label, file_type, df, fingerprint, entry = again[0]
+    assert entry["file_type"] == file_type == "costings"
+    pd.testing.assert_frame_equal(df, first[0][2])
+
+def test_headers_differing_only_in_case_are_mapped_separately(tables, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "schema_cache", SchemaCache(str(tmp_path / "schema_cache.json")))
+    titled = quiet(pipeline.parse_file, "menu.csv", b"Item Name,Selling Price\nMargherita Pizza,12.5\n")
+    lower = quiet(pipeline.parse_file, "menu.csv", b"item name,selling price\nMargherita Pizza,12.5\n")
+    for (_, _, menu) in titled + lower:
+        results = quiet(calculate_gp, tables["costings"], tables["recipes"], menu)
+        assert results["Pizza Co"][0]["Selling Price (£)"] == 12.5
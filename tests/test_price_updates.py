@@ -0,0 +1,20 @@
+import pandas as pd
+
+from conftest import quiet
+from utils.calculator import calculate_gp
+from utils.parse_costings import parse_costings
+from utils.price_updates import changed_ingredients, recalculate_dirty, upsert_costings
+
+def test_patch_recalculates_only_dirty_items_and_matches_a_full_run(tables):
+    item_costs = {}
+    results = quiet(calculate_gp, tables["costings"], tables["recipes"], tables["menu"], None, tables["variants"], known_costs=item_costs)
+
+    updates = parse_costings(pd.DataFrame({"Item Name": ["Garlic"], "Purchase Price": [6.0], "Quantity": [1.0], "Unit": ["kg"]}))
+    costings, changed, updated, added = upsert_costings(tables["costings"], updates)
+    assert (changed, updated, added) == ({"garlic"}, 1, 0)
+    assert changed_ingredients(tables["costings"], costings) == {"garlic"}
+
+    spliced, dirty, recalculated = quiet(recalculate_dirty, results, item_costs, costings, tables["recipes"], tables["menu"], tables["variants"], None, changed)
+    assert dirty == ["chicken wings", "garlic bread", "garlic wings"]
+    assert recalculated == 3
+    assert spliced == quiet(calculate_gp, costings, tables["recipes"], tables["menu"], None, tables["variants"])
@@ -0,0 +1,18 @@
+import pandas as pd
+
+from conftest import fixture_bytes
+from utils import readers
+
+def test_csv_engines_read_the_same_typed_table(monkeypatch):
+    content = fixture_bytes("costings.csv")
+    frames = {}
+    for engine in ["c", "pyarrow"]:
+        monkeypatch.setattr(readers, "CSV_ENGINE", engine)
+        frames[engine] = readers.read_csv_bytes(content, "costings")
+    pd.testing.assert_frame_equal(frames["c"], frames["pyarrow"])
+    assert frames["c"]["Purchase Price"].dtype == "float64"
+
+def test_typed_read_falls_back_when_a_number_column_has_text():
+    content = b"Item Name,Purchase Price,Quantity,Unit\nCheese,ten,100,slices\n"
+    df = readers.read_csv_bytes(content, "costings")
+    assert df["Purchase Price"].tolist() == ["ten"]
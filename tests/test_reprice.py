@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from utils.calculator import calculate_gp
+from utils.reprice import reprice, round_to_endings, round_to_ladder
+
+def test_round_to_endings_never_goes_below_the_target():
+    prices = np.array([4.10, 4.49, 4.50, 0.20])
+    assert round_to_endings(prices, [0.49, 0.99]).tolist() == [4.49, 4.49, 4.99, 0.49]
+
+def test_round_to_ladder_flags_prices_above_the_top_rung():
+    rounded, above = round_to_ladder(np.array([3.2, 5.0, 12.0]), [3.5, 5.0, 7.5])
+    assert rounded[:2].tolist() == [3.5, 5.0] and np.isnan(rounded[2])
+    assert above.tolist() == [False, False, True]
+
+def test_reprice_meets_the_most_specific_target(tables):
+    item_costs = {}
+    results = calculate_gp(tables["costings"], tables["recipes"], tables["menu"], known_costs=item_costs)
+    rules = [{"gp_pct": 70}, {"brand": "Pizza Co", "category": "side", "gp_pct": 80}]
+    report = reprice(results, item_costs, rules)
+
+    targets = {row["item"]: row["target_gp_pct"] for row in report["items"]}
+    assert targets["Garlic Bread"] == 80 and targets["Chicken Wings"] == 70
+    for row in report["items"]:
+        if row["food_cost"] > 0:
+            assert row["new_gp_pct"] >= row["target_gp_pct"] - 0.1
+    assert report["unpriced"] == 1  # Water has no food cost
+    assert report["projected"]["overall"]["count"] == report["current"]["overall"]["count"]
+
+def test_reprice_rejects_invalid_targets(tables):
+    results = calculate_gp(tables["costings"], tables["recipes"], tables["menu"])
+    with pytest.raises(ValueError):
+        reprice(results, {}, [{"brand": "Pizza Co"}])
+    with pytest.raises(ValueError):
+        reprice(results, {}, default_gp_pct=100)
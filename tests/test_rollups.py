@@ -0,0 +1,16 @@
+from utils.calculator import calculate_gp
+from utils.rollups import GPRollup
+
+def test_rollup_kept_while_costing_matches_the_results(tables):
+    rollup = GPRollup()
+    results = calculate_gp(tables["costings"], tables["recipes"], tables["menu"], None, tables["variants"], rollup)
+    assert rollup.to_dict() == GPRollup.from_results(results).to_dict()
+    assert rollup.overall_summary()["count"] == sum(len(items) for items in results.values())
+    assert set(rollup.to_dict()["brands"]) == {"Pizza Co", "Wing Shack"}
+
+def test_merged_partial_rollups_equal_one_rollup(tables):
+    results = calculate_gp(tables["costings"], tables["recipes"], tables["menu"])
+    merged = GPRollup()
+    for brand, items in results.items():
+        merged.merge(GPRollup.from_results({brand: items}))
+    assert merged.to_dict() == GPRollup.from_results(results).to_dict()
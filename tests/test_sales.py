@@ -0,0 +1,33 @@
+import io
+
+import pandas as pd
+import pytest
+
+from conftest import fixture_bytes
+from utils.limits import UploadTooLargeError
+from utils.sales import read_sales
+
+def test_read_sales_aggregates_chunks_per_item_site_and_week():
+    sales, stats = read_sales(io.BytesIO(fixture_bytes("sales.csv")), "sales.csv", "W", chunk_rows=2)
+    assert stats["lines"] == 4 and stats["sites"] == ["Leeds", "York"]
+    leeds = sales[(sales["Site"] == "Leeds") & (sales["Item_norm"] == "margherita")].sort_values("Period")
+    assert leeds["Qty"].tolist() == [5, 1]
+    assert leeds["Net Revenue"].tolist() == [50.0, 10.0]
+
+def test_read_sales_rejects_excel_over_the_row_limit(monkeypatch):
+    import utils.limits
+    import utils.sales
+    buffer = io.BytesIO()
+    pd.read_csv(io.BytesIO(fixture_bytes("sales.csv"))).to_excel(buffer, index=False)
+
+    monkeypatch.setattr(utils.sales, "MAX_ROWS", 3)
+    monkeypatch.setattr(utils.limits, "MAX_ROWS", 3)
+    buffer.seek(0)
+    with pytest.raises(UploadTooLargeError):
+        read_sales(buffer, "sales.xlsx")
+
+    monkeypatch.setattr(utils.sales, "MAX_ROWS", 4)
+    monkeypatch.setattr(utils.limits, "MAX_ROWS", 4)
+    buffer.seek(0)
+    sales, stats = read_sales(buffer, "sales.xlsx")
+    assert stats["lines"] == 4
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from utils.calculator import calculate_gp, ingredient_usage
+from utils.sites import SiteCosts, parse_site_overrides
+
+def test_site_results_match_costing_with_the_site_prices(tables):
+    item_costs = {}
+    results = calculate_gp(tables["costings"], tables["recipes"], tables["menu"], None, tables["variants"], known_costs=item_costs)
+    overrides = parse_site_overrides(pd.DataFrame({
+        "Site": ["Leeds", "Leeds", "York"],
+        "Item Name": ["Cheese", "Garlic", "Flour"],
+        "Purchase Price": [20.0, 6.0, 5.0],
+        "Quantity": [100.0, 1.0, 5.0],
+        "Unit": ["slices", "kg", "kg"],
+    }))
+    usage = ingredient_usage(tables["costings"], tables["recipes"], None, tables["variants"])
+    sites = SiteCosts(results, item_costs, usage, tables["costings"], overrides)
+
+    for site in ["Leeds", "York"]:
+        site_rows = overrides[overrides["Site"] == site].set_index("Ingredient_norm")["UnitCost"]
+        costings = tables["costings"].copy()
+        costings["UnitCost"] = costings["Ingredient_norm"].map(site_rows).fillna(costings["UnitCost"])
+        assert sites.site_results(site) == calculate_gp(costings, tables["recipes"], tables["menu"], None, tables["variants"])
+
+    overview = {row["site"]: row for row in sites.overview()}
+    assert overview["Leeds"]["overrides"] == 2 and overview["Leeds"]["food_cost_change"] > 0
+    with pytest.raises(KeyError):
+        sites.site_results("Hull")
+
+def test_site_file_needs_a_site_column():
+    with pytest.raises(ValueError):
+        parse_site_overrides(pd.DataFrame({"Item Name": ["Cheese"], "Purchase Price": [20.0], "Quantity": [100.0], "Unit": ["slices"]}))
+
+def test_site_file_rows_need_a_site():
+    with pytest.raises(ValueError, match="without a site: 3"):
+        parse_site_overrides(pd.DataFrame({"Site": ["Leeds", None], "Item Name": ["Cheese", "Flour"], "Purchase Price": [20.0, 5.0],
+                                           "Quantity": [100.0, 5.0], "Unit": ["slices", "kg"]}))
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from utils.snapshot import SnapshotWriter, load_snapshot, save_snapshot
+
+def test_snapshot_round_trip_keeps_number_columns_mapped(tables, tmp_path):
+    results = {"Pizza Co": [{"Brand": "Pizza Co", "Menu Item": "Margherita", "Category": "main", "Food Cost (£)": 1.2,
+                             "Selling Price (£)": 9.0, "GP £": 7.8, "GP %": 86.67, "Notes": ""}]}
+    state = {**tables, "item_costs": {"Margherita": 1.2}, "results": results, "summary": {"overall": {}}}
+    state["menu"] = state["menu"].assign(Notes=["ok", None] + ["£ café"] * (len(state["menu"]) - 2))
+    save_snapshot(state, str(tmp_path))
+
+    loaded = load_snapshot(str(tmp_path))
+    for table in ["costings", "recipes", "menu"]:
+        pd.testing.assert_frame_equal(loaded[table], state[table].reset_index(drop=True), check_dtype=False)
+    assert loaded["variants"] is not None
+    assert loaded["item_costs"] == {"Margherita": 1.2} and loaded["results"] == results
+
+    unit_cost = loaded["costings"]["UnitCost"].to_numpy()
+    assert isinstance(unit_cost.base, np.memmap) or isinstance(unit_cost, np.memmap)
+
+def test_snapshot_writer_saves_the_latest_state(tables, tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    for i in range(3):
+        writer.submit({**tables, "item_costs": {"Margherita": float(i)}, "results": None, "summary": None})
+    writer.flush()
+    assert load_snapshot(str(tmp_path))["item_costs"] == {"Margherita": 2.0}
+
+def test_snapshot_writer_links_unchanged_tables(tables, tmp_path):
+    import os
+
+    writer = SnapshotWriter(str(tmp_path))
+    writer.submit({**tables, "item_costs": {}, "results": None, "summary": None})
+    writer.flush()
+    patched = tables["costings"].assign(UnitCost=tables["costings"]["UnitCost"] * 2)
+    writer.submit({**tables, "costings": patched, "item_costs": {}, "results": None, "summary": None})
+    writer.flush()
+
+    first, second = tmp_path / "v000001", tmp_path / "v000002"
+    assert os.path.samefile(first / "recipes.0.npy", second / "recipes.0.npy")
+    assert not os.path.samefile(first / "costings.0.npy", second / "costings.0.npy")
+    loaded = load_snapshot(str(tmp_path))
+    pd.testing.assert_frame_equal(loaded["recipes"], tables["recipes"].reset_index(drop=True), check_dtype=False)
+    assert loaded["costings"]["UnitCost"].tolist() == patched["UnitCost"].tolist()
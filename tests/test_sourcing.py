@@ -0,0 +1,26 @@
+import pandas as pd
+
+from utils.sourcing import resolve_sources
+
+def _costings(rows: list) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=["Ingredient", "Supplier", "Pack Size", "Unit", "UnitCost"])
+    return df.assign(Ingredient_norm=df["Ingredient"].str.lower())
+
+def test_contract_falls_back_to_the_cheapest_same_dimension_row():
+    df = _costings([
+        ["Cheese", "A", 1, "kg", 2.0],
+        ["Cheese", "B", 1000, "g", 0.001],   # £1/kg
+        ["Cheese", "D", 1, "each", 0.5],     # another dimension never competes
+        ["Flour", "A", 1, "kg", 1.0],
+        ["Flour", "C", 1, "kg", 3.0],
+    ])
+    contract = resolve_sources(df, "contract", ["C"]).set_index("Ingredient_norm")
+    assert contract.loc["flour", "Supplier"] == "C"
+    assert contract.loc["cheese", "Supplier"] == "B"
+    # Expressed in the first-listed row's unit
+    assert contract.loc["cheese", "Unit"] == "kg" and contract.loc["cheese", "UnitCost"] == 1.0
+
+def test_cheapest_honours_the_preferred_tolerance():
+    df = _costings([["Flour", "A", 1, "kg", 1.0], ["Flour", "C", 1, "kg", 1.05]])
+    assert resolve_sources(df, "cheapest", ["C"])["Supplier"].tolist() == ["A"]
+    assert resolve_sources(df, "cheapest", ["C"], tolerance_pct=10)["Supplier"].tolist() == ["C"]
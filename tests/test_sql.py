@@ -0,0 +1,33 @@
+import pytest
+
+from utils.calculator import calculate_gp, explode_recipe_lines
+from utils.sql import SQLCatalog, results_frame
+
+pytest.importorskip("duckdb")
+
+@pytest.fixture
+def catalog(tables):
+    results = calculate_gp(tables["costings"], tables["recipes"], tables["menu"])
+    catalog = SQLCatalog({"results": results_frame(results), "recipe_lines": explode_recipe_lines(tables["recipes"]), "variants": None})
+    yield catalog
+    catalog.close()
+
+def test_queries_join_the_registered_tables(catalog):
+    answer = catalog.query(
+        'SELECT r."Menu Item", count(*) AS lines FROM results r '
+        'JOIN recipe_lines l ON l."Menu Item" = r."Menu Item" GROUP BY 1 ORDER BY 1'
+    )
+    assert answer["columns"] == ["Menu Item", "lines"]
+    assert dict(answer["rows"])["Margherita Pizza"] == 4
+    assert set(catalog.schema()) == {"results", "recipe_lines"}
+
+def test_only_single_selects_are_run(catalog):
+    for sql in ["DROP TABLE results", "SELECT 1; SELECT 2", "COPY results TO 'out.csv'"]:
+        with pytest.raises(ValueError):
+            catalog.query(sql)
+    with pytest.raises(ValueError):
+        catalog.query("SELECT * FROM read_csv_auto('tests/fixtures/menu.csv')")
+
+def test_rows_are_capped(catalog):
+    answer = catalog.query("SELECT * FROM recipe_lines", max_rows=2)
+    assert answer["row_count"] == 2 and answer["truncated"]
@@ -0,0 +1,89 @@
+import os
+
+from conftest import fixture_bytes, quiet
+from utils.calculator import calculate_gp
+from utils.pipeline import parse_file
+from utils.sourcing import resolve_sources
+from utils.watcher import FolderWatcher, WatchedModel
+
+A_RECIPES = """Menu Item,Brand,Category,Ingredient,Quantity,Unit,Batch Yield
+House Sauce,A,prep,Tomato Sauce,{sauce},liter,1
+A Pizza,A,main,Flour,0.3,kg,
+A Pizza,A,main,House Sauce,0.1,liter,
+"""
+B_RECIPES = """Menu Item,Brand,Category,Ingredient,Quantity,Unit
+B Pasta,B,main,Flour,0.2,kg
+B Pasta,B,main,House Sauce,0.2,liter
+Meal: B Deal,B,meal,A Pizza,1,each
+"""
+
+def _write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+def _full_run(paths):
+    import pandas as pd
+    frames = {}
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            for _, file_type, df in quiet(parse_file, os.path.basename(path), f.read()):
+                frames.setdefault(file_type, []).append(df)
+    data = {file_type: pd.concat(dfs, ignore_index=True) for file_type, dfs in frames.items()}
+    return quiet(calculate_gp, resolve_sources(data["costings"]), data["recipes"], data.get("menu"), None, data.get("variants"))
+
+def _flush(watcher, start):
+    for now in [start, start + 10]:
+        batch = watcher.poll(now=now)
+    return batch
+
+def test_watcher_debounces_and_ignores_unchanged_content(tmp_path):
+    path = tmp_path / "costings.csv"
+    path.write_bytes(fixture_bytes("costings.csv"))
+    watcher = FolderWatcher(str(tmp_path), debounce=1.0)
+    assert watcher.poll(now=0) is None  # change seen, still settling
+    changed, removed = watcher.poll(now=5)
+    assert list(changed) == [str(path)] and removed == []
+
+    os.utime(path, ns=(1, 1))  # touched, same content
+    assert _flush(watcher, 10) is None
+
+    path.unlink()
+    assert _flush(watcher, 20) == ({}, [str(path)])
+
+def test_recipe_change_updates_dependents_in_other_brands(tmp_path):
+    costings = tmp_path / "Bidfood - Product list.csv"
+    costings.write_bytes(fixture_bytes("costings.csv"))
+    a, b = tmp_path / "A - recipes.csv", tmp_path / "B - recipes.csv"
+    _write(a, A_RECIPES.format(sauce=1))
+    _write(b, B_RECIPES)
+    paths = [str(costings), str(a), str(b)]
+
+    watcher, model = FolderWatcher(str(tmp_path), debounce=1.0), WatchedModel(str(tmp_path))
+    summary = quiet(model.update, *_flush(watcher, 0))
+    assert summary["mode"] == "full", summary
+    assert model.results == _full_run(paths)
+
+    # The batch sauce in A's file is used by B's pasta and B's meal deal references A's pizza
+    _write(a, A_RECIPES.format(sauce=5))
+    summary = quiet(model.update, *_flush(watcher, 100))
+    assert summary["mode"] == "brands"
+    expected = _full_run(paths)
+    assert model.results == expected
+    pasta = next(item for item in expected["B"] if item["Menu Item"] == "B Pasta")
+    assert pasta["Food Cost (£)"] == round(0.2 * 0.5 + 0.2 * 5 * 3.0, 2)
+
+def test_costings_change_without_dirty_items_is_still_published(tmp_path):
+    costings = tmp_path / "Bidfood - Product list.csv"
+    costings.write_bytes(fixture_bytes("costings.csv"))
+    _write(tmp_path / "A - recipes.csv", A_RECIPES.format(sauce=1))
+    watcher, model = FolderWatcher(str(tmp_path), debounce=1.0), WatchedModel(str(tmp_path))
+    quiet(model.update, *_flush(watcher, 0))
+    published = model.item_costs
+    before = dict(published)
+
+    # A new product no recipe uses: no result changes, the costings do
+    costings.write_bytes(fixture_bytes("costings.csv") + b"Saffron,40.00,1,g\n")
+    summary = quiet(model.update, *_flush(watcher, 100))
+    assert summary["mode"] == "costings" and summary["recalculated"] == 0
+    assert "Saffron" in set(model.data["costings"]["Ingredient"])
+    assert published == before and model.item_costs is not published
@@ -0,0 +1,95 @@
+import json
+import os
+from collections import defaultdict
+
+# Reviewed recipe-name -> costings-ingredient mapping, built once and reused
+ALIASES_PATH = os.environ.get("FOOD_COST_ALIASES_PATH", "data/ingredient_aliases.json")
+
+def _trigrams(name: str) -> set:
+    """
+    Character trigrams of a padded, lower-cased name.
+    """
+    padded = f"  {name.lower().strip()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_alias_table(recipe_names, costing_names, min_score: float = 0.3) -> dict:
+    """
+    Propose a canonical costings ingredient for each recipe ingredient name.
+
+    Candidates come from a trigram inverted index over the costings names and
+    are ranked by Dice similarity; ties go to the closest length, then to the
+    alphabetically first name, so the same inputs always give the same table.
+
+    Args:
+        recipe_names: Ingredient names used in recipes
+        costing_names: Normalized ingredient names from the costings table
+        min_score: Lowest similarity accepted as a match
+
+    Returns:
+        dict: {recipe_name: {"ingredient": name or None, "score": float, "reviewed": False}}
+    """
+    costing_names = sorted({str(n).lower().strip() for n in costing_names})
+    grams = [_trigrams(n) for n in costing_names]
+
+    index = defaultdict(list)
+    for i, name_grams in enumerate(grams):
+        for gram in name_grams:
+            index[gram].append(i)
+
+    table = {}
+    for name in sorted({str(n).lower().strip() for n in recipe_names}):
+        if not name:
+            continue
+        name_grams = _trigrams(name)
+
+        # Shared trigram counts for every candidate that overlaps at all
+        shared = defaultdict(int)
+        for gram in name_grams:
+            for i in index.get(gram, ()):
+                shared[i] += 1
+
+        best = None
+        for i, count in shared.items():
+            score = 2 * count / (len(name_grams) + len(grams[i]))
+            key = (-score, abs(len(costing_names[i]) - len(name)), costing_names[i])
+            if best is None or key < best[0]:
+                best = (key, i, score)
+
+        if best is not None and best[2] >= min_score:
+            table[name] = {"ingredient": costing_names[best[1]], "score": round(best[2], 3), "reviewed": False}
+        else:
+            table[name] = {"ingredient": None, "score": round(best[2], 3) if best else 0.0, "reviewed": False}
+
+    return table
+
+def load_alias_table(path: str = ALIASES_PATH) -> dict:
+    """
+    Load the stored alias table, or an empty one if none has been saved.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_alias_table(table: dict, path: str = ALIASES_PATH):
+    """
+    Write the alias table atomically so readers never see a partial file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=2, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def alias_lookup(table: dict) -> dict:
+    """
+    Flatten an alias table to {recipe_name: ingredient or None} for matching.
+    Only reviewed entries are used: unreviewed proposals are left to the
+    heuristic until confirmed. A reviewed None target records a confirmed
+    "no match" and also skips fuzzy matching.
+    """
+    return {
+        name: entry.get("ingredient")
+        for name, entry in table.items()
+        if entry.get("reviewed")
+    }
@@ -1,48 +1,80 @@
+import numpy as np
 import pandas as pd
 import re
+from concurrent.futures import ProcessPoolExecutor
+from utils.rollups import GPRollup
 
-def normalize_recipe_columns(df: pd.DataFrame) -> pd.DataFrame:
+# Shared read-only tables for pool workers, set once per process by _init_worker
+_worker_tables = {}
+
+STANDARD_RECIPE_COLUMNS = ["Menu Item", "Brand", "Category", "Ingredients (qty+unit)"]
+
+# Parsed lines of each recipe's ingredients (qty+unit) string, added at parse time
+RECIPE_LINES = "Recipe Lines"
+
+def resolve_recipe_columns(columns) -> dict:
     """
-    Normalize column names in recipes DataFrame to standard names.
+    Map raw recipe headers to standard names.
     
     Args:
-        df: Raw recipes DataFrame
+        columns: Stripped header names
         
     Returns:
-        pd.DataFrame: DataFrame with normalized column names
+        dict: {raw column: standard column}
     """
-    # Clean column names
-    df.columns = df.columns.str.strip()
+    columns = list(columns)
     
     # Map common column name variations to standard names
     column_mapping = {}
     
     # Find menu item column (various names)
-    for col in df.columns:
+    for col in columns:
         if any(word in col.lower() for word in ["menu item", "name", "item"]):
             column_mapping[col] = "Menu Item"
             break
     
     # Find brand column (various names)
-    for col in df.columns:
+    for col in columns:
         if any(word in col.lower() for word in ["brand", "company", "restaurant"]):
             column_mapping[col] = "Brand"
             break
     
     # Find category column (various names)
-    for col in df.columns:
+    for col in columns:
         if any(word in col.lower() for word in ["category", "type", "section"]):
             column_mapping[col] = "Category"
             break
     
     # Find ingredients column (various names)
-    for col in df.columns:
+    for col in columns:
         if any(word in col.lower() for word in ["ingredients", "ingredient", "recipe"]):
             column_mapping[col] = "Ingredients (qty+unit)"
             break
     
+    return column_mapping
+
+def normalize_recipe_columns(df: pd.DataFrame, mapping: dict = None) -> pd.DataFrame:
+    """
+    Normalize column names in recipes DataFrame to standard names.
+    
+    Args:
+        df: Raw recipes DataFrame
+        mapping: Column mapping from resolve_recipe_columns (resolved here if omitted)
+        
+    Returns:
+        pd.DataFrame: DataFrame with normalized column names
+    """
+    # Already normalized (e.g. by parse_recipes): nothing to do
+    if all(col in df.columns for col in STANDARD_RECIPE_COLUMNS):
+        return df
+    
+    # Clean column names
+    df.columns = df.columns.str.strip()
+    
     # Rename columns
-    df = df.rename(columns=column_mapping)
+    if mapping is None:
+        mapping = resolve_recipe_columns(df.columns)
+    df = df.rename(columns=mapping)
     
     # Add default values for missing columns
     if "Brand" not in df.columns:
@@ -56,29 +88,167 @@ def normalize_recipe_columns(df: pd.DataFrame) -> pd.DataFrame:
         
         if ingredient_cols and qty_cols:
             # Create ingredients string from ingredient and qty columns
-            ingredients_list = [[] for _ in range(len(df))]  # Initialize with empty lists for each row
-            
-            for i, ingredient_col in enumerate(ingredient_cols):
-                if i < len(qty_cols):
-                    qty_col = qty_cols[i]
-                    # Get the ingredient name (remove units in parentheses)
-                    ingredient_name = ingredient_col.split('(')[0].strip()
-                    # Get quantity from the qty column
-                    qty_values = df[qty_col].fillna(0)
-                    # Get unit from ingredient column
-                    unit = ingredient_col.split('(')[1].split(')')[0] if '(' in ingredient_col else 'unit'
-                    
-                    # Create ingredient string for each row
-                    for idx, qty in enumerate(qty_values):
-                        if qty > 0:
-                            ingredients_list[idx].append(f"{ingredient_name}: {qty} {unit}")
-            
-            # Join ingredients for each row
-            df["Ingredients (qty+unit)"] = ["; ".join(ingredients) for ingredients in ingredients_list]
+            lines = wide_recipe_lines(df, ingredient_cols, qty_cols)
+            df["Ingredients (qty+unit)"] = join_recipe_lines(lines, len(df))
     
     return df
 
-def calculate_gp(cost_df: pd.DataFrame, rec_df: pd.DataFrame, menu_df: pd.DataFrame = None) -> dict:
+def wide_recipe_lines(df: pd.DataFrame, ingredient_cols: list, qty_cols: list) -> pd.DataFrame:
+    """
+    Convert a wide recipe sheet into one row per (item, ingredient) line.
+    
+    Ingredient columns are paired with qty columns by position; the
+    ingredient name and unit come from the column header ("Cheese (slices)").
+    Only quantities above zero become lines.
+    
+    Args:
+        df: Wide recipes DataFrame
+        ingredient_cols: Ingredient columns, e.g. "Cheese (slices)"
+        qty_cols: Matching quantity columns
+        
+    Returns:
+        pd.DataFrame: "Row" (position in df), "Ingredient", "Quantity" and
+        "Unit" columns, ordered by row then column
+    """
+    pairs = list(zip(ingredient_cols, qty_cols))
+    names = np.array([col.split('(')[0].strip() for col, _ in pairs], dtype=object)
+    units = np.array([col.split('(')[1].split(')')[0] if '(' in col else 'unit' for col, _ in pairs], dtype=object)
+    
+    quantities = df[[qty for _, qty in pairs]]
+    text_cols = [col for col in quantities.columns if not pd.api.types.is_numeric_dtype(quantities[col])]
+    numeric = (quantities.apply(pd.to_numeric, errors="coerce") if text_cols else quantities).to_numpy(dtype=float)
+    
+    # Row-major, so each item's lines keep the column order
+    rows, cols = np.nonzero(numeric > 0)
+    
+    # Take each column's values as they are, so integer columns stay "3", not "3.0"
+    values = np.empty(len(rows), dtype=object)
+    order = np.argsort(cols, kind="stable")
+    bounds = np.searchsorted(cols[order], np.arange(len(pairs) + 1))
+    for j, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        if start < end:
+            hit = order[start:end]
+            values[hit] = quantities.iloc[:, j].to_numpy()[rows[hit]]
+    
+    return pd.DataFrame({
+        "Row": rows,
+        "Ingredient": names[cols],
+        "Quantity": values,
+        "Unit": units[cols],
+    })
+
+def join_recipe_lines(lines: pd.DataFrame, n_rows: int) -> list:
+    """
+    Join recipe lines from wide_recipe_lines into one ingredients (qty+unit)
+    string per row ("" for rows without lines).
+    """
+    tokens = [f"{name}: {qty} {unit}" for name, qty, unit in zip(lines["Ingredient"], lines["Quantity"], lines["Unit"])]
+    bounds = np.searchsorted(lines["Row"].to_numpy(), np.arange(n_rows + 1))
+    return ["; ".join(tokens[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+def parse_recipe_lines(ingredients) -> tuple:
+    """
+    Parse an ingredients (qty+unit) string ("Cheese: 3 slices; Flour: 0.3 kg").
+    
+    Returns:
+        tuple: One (name, key, quantity, unit, error) tuple per token, where
+        key is the lowercased name; a token that doesn't parse keeps the
+        whole token as its name and the reason as its error. None when
+        there are no ingredients.
+    """
+    ingredients_str = str(ingredients)
+    if ingredients_str.strip() == "" or ingredients_str.lower() == "nan":
+        return None
+    
+    lines = []
+    for token in [t.strip() for t in ingredients_str.split(";") if t.strip()]:
+        try:
+            name, qty_unit = token.split(":")
+            qty, unit = re.findall(r"([\d\.]+)\s*([a-zA-Z]+)", qty_unit.strip())[0]
+            lines.append((name, name.strip().lower(), float(qty), unit, None))
+        except Exception as e:
+            lines.append((token, None, None, None, str(e)))
+    return tuple(lines)
+
+def add_recipe_lines(rec_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse every recipe's ingredients string once into a "Recipe Lines"
+    column (see parse_recipe_lines), so calculations read the lines instead
+    of parsing the strings again.
+    """
+    if "Ingredients (qty+unit)" not in rec_df.columns:
+        return rec_df
+    return rec_df.assign(**{RECIPE_LINES: [parse_recipe_lines(value) for value in rec_df["Ingredients (qty+unit)"]]})
+
+def recipe_lines(row: pd.Series) -> tuple:
+    """
+    Parsed ingredient lines of a recipe row, from its "Recipe Lines" when
+    parsed at load time, otherwise from its ingredients string.
+    """
+    lines = row.get(RECIPE_LINES)
+    if isinstance(lines, tuple):
+        return lines
+    return parse_recipe_lines(row.get("Ingredients (qty+unit)", ""))
+
+def explode_recipe_lines(rec_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Explode normalized recipes into one row per ingredient line.
+    
+    Args:
+        rec_df: Recipes DataFrame with an "Ingredients (qty+unit)" column
+        
+    Returns:
+        pd.DataFrame: Menu Item, Brand, Category, Ingredient, Quantity (float)
+        and Unit columns, for the lines the calculator costs (tokens that
+        don't parse as "name: qty unit" are dropped)
+    """
+    rec_df = normalize_recipe_columns(rec_df.copy())
+    records = [
+        (item, brand, category, name.strip(), qty, unit)
+        for item, brand, category, (_, row) in zip(rec_df["Menu Item"], rec_df["Brand"], rec_df["Category"], rec_df.iterrows())
+        for name, _, qty, unit, error in recipe_lines(row) or ()
+        if error is None
+    ]
+    return pd.DataFrame.from_records(records, columns=["Menu Item", "Brand", "Category", "Ingredient", "Quantity", "Unit"])
+
+def recipe_ingredient_names(rec_df: pd.DataFrame) -> list:
+    """
+    List the distinct ingredient names used in recipe ingredient strings.
+    """
+    rec_df = normalize_recipe_columns(rec_df.copy())
+    names = set()
+    for ingredients_str in rec_df["Ingredients (qty+unit)"].dropna().astype(str):
+        for token in ingredients_str.split(";"):
+            if ":" in token:
+                names.add(token.split(":")[0].strip().lower())
+    # Batch recipes are referenced by name, not matched against the costings
+    if "Batch Yield" in rec_df.columns:
+        names -= set(rec_df.loc[pd.to_numeric(rec_df["Batch Yield"], errors="coerce") > 0, "Menu Item"].astype(str).str.lower().str.strip())
+    return sorted(n for n in names if n)
+
+def compile_alias_costs(aliases: dict, cost_df: pd.DataFrame) -> dict:
+    """
+    Resolve alias targets to unit costs once per calculation.
+    
+    Args:
+        aliases: {recipe_name: costings ingredient or None} from the alias table
+        cost_df: Costings DataFrame with unit costs
+        
+    Returns:
+        dict: {recipe_name: unit cost, or None for a confirmed no-match}.
+        Aliases whose target is no longer in the costings are left out so
+        those names fall back to fuzzy matching.
+    """
+    unit_costs = cost_df.drop_duplicates("Ingredient_norm").set_index("Ingredient_norm")["UnitCost"].to_dict()
+    alias_costs = {}
+    for name, target in aliases.items():
+        if target is None:
+            alias_costs[name] = None
+        elif target in unit_costs:
+            alias_costs[name] = unit_costs[target]
+    return alias_costs
+
+def calculate_gp(cost_df: pd.DataFrame, rec_df: pd.DataFrame, menu_df: pd.DataFrame = None, aliases: dict = None, variants_df: pd.DataFrame = None, rollup: GPRollup = None, known_costs: dict = None) -> dict:
     """
     Calculate gross profit for all menu items, grouped by brand.
     
@@ -86,23 +256,41 @@ def calculate_gp(cost_df: pd.DataFrame, rec_df: pd.DataFrame, menu_df: pd.DataFr
         cost_df: Costings DataFrame with unit costs
         rec_df: Recipes DataFrame with ingredient quantities
         menu_df: Menu prices DataFrame (optional)
+        aliases: Stored {recipe_name: costings ingredient} table (optional);
+            aliased names skip fuzzy matching
+        variants_df: Item variants DataFrame (optional); each variant costs
+            as its base item plus a delta recipe
+        rollup: GPRollup to update with every item added to the results (optional)
+        known_costs: {menu item: food cost} of items costed earlier (optional);
+            meal deals can reference them, and it is updated in place with
+            every item and variant costed here
+        
+    Recipes with a "Batch Yield" are batch (prep) recipes: they are costed
+    once per unit of output and used by name like an ingredient, and are
+    not menu items themselves. A "Yield" fraction on a recipe divides its
+    food cost.
         
     Returns:
         dict: Results grouped by brand with food costs and GP calculations
     """
     all_results = []
-    calculated_items = {}  # Store calculated costs for meal deals
+    calculated_items = known_costs if known_costs is not None else {}  # Store calculated costs for meal deals
+    alias_costs = compile_alias_costs(aliases, cost_df) if aliases else None
     
     # Normalize column names in recipes DataFrame
     rec_df = normalize_recipe_columns(rec_df)
     
+    # Batch recipes are costed once up front, then looked up by every item using them
+    rec_df, batch_costs, batch_notes = cost_batches(rec_df, cost_df, alias_costs)
+    
     # First pass: Calculate individual items (non-meal deals)
     individual_items = rec_df[~rec_df["Menu Item"].str.contains("Meal:", na=False)]
     meal_items = rec_df[rec_df["Menu Item"].str.contains("Meal:", na=False)]
     
     # Process individual items first
     for _, row in individual_items.iterrows():
-        fc, notes = calc_item_cost(row, cost_df)
+        fc, notes = calc_item_cost(row, cost_df, alias_costs=alias_costs, batch_costs=batch_costs, batch_notes=batch_notes)
+        fc = fc / item_yield(row)
         
         # Get selling price
         sp = 0
@@ -111,27 +299,54 @@ def calculate_gp(cost_df: pd.DataFrame, rec_df: pd.DataFrame, menu_df: pd.DataFr
             if not price_match.empty:
                 sp = price_match.iloc[0]["Selling Price (£)"]
         
-        # Calculate GP
-        gp = sp - fc if sp else 0
-        gp_pct = (gp / sp * 100) if sp else 0
-        
-        result = {
-            "Brand": row.get("Brand", ""),
-            "Menu Item": row["Menu Item"],
-            "Category": row.get("Category", ""),
-            "Food Cost (£)": round(fc, 2),
-            "Selling Price (£)": round(sp, 2),
-            "GP £": round(gp, 2),
-            "GP %": round(gp_pct, 1),
-            "Notes": "; ".join(notes) if notes else ""
-        }
-        
-        all_results.append(result)
+        all_results.append(result_record(row.get("Brand", ""), row["Menu Item"], row.get("Category", ""), fc, sp, notes))
         calculated_items[row["Menu Item"]] = fc  # Store for meal deals
     
+    # Variants: reuse the base item's cost computed above and add only the delta
+    if variants_df is not None and not variants_df.empty:
+        base_items = {row["Menu Item"].lower(): row for _, row in individual_items.iterrows()}
+        base_costs = {name.lower(): calculated_items[name] for name in individual_items["Menu Item"]}
+        delta_costs = {}  # Many variants share the same delta (e.g. a sauce)
+        
+        for _, var in variants_df.iterrows():
+            # A full recipe with the same name takes precedence
+            if var["Menu Item"].lower() in base_costs:
+                continue
+            
+            base_key = str(var["Base Item"]).lower().strip()
+            base = base_items.get(base_key)
+            notes = []
+            base_fc = base_costs.get(base_key)
+            if base_fc is None:
+                base_fc = 0
+                notes.append(f"ASSUMED: unknown base item {var['Base Item']}")
+            
+            delta = var.get("Delta Ingredients", "")
+            if delta.strip():
+                if delta not in delta_costs:
+                    delta_costs[delta] = calc_item_cost(pd.Series({"Ingredients (qty+unit)": delta}), cost_df, alias_costs=alias_costs, batch_costs=batch_costs, batch_notes=batch_notes)
+                delta_fc, delta_notes = delta_costs[delta]
+                notes.extend(delta_notes)
+            else:
+                delta_fc = 0
+            fc = base_fc + delta_fc
+            
+            # Variant price from the variants sheet, else from the menu
+            sp = var["Selling Price (£)"] if pd.notna(var["Selling Price (£)"]) else 0
+            if not sp and menu_df is not None and not menu_df.empty:
+                price_match = menu_df[menu_df["Menu Item"].str.lower() == var["Menu Item"].lower()]
+                if not price_match.empty:
+                    sp = price_match.iloc[0]["Selling Price (£)"]
+            
+            # Variants of an unknown base are still listed (under "Unknown"), with the note above
+            brand = var.get("Brand") if pd.notna(var.get("Brand")) else (base.get("Brand", "") if base is not None else "Unknown")
+            category = var.get("Category") if pd.notna(var.get("Category")) else (base.get("Category", "") if base is not None else "Unknown")
+            all_results.append(result_record(brand, var["Menu Item"], category, fc, sp, notes))
+            calculated_items[var["Menu Item"]] = fc  # Meal deals can reference variants
+    
     # Second pass: Calculate meal deals using individual item costs
     for _, row in meal_items.iterrows():
-        fc, notes = calc_item_cost(row, cost_df, calculated_items)
+        fc, notes = calc_item_cost(row, cost_df, calculated_items, alias_costs, batch_costs, batch_notes)
         
         # Get selling price
         sp = 0
@@ -140,34 +355,194 @@ def calculate_gp(cost_df: pd.DataFrame, rec_df: pd.DataFrame, menu_df: pd.DataFr
             if not price_match.empty:
                 sp = price_match.iloc[0]["Selling Price (£)"]
         
-        # Calculate GP
-        gp = sp - fc if sp else 0
-        gp_pct = (gp / sp * 100) if sp else 0
-        
-        all_results.append({
-            "Brand": row.get("Brand", ""),
-            "Menu Item": row["Menu Item"],
-            "Category": row.get("Category", ""),
-            "Food Cost (£)": round(fc, 2),
-            "Selling Price (£)": round(sp, 2),
-            "GP £": round(gp, 2),
-            "GP %": round(gp_pct, 1),
-            "Notes": "; ".join(notes) if notes else ""
-        })
-    
-    # Group results by brand
-    results_df = pd.DataFrame(all_results)
+        all_results.append(result_record(row.get("Brand", ""), row["Menu Item"], row.get("Category", ""), fc, sp, notes))
+    
+    # Group results by brand (in order of first appearance) without a DataFrame round trip
     brand_groups = {}
+    for result in all_results:
+        brand = result["Brand"]
+        if pd.notna(brand) and str(brand).strip():
+            brand_groups.setdefault(brand, []).append(result)
     
-    if not results_df.empty:
-        for brand in results_df["Brand"].unique():
-            if pd.notna(brand) and brand.strip():
-                brand_data = results_df[results_df["Brand"] == brand]
-                brand_groups[brand] = brand_data.to_dict(orient="records")
+    if rollup is not None:
+        for brand_items in brand_groups.values():
+            for item in brand_items:
+                rollup.add(item)
     
     return brand_groups
 
-def calc_item_cost(row: pd.Series, cost_df: pd.DataFrame, calculated_items: dict = None) -> tuple[float, list]:
+def item_yield(row: pd.Series) -> float:
+    """
+    Usable yield of a recipe as a fraction (1 when not given).
+    """
+    value = row.get("Yield")
+    return value if pd.notna(value) and value > 0 else 1.0
+
+def is_batch_recipe(rec_df: pd.DataFrame) -> pd.Series:
+    """
+    Mask of batch (prep) recipe rows: those with a positive Batch Yield.
+    """
+    if "Batch Yield" not in rec_df.columns:
+        return pd.Series(False, index=rec_df.index)
+    return pd.to_numeric(rec_df["Batch Yield"], errors="coerce") > 0
+
+def cost_batches(rec_df: pd.DataFrame, cost_df: pd.DataFrame, alias_costs: dict = None) -> tuple:
+    """
+    Split out batch (prep) recipes and cost each one per unit of output.
+    
+    A batch (e.g. 10 L of sauce) is costed once from its ingredients and
+    divided by its Batch Yield; menu items then use it by name like an
+    ingredient ("House Sauce: 0.05 liter"). Batches may use other batches;
+    circular references fall back to the costings.
+    
+    Args:
+        rec_df: Normalized recipes DataFrame
+        cost_df: Costings DataFrame with unit costs
+        alias_costs: Precompiled {recipe_name: unit cost} from compile_alias_costs
+        
+    Returns:
+        tuple: (recipes without batch rows, {batch name: cost per unit} or None,
+        {batch name: notes from costing it} or None)
+    """
+    batch_mask = is_batch_recipe(rec_df)
+    if not batch_mask.any():
+        return rec_df, None, None
+    
+    batches = {}
+    for _, row in rec_df[batch_mask].iterrows():
+        batches[str(row["Menu Item"]).lower().strip()] = row
+    batch_costs = {}
+    batch_notes = {}
+    
+    def resolve(name: str, path: set):
+        row = batches[name]
+        # Cost the batches this one uses first
+        for _, ref, _, _, _ in recipe_lines(row) or ():
+            if ref in batches and ref not in batch_costs and ref not in path:
+                resolve(ref, path | {name})
+        fc, notes = calc_item_cost(row, cost_df, alias_costs=alias_costs, batch_costs=batch_costs, batch_notes=batch_notes)
+        # Reported on the items that use the batch
+        if notes:
+            batch_notes[name] = [f"{row['Menu Item']}: {note}" for note in notes]
+        batch_costs[name] = fc / item_yield(row) / float(row["Batch Yield"])
+    
+    for name in batches:
+        if name not in batch_costs:
+            resolve(name, set())
+    
+    return rec_df[~batch_mask], batch_costs, batch_notes
+
+def _native(value):
+    """Unwrap numpy scalars so results hold plain Python values."""
+    return value.item() if hasattr(value, "item") else value
+
+def result_record(brand, menu_item, category, fc: float, sp: float, notes: list) -> dict:
+    """
+    Build one result record with plain Python types (floats for money and
+    GP %), so results serialize without per-field conversion.
+    """
+    fc = float(fc)
+    sp = float(sp) if sp else 0.0
+    
+    # Calculate GP
+    gp = sp - fc if sp else 0.0
+    gp_pct = (gp / sp * 100) if sp else 0.0
+    
+    return {
+        "Brand": _native(brand),
+        "Menu Item": _native(menu_item),
+        "Category": _native(category),
+        "Food Cost (£)": round(fc, 2),
+        "Selling Price (£)": round(sp, 2),
+        "GP £": round(gp, 2),
+        "GP %": round(gp_pct, 1),
+        "Notes": "; ".join(notes) if notes else ""
+    }
+
+def _init_worker(cost_df: pd.DataFrame, menu_df: pd.DataFrame, aliases: dict):
+    """
+    Pool initializer: receive the costings, menu and alias tables once per
+    worker instead of once per brand partition.
+    """
+    _worker_tables["costings"] = cost_df
+    _worker_tables["menu"] = menu_df
+    _worker_tables["aliases"] = aliases
+
+def _calculate_partition(partition: tuple) -> tuple:
+    """
+    Cost one brand partition (recipes, variants) against the worker's shared tables.
+    
+    Returns:
+        tuple: (brand_groups, GPRollup, item costs) for the partition
+    """
+    rec_df, variants_df = partition
+    rollup = GPRollup()
+    item_costs = {}
+    brand_groups = calculate_gp(_worker_tables["costings"], rec_df, _worker_tables["menu"], _worker_tables["aliases"], variants_df, rollup, item_costs)
+    return brand_groups, rollup, item_costs
+
+def calculate_gp_parallel(cost_df: pd.DataFrame, rec_df: pd.DataFrame, menu_df: pd.DataFrame = None, aliases: dict = None, variants_df: pd.DataFrame = None, rollup: GPRollup = None, max_workers: int = None, known_costs: dict = None) -> dict:
+    """
+    Calculate gross profit with each brand costed in a separate process.
+    
+    Brands are independent apart from the shared costings and menu tables,
+    which are sent to each worker once. Meal deals can only reference
+    items from their own brand in this mode.
+    
+    Args:
+        cost_df: Costings DataFrame with unit costs
+        rec_df: Recipes DataFrame with ingredient quantities
+        menu_df: Menu prices DataFrame (optional)
+        aliases: Stored {recipe_name: costings ingredient} table (optional)
+        variants_df: Item variants DataFrame (optional), sent with the
+            partition that holds each variant's base item
+        rollup: GPRollup that the per-partition rollups are merged into (optional)
+        max_workers: Number of worker processes (defaults to CPU count)
+        known_costs: Dict updated in place with every item and variant cost (optional)
+        
+    Returns:
+        dict: Results grouped by brand, same shape as calculate_gp
+    """
+    rec_df = normalize_recipe_columns(rec_df)
+    
+    # Batch recipes can be used by any brand, so every partition gets them
+    batch_mask = is_batch_recipe(rec_df)
+    batch_rows = rec_df[batch_mask]
+    # Recipes without a brand are costed too (their results are left out, as
+    # in calculate_gp), so variants and known_costs see them
+    groups = [group for _, group in rec_df[~batch_mask].groupby("Brand", sort=False, dropna=False)]
+    
+    # Nothing to split; avoid the process start-up cost
+    if len(groups) < 2:
+        return calculate_gp(cost_df, rec_df, menu_df, aliases, variants_df, rollup, known_costs)
+    
+    # Each variant goes with its base item's brand (unknown bases with the first)
+    variant_parts = [None] * len(groups)
+    if variants_df is not None and not variants_df.empty:
+        base_partition = {}
+        for i, group in enumerate(groups):
+            for name in group["Menu Item"].str.lower():
+                base_partition.setdefault(name, i)
+        owner = variants_df["Base Item"].astype(str).str.lower().str.strip().map(base_partition).fillna(0)
+        variant_parts = [variants_df[owner == i] for i in range(len(groups))]
+    if not batch_rows.empty:
+        groups = [pd.concat([group, batch_rows]) for group in groups]
+    partitions = list(zip(groups, variant_parts))
+    
+    brand_groups = {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(cost_df, menu_df, aliases)) as pool:
+        for partial_groups, partial_rollup, partial_costs in pool.map(_calculate_partition, partitions):
+            # Variants of unknown bases can add to a brand ("Unknown") of another partition
+            for brand, items in partial_groups.items():
+                brand_groups.setdefault(brand, []).extend(items)
+            if rollup is not None:
+                rollup.merge(partial_rollup)
+            if known_costs is not None:
+                known_costs.update(partial_costs)
+    
+    return brand_groups
+
+def calc_item_cost(row: pd.Series, cost_df: pd.DataFrame, calculated_items: dict = None, alias_costs: dict = None, batch_costs: dict = None, batch_notes: dict = None) -> tuple[float, list]:
     """
     Calculate the total food cost for a single menu item.
     
@@ -175,47 +550,172 @@ def calc_item_cost(row: pd.Series, cost_df: pd.DataFrame, calculated_items: dict
         row: Recipe row with ingredients
         cost_df: Costings DataFrame with unit costs
         calculated_items: Dictionary of already calculated menu item costs (for meal deals)
+        alias_costs: Precompiled {recipe_name: unit cost} from compile_alias_costs
+        batch_costs: {batch recipe name: cost per unit} from cost_batches
+        batch_notes: {batch recipe name: notes} from cost_batches, added to the notes of items using them
         
     Returns:
         tuple: (total_cost, notes_list)
     """
-    ingredients_str = str(row["Ingredients (qty+unit)"])
     total_cost = 0
     notes = []
     
-    # Handle empty or NaN ingredients
-    if pd.isna(ingredients_str) or ingredients_str.strip() == "" or ingredients_str.lower() == "nan":
+    # Lines are parsed once with the recipes (see add_recipe_lines)
+    lines = recipe_lines(row)
+    if lines is None:
         return total_cost, ["No ingredients specified"]
     
-    # Parse each ingredient
-    for token in [t.strip() for t in ingredients_str.split(";") if t.strip()]:
-        try:
-            name, qty_unit = token.split(":")
-            qty, unit = re.findall(r"([\d\.]+)\s*([a-zA-Z]+)", qty_unit.strip())[0]
-            qty = float(qty)
-            
-            # First, try to find as a direct ingredient
+    for name, alias_key, qty, unit, error in lines:
+        if error is not None:
+            notes.append(f"ASSUMED: {name} ({error})")
+            continue
+        
+        # Batches and stored aliases are exact lookups; only unknown names are fuzzy matched
+        if batch_costs is not None and alias_key in batch_costs:
+            unit_cost = batch_costs[alias_key]
+            if batch_notes and alias_key in batch_notes:
+                notes.extend(note for note in batch_notes[alias_key] if note not in notes)
+        elif alias_costs is not None and alias_key in alias_costs:
+            unit_cost = alias_costs[alias_key]
+        else:
             ing_match = find_ingredient_match(name.strip(), cost_df)
-            
-            if not ing_match.empty:
-                unit_cost = ing_match.iloc[0]["UnitCost"]
-                total_cost += qty * unit_cost
-            elif calculated_items is not None:
-                # Try to find as a menu item (for meal deals)
-                menu_item_cost = find_menu_item_cost(name.strip(), calculated_items)
-                if menu_item_cost is not None:
-                    total_cost += qty * menu_item_cost
-                    notes.append(f"REFERENCED: {name} (menu item cost: £{menu_item_cost:.2f})")
-                else:
-                    notes.append(f"ASSUMED: no match for {name}")
+            unit_cost = None if ing_match.empty else ing_match.iloc[0]["UnitCost"]
+        
+        if unit_cost is not None:
+            total_cost += qty * unit_cost
+        elif calculated_items is not None:
+            # Try to find as a menu item (for meal deals)
+            menu_item_cost = find_menu_item_cost(name.strip(), calculated_items)
+            if menu_item_cost is not None:
+                total_cost += qty * menu_item_cost
+                notes.append(f"REFERENCED: {name} (menu item cost: £{menu_item_cost:.2f})")
             else:
                 notes.append(f"ASSUMED: no match for {name}")
-                
-        except Exception as e:
-            notes.append(f"ASSUMED: {token} ({e})")
+        else:
+            notes.append(f"ASSUMED: no match for {name}")
     
     return total_cost, notes
 
+def _add_usage(usage: dict, source: dict, scale: float):
+    for name, qty in source.items():
+        usage[name] = usage.get(name, 0.0) + qty * scale
+
+def _ingredients_usage(lines: tuple, cost_df: pd.DataFrame, alias_targets: dict, batch_usage: dict, item_usage: dict = None) -> dict:
+    """
+    Costings rows used by parsed ingredient lines, resolved in the
+    same order as calc_item_cost: batches, stored aliases, fuzzy matches,
+    then (for meal deals) other menu items.
+
+    Returns:
+        dict: {Ingredient_norm: quantity}
+    """
+    usage = {}
+    for name, key, qty, unit, error in lines or ():
+        if error is not None:
+            continue
+
+        if batch_usage is not None and key in batch_usage:
+            _add_usage(usage, batch_usage[key], qty)
+            continue
+        if alias_targets is not None and key in alias_targets:
+            target = alias_targets[key]
+        else:
+            ing_match = find_ingredient_match(name.strip(), cost_df)
+            target = None if ing_match.empty else ing_match.iloc[0]["Ingredient_norm"]
+
+        if target is not None:
+            _add_usage(usage, {target: 1.0}, qty)
+        elif item_usage is not None:
+            referenced = find_menu_item_cost(name.strip(), item_usage)
+            if referenced is not None:
+                _add_usage(usage, referenced, qty)
+
+    return usage
+
+def ingredient_usage(cost_df: pd.DataFrame, rec_df: pd.DataFrame, aliases: dict = None, variants_df: pd.DataFrame = None) -> dict:
+    """
+    Express every costed item as quantities of costings rows.
+
+    Food costs are linear in unit costs: an item costs the sum of
+    quantity × unit cost over its usage, with batches, yields, variants and
+    meal deals already folded in. Ingredient matching does not depend on
+    prices, so the usage stays valid for any set of prices over the same
+    catalogue and can re-cost the menu with one matrix product.
+
+    Args:
+        cost_df: Costings DataFrame with unit costs
+        rec_df: Recipes DataFrame with ingredient quantities
+        aliases: Stored {recipe_name: costings ingredient} table (optional)
+        variants_df: Item variants DataFrame (optional)
+
+    Returns:
+        dict: {menu item: {Ingredient_norm: quantity}}, for the same items
+        (and with the same name lookups) as calculate_gp
+    """
+    alias_targets = None
+    if aliases:
+        names = set(cost_df["Ingredient_norm"])
+        alias_targets = {name: target for name, target in aliases.items() if target is None or target in names}
+
+    rec_df = normalize_recipe_columns(rec_df)
+
+    # Batches per unit of output, using earlier batches like cost_batches
+    batch_mask = is_batch_recipe(rec_df)
+    batch_usage = None
+    if batch_mask.any():
+        batches = {str(row["Menu Item"]).lower().strip(): row for _, row in rec_df[batch_mask].iterrows()}
+        batch_usage = {}
+
+        def resolve(name: str, path: set):
+            row = batches[name]
+            for _, ref, _, _, _ in recipe_lines(row) or ():
+                if ref in batches and ref not in batch_usage and ref not in path:
+                    resolve(ref, path | {name})
+            usage = _ingredients_usage(recipe_lines(row), cost_df, alias_targets, batch_usage)
+            batch_usage[name] = {key: qty / item_yield(row) / float(row["Batch Yield"]) for key, qty in usage.items()}
+
+        for name in batches:
+            if name not in batch_usage:
+                resolve(name, set())
+        rec_df = rec_df[~batch_mask]
+
+    is_meal = rec_df["Menu Item"].str.contains("Meal:", na=False)
+    individual_items = rec_df[~is_meal]
+
+    item_usage = {}
+    for _, row in individual_items.iterrows():
+        usage = _ingredients_usage(recipe_lines(row), cost_df, alias_targets, batch_usage)
+        item_usage[row["Menu Item"]] = {key: qty / item_yield(row) for key, qty in usage.items()}
+
+    if variants_df is not None and not variants_df.empty:
+        base_usage = {name.lower(): item_usage[name] for name in individual_items["Menu Item"]}
+        delta_usage = {}
+        for _, var in variants_df.iterrows():
+            if var["Menu Item"].lower() in base_usage:
+                continue
+            usage = dict(base_usage.get(str(var["Base Item"]).lower().strip(), {}))
+            delta = var.get("Delta Ingredients", "")
+            if delta.strip():
+                if delta not in delta_usage:
+                    delta_usage[delta] = _ingredients_usage(parse_recipe_lines(delta), cost_df, alias_targets, batch_usage)
+                _add_usage(usage, delta_usage[delta], 1.0)
+            item_usage[var["Menu Item"]] = usage
+
+    # Meal deals reference the items and variants above, but not each other
+    meal_usage = {}
+    for _, row in rec_df[is_meal].iterrows():
+        meal_usage[row["Menu Item"]] = _ingredients_usage(recipe_lines(row), cost_df, alias_targets, batch_usage, item_usage)
+    item_usage.update(meal_usage)
+    return item_usage
+
+def usage_costs(item_usage: dict, cost_df: pd.DataFrame) -> dict:
+    """
+    Price ingredient usage: {menu item: {Ingredient_norm: quantity}} becomes
+    {menu item: {Ingredient_norm: cost}}, summing to each item's food cost.
+    """
+    unit_costs = cost_df.drop_duplicates("Ingredient_norm").set_index("Ingredient_norm")["UnitCost"].to_dict()
+    return {item: {name: qty * unit_costs[name] for name, qty in usage.items()} for item, usage in item_usage.items()}
+
 def find_ingredient_match(name: str, cost_df: pd.DataFrame) -> pd.DataFrame:
     """
     Find ingredient match using fuzzy matching for partial names.
@@ -1,5 +1,13 @@
-import pandas as pd
-import io
+from utils.readers import read_headers
+
+# Function keywords recognised in "Brand Name - Function" file and sheet names
+NAME_KEYWORDS = ["variant", "recipe", "product", "ingredient", "costing", "cost", "menu"]
+
+def has_type_hint(name: str) -> bool:
+    """
+    Check whether a file or sheet name contains a function keyword.
+    """
+    return any(word in name.lower() for word in NAME_KEYWORDS)
 
 def detect_file_type(content: bytes, filename: str = None) -> str:
     """
@@ -10,24 +18,48 @@ def detect_file_type(content: bytes, filename: str = None) -> str:
     - "SMSH BN - recipes" -> recipes
     - "SMSH BN - menu" -> menu  
     - "SMSH BN - Product list" -> costings
+    - "SMSH BN - variants" -> variants
     
     Args:
         content: Raw file content as bytes
         filename: Filename for pattern detection
         
     Returns:
-        str: File type ('costings', 'recipes', 'menu', or 'unknown')
+        str: File type ('costings', 'recipes', 'menu', 'variants', or 'unknown')
     """
     if not filename:
         print("No filename provided, falling back to content detection")
         return _detect_by_content(content)
     
+    return _detect_by_name(filename, lambda: _detect_by_content(content))
+
+def detect_sheet_type(sheet_name: str, columns: list) -> str:
+    """
+    Detect the type of a workbook sheet from its name and header row.
+    
+    Args:
+        sheet_name: Sheet (tab) name, e.g. "Product list" or "recipes"
+        columns: Header row values
+        
+    Returns:
+        str: File type ('costings', 'recipes', 'menu', 'variants', or 'unknown')
+    """
+    return _detect_by_name(sheet_name, lambda: detect_by_headers(columns))
+
+def _detect_by_name(filename: str, detect_content) -> str:
+    """
+    Detect the type from a file or sheet name, calling detect_content()
+    when the name is ambiguous or doesn't match the expected pattern.
+    """
     # Normalize filename for pattern matching
     filename_lower = filename.lower().strip()
     print(f"Analyzing filename: {filename}")
     
     # Check for function keywords in filename
-    if "recipe" in filename_lower:
+    if "variant" in filename_lower:
+        print("Detected as: variants (filename pattern)")
+        return "variants"
+    elif "recipe" in filename_lower:
         print("Detected as: recipes (filename pattern)")
         return "recipes"
     elif any(word in filename_lower for word in ["product", "ingredient", "costing", "cost"]):
@@ -36,7 +68,7 @@ def detect_file_type(content: bytes, filename: str = None) -> str:
     elif "menu" in filename_lower:
         # For menu files, check content to see if it's actually recipes
         print("Filename suggests menu, checking content...")
-        content_result = _detect_by_content(content)
+        content_result = detect_content()
         if content_result == "recipes":
             print("Content indicates recipes, overriding filename")
             return "recipes"
@@ -46,30 +78,34 @@ def detect_file_type(content: bytes, filename: str = None) -> str:
     
     # Fallback to content detection if filename doesn't match pattern
     print("Filename doesn't match expected pattern, falling back to content detection")
-    return _detect_by_content(content)
+    return detect_content()
 
 def _detect_by_content(content: bytes) -> str:
     """
     Fallback detection based on file content and column headers.
     """
-    try:
-        # Try CSV first
-        df = pd.read_csv(io.BytesIO(content))
-    except Exception as e:
-        try:
-            # Try Excel if CSV fails
-            df = pd.read_excel(io.BytesIO(content))
-        except Exception as e2:
-            print(f"Failed to read file: CSV error: {e}, Excel error: {e2}")
-            return "unknown"
-    
+    # Only the header row is needed, so skip parsing the data rows
+    columns = read_headers(content)
+    if columns is None:
+        return "unknown"
+    return detect_by_headers(columns)
+
+def detect_by_headers(columns: list) -> str:
+    """
+    Detect the type from a header row.
+    """
     # Normalize column headers
-    headers = [h.strip().lower() for h in df.columns]
+    headers = [str(h).strip().lower() for h in columns if h is not None]
     print(f"Detected headers: {headers}")
     
     # Detection logic based on column patterns
+    # Variants: base item + variant name
+    if any("base item" in h for h in headers) and any("variant" in h for h in headers):
+        print("Detected as: variants")
+        return "variants"
+    
     # Costings: ingredient + pack size + price
-    if ("ingredient" in headers or "ingredients" in headers) and ("pack size" in headers or "packsize" in headers or "pack_size" in headers):
+    elif ("ingredient" in headers or "ingredients" in headers) and ("pack size" in headers or "packsize" in headers or "pack_size" in headers):
         print("Detected as: costings")
         return "costings"
     
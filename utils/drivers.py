@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+def _top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest values, largest first, via a partial sort."""
+    if len(values) > k:
+        top = np.argpartition(-values, k - 1)[:k]
+    else:
+        top = np.arange(len(values))
+    return top[np.argsort(-values[top], kind="stable")]
+
+class CostBreakdown:
+    """
+    Item × ingredient food cost contributions, stored as coordinate arrays
+    (item, ingredient, £) holding only the ingredients each item uses.
+
+    Args:
+        brand_groups: Results from calculate_gp
+        breakdown: {menu item: {Ingredient_norm: £}} from usage_costs
+        cost_df: Costings, for the ingredients' display names
+        weights: Optional {normalized menu item: units sold}; exposure is
+            weighted by it instead of counting every item once
+    """
+    def __init__(self, brand_groups: dict, breakdown: dict, cost_df: pd.DataFrame, weights: dict = None):
+        self.records = [item for items in brand_groups.values() for item in items]
+        names = cost_df.drop_duplicates("Ingredient_norm").set_index("Ingredient_norm")["Ingredient"].astype(str).to_dict()
+
+        rows, cols, values = [], [], []
+        column = {}
+        for i, item in enumerate(self.records):
+            for ingredient, cost in breakdown.get(item["Menu Item"], {}).items():
+                if cost:
+                    rows.append(i)
+                    cols.append(column.setdefault(ingredient, len(column)))
+                    values.append(cost)
+        self.ingredients = [names.get(ingredient, ingredient) for ingredient in column]
+        self.rows = np.array(rows, dtype=np.int64)
+        self.cols = np.array(cols, dtype=np.int64)
+        self.values = np.array(values, dtype=float)
+
+        # Row boundaries: entries were added item by item
+        self.indptr = np.searchsorted(self.rows, np.arange(len(self.records) + 1))
+        brands = pd.factorize(pd.Series([item["Brand"] for item in self.records], dtype=object))
+        self.brand_codes, self.brands = brands[0], list(brands[1])
+
+        if weights:
+            self.weights = np.array([weights.get(str(item["Menu Item"]).strip().lower(), 0.0) for item in self.records], dtype=float)
+            self.weighted_by = "sales"
+        else:
+            self.weights = np.ones(len(self.records))
+            self.weighted_by = "items"
+
+    def _drivers(self, positions: np.ndarray, totals: np.ndarray, total: float) -> list:
+        return [
+            {"ingredient": self.ingredients[col], "cost": round(float(totals[col]), 4), "share_pct": round(float(totals[col] / total * 100), 2) if total else 0.0}
+            for col in positions
+        ]
+
+    def item_drivers(self, k: int) -> list:
+        """Top k ingredients of every item by cost."""
+        drivers = []
+        for i, item in enumerate(self.records):
+            start, end = self.indptr[i], self.indptr[i + 1]
+            values = self.values[start:end]
+            top = _top_k(values, k)
+            total = values.sum()
+            drivers.append({
+                "brand": item["Brand"],
+                "item": item["Menu Item"],
+                "food_cost": item["Food Cost (£)"],
+                "drivers": [
+                    {"ingredient": self.ingredients[self.cols[start + j]], "cost": round(float(values[j]), 4), "share_pct": round(float(values[j] / total * 100), 2) if total else 0.0}
+                    for j in top
+                ],
+            })
+        return drivers
+
+    def brand_drivers(self, k: int) -> dict:
+        """Top k ingredients of every brand by cost summed over its items (one of each)."""
+        n = len(self.ingredients)
+        totals = np.bincount(self.brand_codes[self.rows] * n + self.cols, weights=self.values, minlength=len(self.brands) * n).reshape(len(self.brands), n)
+        return {brand: self._drivers(_top_k(totals[b], k), totals[b], totals[b].sum()) for b, brand in enumerate(self.brands)}
+
+    def exposure(self) -> list:
+        """
+        Estate-wide cost per ingredient, weighted by units sold when sales
+        are loaded, with how much GP a 10% price rise would take. Largest first.
+        """
+        weighted = self.values * self.weights[self.rows]
+        totals = np.bincount(self.cols, weights=weighted, minlength=len(self.ingredients))
+        items = np.bincount(self.cols, minlength=len(self.ingredients))
+        total = totals.sum()
+        order = np.argsort(-totals, kind="stable")
+        return [
+            {
+                "ingredient": self.ingredients[col],
+                "cost": round(float(totals[col]), 2),
+                "share_pct": round(float(totals[col] / total * 100), 2) if total else 0.0,
+                "items": int(items[col]),
+                "gp_at_10pct_rise": round(float(totals[col] * 0.1), 2),
+            }
+            for col in order
+        ]
+
+    def report(self, k: int = 5) -> dict:
+        """Top-k drivers per item, per brand and estate-wide, plus exposure."""
+        exposure = self.exposure()
+        return {
+            "k": k,
+            "weighted_by": self.weighted_by,
+            "estate": exposure[:k],
+            "brands": self.brand_drivers(k),
+            "items": self.item_drivers(k),
+            "exposure": exposure,
+        }
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Append-only store of past calculations, one compressed columnar file per version
+HISTORY_DIR = os.environ.get("FOOD_COST_HISTORY_DIR", "data/history")
+
+WEEK_SECONDS = 7 * 24 * 3600
+
+class HistoryStore:
+    """
+    Versioned snapshots of calculation results with trend queries.
+
+    Each snapshot is an .npz file of column arrays (brand, item, category,
+    food cost, price, GP £, GP %) and is listed in manifest.jsonl, which is
+    only ever appended to. Snapshots are loaded once, with per-item row
+    indexes and per-brand averages, so queries never touch old uploads
+    again; a new snapshot is indexed on its own, without regrouping the
+    history before it.
+    """
+    def __init__(self, path: str = HISTORY_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._chunks = None     # loaded snapshot frames
+        self._item_rows = None  # item -> [(chunk, row indexes)]
+        self._brand_avg = None  # per-chunk brand averages
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.jsonl")
+
+    def versions(self) -> list:
+        """List snapshot manifest entries, oldest first."""
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def append(self, brand_groups: dict, timestamp: float = None) -> int:
+        """
+        Store a calculation as a new snapshot.
+
+        Args:
+            brand_groups: Results grouped by brand, as returned by calculate_gp
+            timestamp: Snapshot time in epoch seconds (defaults to now)
+
+        Returns:
+            int: The new snapshot version
+        """
+        items = [item for brand_items in brand_groups.values() for item in brand_items]
+        timestamp = timestamp or time.time()
+        columns = {
+            "brand": np.array([str(i.get("Brand", "")) for i in items], dtype=str),
+            "item": np.array([str(i["Menu Item"]) for i in items], dtype=str),
+            "category": np.array([str(i.get("Category", "")) for i in items], dtype=str),
+            "food_cost": np.array([i["Food Cost (£)"] for i in items], dtype=np.float64),
+            "price": np.array([i["Selling Price (£)"] for i in items], dtype=np.float64),
+            "gp": np.array([i["GP £"] for i in items], dtype=np.float64),
+            "gp_pct": np.array([i["GP %"] for i in items], dtype=np.float64),
+        }
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            versions = self.versions()
+            version = versions[-1]["version"] + 1 if versions else 1
+            filename = f"snapshot-{version:06d}.npz"
+            np.savez_compressed(os.path.join(self.path, filename), **columns)
+
+            # The manifest line is written last, so a crash never lists a missing file
+            entry = {"version": version, "timestamp": timestamp, "file": filename, "rows": len(items)}
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+            if self._chunks is not None:
+                self._add_to_index(self._read_snapshot(entry))
+
+        return version
+
+    def _read_snapshot(self, entry: dict) -> pd.DataFrame:
+        with np.load(os.path.join(self.path, entry["file"])) as data:
+            df = pd.DataFrame({name: data[name] for name in data.files})
+        df.insert(0, "version", entry["version"])
+        df.insert(1, "timestamp", entry["timestamp"])
+        return df
+
+    def _add_to_index(self, snapshot: pd.DataFrame):
+        """Add the rows of one or more snapshots to the item and brand indexes."""
+        if snapshot.empty:
+            return
+        chunk = len(self._chunks)
+        self._chunks.append(snapshot)
+        for item, rows in snapshot.groupby(snapshot["item"].str.lower()).indices.items():
+            self._item_rows.setdefault(item, []).append((chunk, rows))
+        self._brand_avg.append(snapshot.groupby(["brand", "version", "timestamp"], as_index=False).agg(
+            avg_gp_pct=("gp_pct", "mean"), items=("item", "size")
+        ))
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._chunks is None:
+                self._chunks, self._item_rows, self._brand_avg = [], {}, []
+                snapshots = [self._read_snapshot(entry) for entry in self.versions()]
+                if snapshots:
+                    self._add_to_index(pd.concat(snapshots, ignore_index=True))
+
+    def item_trend(self, item: str, weeks: int = 52, brand: str = None) -> list:
+        """
+        GP history for one menu item over the last N weeks.
+
+        Returns:
+            list: One dict per snapshot containing the item, oldest first
+        """
+        self._ensure_loaded()
+        entries = self._item_rows.get(item.lower().strip())
+        if entries is None:
+            return []
+        df = pd.concat([self._chunks[chunk].iloc[rows] for chunk, rows in entries], ignore_index=True)
+        df = df[df["timestamp"] >= time.time() - weeks * WEEK_SECONDS]
+        if brand:
+            df = df[df["brand"].str.lower() == brand.lower()]
+        return df.sort_values("version").to_dict(orient="records")
+
+    def brand_drift(self, points: float = 2.0, weeks: int = 52) -> list:
+        """
+        Brands whose average GP % fell by more than `points` between their
+        first and latest snapshot in the last N weeks.
+        """
+        self._ensure_loaded()
+        if not self._brand_avg:
+            return []
+        brand_avg = pd.concat(self._brand_avg, ignore_index=True)
+        df = brand_avg[brand_avg["timestamp"] >= time.time() - weeks * WEEK_SECONDS]
+        drops = []
+        for brand, group in df.sort_values("version").groupby("brand", sort=False):
+            first, latest = group.iloc[0], group.iloc[-1]
+            change = latest["avg_gp_pct"] - first["avg_gp_pct"]
+            if change < -points:
+                drops.append({
+                    "brand": brand,
+                    "from_version": int(first["version"]),
+                    "to_version": int(latest["version"]),
+                    "from_avg_gp_pct": round(float(first["avg_gp_pct"]), 1),
+                    "to_avg_gp_pct": round(float(latest["avg_gp_pct"]), 1),
+                    "change_points": round(float(change), 1),
+                })
+        return sorted(drops, key=lambda d: d["change_points"])
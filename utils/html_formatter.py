@@ -1,20 +1,24 @@
-import pandas as pd
+from utils.rollups import GPRollup, HIGH_GP_PCT, LOW_GP_PCT
 
-def make_html_table(brand_groups) -> str:
+def make_html_table(brand_groups, rollup: GPRollup = None) -> str:
     """
     Create brand-specific HTML sections from grouped results.
     
     Args:
         brand_groups: Dictionary with brand names as keys and results as values
+        rollup: Precomputed GPRollup for the summaries (built from brand_groups if omitted)
         
     Returns:
         str: HTML with separate sections per brand
     """
+    if rollup is None:
+        rollup = GPRollup.from_results(brand_groups)
+    
     def get_gp_color(gp_pct):
         """Get color based on GP percentage."""
-        if gp_pct >= 70:
+        if gp_pct >= HIGH_GP_PCT:
             return "#3CB371"  # Green
-        elif gp_pct >= 65:
+        elif gp_pct >= LOW_GP_PCT:
             return "#FFB84D"  # Orange
         else:
             return "#FF6B6B"  # Red
@@ -32,23 +36,19 @@ def make_html_table(brand_groups) -> str:
     '''
     
     # Process each brand
-    total_items = 0
-    all_gp_values = []
-    
     for brand_name, brand_data in brand_groups.items():
         if not brand_data:
             continue
-            
-        df = pd.DataFrame(brand_data)
-        total_items += len(df)
-        all_gp_values.extend(df["GP %"].tolist())
+        
+        columns = list(brand_data[0].keys())
+        brand_summary = rollup.brand_summary(brand_name)
         
         # Brand header
         html += f'''
         <div style="margin-bottom: 40px; border: 2px solid #e9ecef; border-radius: 12px; overflow: hidden; box-shadow: 0 4px 16px rgba(0,0,0,0.1);">
             <div style="background: linear-gradient(135deg, #3498db, #2980b9); color: white; padding: 20px; text-align: center;">
                 <h2 style="margin: 0; font-size: 1.8rem; font-weight: 600;">{brand_name}</h2>
-                <p style="margin: 5px 0 0 0; opacity: 0.9;">{len(df)} menu items</p>
+                <p style="margin: 5px 0 0 0; opacity: 0.9;">{len(brand_data)} menu items</p>
             </div>
         '''
         
@@ -57,16 +57,16 @@ def make_html_table(brand_groups) -> str:
         
         # Header row
         html += '<tr style="background: linear-gradient(135deg, #34495e, #2c3e50); color: white; font-weight: 600; font-size: 0.9rem;">'
-        for col in df.columns:
+        for col in columns:
             if col != "Brand":  # Skip brand column in display
                 html += f'<td style="border: 1px solid #ddd; padding: 12px; text-align: center;">{col}</td>'
         html += '</tr>'
         
         # Data rows
-        for i, (_, row) in enumerate(df.iterrows()):
+        for i, row in enumerate(brand_data):
             bg_color = "#fafafa" if i % 2 == 0 else "#ffffff"
             html += f'<tr style="background: {bg_color}; transition: background-color 0.2s;">'
-            for col in df.columns:
+            for col in columns:
                 if col == "Brand":
                     continue  # Skip brand column
                 val = row[col]
@@ -86,10 +86,10 @@ def make_html_table(brand_groups) -> str:
             html += "</tr>"
         html += "</table>"
         
-        # Brand summary
-        brand_avg_gp = df["GP %"].mean() if not df.empty else 0
-        brand_high_gp = len(df[df["GP %"] >= 70])
-        brand_low_gp = len(df[df["GP %"] < 65])
+        # Brand summary (from the precomputed rollup)
+        brand_avg_gp = brand_summary["avg_gp_pct"]
+        brand_high_gp = brand_summary["high_margin"]
+        brand_low_gp = brand_summary["low_margin"]
         
         html += f'''
         <div style="padding: 15px; background: #f8f9fa; border-top: 1px solid #e9ecef;">
@@ -109,9 +109,11 @@ def make_html_table(brand_groups) -> str:
         '''
     
     # Overall summary
-    overall_avg_gp = sum(all_gp_values) / len(all_gp_values) if all_gp_values else 0
-    overall_high_gp = sum(1 for gp in all_gp_values if gp >= 70)
-    overall_low_gp = sum(1 for gp in all_gp_values if gp < 65)
+    overall = rollup.overall_summary()
+    total_items = overall["count"]
+    overall_avg_gp = overall["avg_gp_pct"]
+    overall_high_gp = overall["high_margin"]
+    overall_low_gp = overall["low_margin"]
     
     html += f"""
     <div style="margin-top: 30px; padding: 20px; background: linear-gradient(135deg, #f8f9fa, #e9ecef); border-radius: 12px; border-left: 4px solid #3498db;">
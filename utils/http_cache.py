@@ -0,0 +1,145 @@
+import gzip
+import hashlib
+import json
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _json_default(value):
+    # numpy scalars and other non-JSON types that slipped into results
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def json_bytes(obj) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes, with orjson when installed.
+    NaN becomes null instead of failing the response.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_replace_nan(obj), default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _replace_nan(obj):
+    if isinstance(obj, float) and obj != obj:
+        return None
+    if isinstance(obj, dict):
+        return {key: _replace_nan(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_nan(value) for value in obj]
+    return obj
+
+def _accepted_encodings(header: str) -> set:
+    """
+    Parse an Accept-Encoding header into the set of codings with q > 0.
+    """
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+class CachedBody:
+    """
+    A response body compressed once up front, with an ETag for conditional GETs.
+    Each encoding is a different representation and gets its own ETag.
+
+    Args:
+        body: Uncompressed response bytes
+        media_type: Content type of the body
+        last_modified: Optional modification time (epoch seconds) for Last-Modified
+        headers: Optional extra headers sent with every response
+    """
+    def __init__(self, body: bytes, media_type: str, last_modified: float = None, headers: dict = None):
+        self.body = body
+        self.media_type = media_type
+        self.last_modified = int(last_modified) if last_modified is not None else None
+        self.headers = headers or {}
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        self.encoded = {"gzip": gzip.compress(body, compresslevel=6)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(body)
+        self.etags = {coding: f'"{digest}-{coding}"' for coding in self.encoded}
+
+    def response(self, request: Request) -> Response:
+        """
+        Serve the body for a request: 304 when the client's ETag matches (or,
+        without If-None-Match, when it is not older than Last-Modified),
+        otherwise the best encoding it accepts (brotli, gzip, then identity).
+        """
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        coding = next((coding for coding in ("br", "gzip") if coding in accepted and coding in self.encoded), None)
+        etag = self.etags[coding] if coding else self.etag
+
+        headers = {**self.headers, "ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = formatdate(self.last_modified, usegmt=True)
+
+        if self.not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        if coding:
+            headers["Content-Encoding"] = coding
+            return Response(self.encoded[coding], media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+    def not_modified(self, request: Request, etag: str = None) -> bool:
+        """
+        Check the request's conditional headers against this body, in the
+        encoding whose ETag is given (identity by default).
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            return if_none_match.strip() == "*" or (etag or self.etag) in [tag.strip() for tag in if_none_match.split(",")]
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+class ResponseCache:
+    """
+    CachedBody instances keyed by name, each tied to a version (e.g. the
+    results version or a file's mtime) and rebuilt only when it changes.
+    """
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, key, version, build) -> CachedBody:
+        """
+        Get the cached body for key, calling build() to create it when the
+        stored one is missing or was built for another version.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            entry = (version, build())
+            self._entries[key] = entry
+        return entry[1]
+
+    def put(self, key, version, body: CachedBody) -> CachedBody:
+        """Store an already built body for key at version."""
+        self._entries[key] = (version, body)
+        return body
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+class Job:
+    """
+    A queued upload run with its progress events and final result.
+    """
+    def __init__(self, payload):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def add_event(self, event: dict):
+        """Record a progress event (called from the worker thread)."""
+        self.events.append({**event, "time": round(time.time() - self.created, 3)})
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "events": self.events,
+            "error": self.error,
+            "queued_seconds": round((self.started or time.time()) - self.created, 3),
+            "run_seconds": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+        }
+
+class JobQueue:
+    """
+    Bounded job queue drained by a fixed pool of worker threads.
+
+    Args:
+        handler: Callable(payload, progress) run in a worker thread; its return value becomes the job result
+        workers: Number of jobs processed concurrently
+        max_depth: Jobs allowed to wait in the queue before submissions are rejected
+        keep: Finished jobs retained for polling before the oldest are dropped
+    """
+    def __init__(self, handler, workers: int = 2, max_depth: int = 16, keep: int = 100):
+        self.handler = handler
+        self.workers = workers
+        self.max_depth = max_depth
+        self.keep = keep
+        self.jobs = OrderedDict()
+        self._queue = None
+        self._executor = None
+        self._tasks = []
+
+    def _ensure_workers(self):
+        """Start the worker tasks on first use, inside the running event loop."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_depth)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, payload) -> Job:
+        """
+        Queue a job without waiting.
+
+        Raises:
+            QueueFullError: If max_depth jobs are already waiting
+        """
+        self._ensure_workers()
+        job = Job(payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self.max_depth} waiting)")
+        self.jobs[job.id] = job
+        self._trim()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        return self.jobs.get(job_id)
+
+    def _trim(self):
+        """Drop the oldest finished jobs beyond the retention limit."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.keep)]:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started = time.time()
+            status = "failed"
+            try:
+                job.result = await loop.run_in_executor(self._executor, self.handler, job.payload, job.add_event)
+                status = "done"
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                job.error = str(e)
+            finally:
+                # Uploaded bytes are no longer needed once the job has run
+                job.payload = None
+                job.finished = time.time()
+                # Final event goes in before the status flips so streams see it
+                job.add_event({"stage": status})
+                job.status = status
+                self._queue.task_done()
+
+    async def stream(self, job: Job, poll_interval: float = 0.25):
+        """
+        Yield server-sent events for a job until it finishes.
+        """
+        sent = 0
+        while True:
+            while sent < len(job.events):
+                yield f"data: {json.dumps(job.events[sent])}\n\n"
+                sent += 1
+            if job.done and sent >= len(job.events):
+                return
+            await asyncio.sleep(poll_interval)
@@ -0,0 +1,142 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# Upload and parsing limits; every value can be overridden by environment variable
+MAX_FILE_BYTES = int(os.environ.get("FOOD_COST_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+MAX_REQUEST_BYTES = int(os.environ.get("FOOD_COST_MAX_REQUEST_BYTES", str(50 * 1024 * 1024)))
+MAX_FILES = int(os.environ.get("FOOD_COST_MAX_FILES", "20"))
+MAX_ROWS = int(os.environ.get("FOOD_COST_MAX_ROWS", "200000"))
+MAX_COLUMNS = int(os.environ.get("FOOD_COST_MAX_COLUMNS", "500"))
+MAX_SALES_BYTES = int(os.environ.get("FOOD_COST_MAX_SALES_BYTES", str(2 * 1024 * 1024 * 1024)))
+MAX_CONCURRENT_WORK = int(os.environ.get("FOOD_COST_MAX_CONCURRENT_WORK", "2"))
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds a byte, file, row or column limit (HTTP 413)."""
+
+class ServerBusyError(Exception):
+    """Raised when no slot for heavy parse/calculate work is free (HTTP 429)."""
+
+class RequestSizeLimit:
+    """
+    ASGI middleware rejecting request bodies over a byte limit (HTTP 413).
+
+    Content-Length is checked before the app runs, and the body bytes
+    actually received are counted as well, so a chunked or mislabelled
+    body is cut off as soon as it passes the limit instead of being read
+    whole.
+
+    Args:
+        app: The ASGI app to wrap
+        limit: Largest accepted body in bytes
+        path_limits: {path: limit} for paths with their own limit
+    """
+    def __init__(self, app, limit: int = MAX_REQUEST_BYTES, path_limits: dict = None):
+        self.app = app
+        self.limit = limit
+        self.path_limits = path_limits or {}
+
+    async def _reject(self, scope, receive, send, limit: int):
+        from starlette.responses import JSONResponse
+        await JSONResponse({"error": f"Request exceeds {limit} bytes"}, status_code=413)(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limit = self.path_limits.get(scope["path"], self.limit)
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                return await self._reject(scope, receive, send, limit)
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadTooLargeError(f"Request exceeds {limit} bytes")
+            return message
+
+        async def checked_send(message):
+            # Whatever the app makes of a cut-off body is replaced by the 413
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, checked_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded:
+            await self._reject(scope, receive, send, limit)
+
+# Shared by request handlers (non-blocking) and job worker threads (blocking)
+_work_slots = threading.BoundedSemaphore(MAX_CONCURRENT_WORK)
+
+@contextmanager
+def work_slot(blocking: bool = False):
+    """
+    Hold one of the MAX_CONCURRENT_WORK slots for heavy parse/calculate work.
+
+    Raises:
+        ServerBusyError: If blocking is False and every slot is taken
+    """
+    if not _work_slots.acquire(blocking=blocking):
+        raise ServerBusyError("Server is busy processing other uploads, please retry shortly")
+    try:
+        yield
+    finally:
+        _work_slots.release()
+
+async def read_limited(files: list) -> list:
+    """
+    Read uploaded files chunk by chunk, stopping as soon as a limit is hit.
+
+    Args:
+        files: List of UploadFile objects
+
+    Returns:
+        list: (filename, content) tuples
+
+    Raises:
+        UploadTooLargeError: If there are too many files or too many bytes
+    """
+    if len(files) > MAX_FILES:
+        raise UploadTooLargeError(f"Too many files: {len(files)} (limit {MAX_FILES})")
+
+    uploads = []
+    request_bytes = 0
+    for file in files:
+        chunks = []
+        file_bytes = 0
+        while True:
+            chunk = await file.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            file_bytes += len(chunk)
+            request_bytes += len(chunk)
+            if file_bytes > MAX_FILE_BYTES:
+                raise UploadTooLargeError(f"File {file.filename} exceeds {MAX_FILE_BYTES} bytes")
+            if request_bytes > MAX_REQUEST_BYTES:
+                raise UploadTooLargeError(f"Upload exceeds {MAX_REQUEST_BYTES} bytes in total")
+            chunks.append(chunk)
+        uploads.append((file.filename, b"".join(chunks)))
+    return uploads
+
+def check_table_size(df, label: str):
+    """
+    Reject a parsed table with more rows or columns than allowed.
+
+    Raises:
+        UploadTooLargeError: If MAX_ROWS or MAX_COLUMNS is exceeded
+    """
+    if len(df.columns) > MAX_COLUMNS:
+        raise UploadTooLargeError(f"{label} has {len(df.columns)} columns (limit {MAX_COLUMNS})")
+    if len(df) > MAX_ROWS:
+        raise UploadTooLargeError(f"{label} has more than {MAX_ROWS} rows")
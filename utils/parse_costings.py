@@ -1,51 +1,68 @@
 import pandas as pd
 
-def parse_costings(df: pd.DataFrame) -> pd.DataFrame:
+def resolve_costings_columns(columns) -> dict:
     """
-    Parse and normalize costings data.
-    Expects standardized template: Item Name, Purchase Price, Quantity, Unit
+    Map raw costings headers to standard names.
     
     Args:
-        df: Raw costings DataFrame
+        columns: Stripped header names
         
     Returns:
-        pd.DataFrame: Normalized costings data with unit costs
+        dict: {raw column: standard column}
     """
-    # Clean column names
-    df.columns = df.columns.str.strip()
+    columns = list(columns)
     
     # Check if we have the standardized template columns
-    if "Item Name" in df.columns and "Purchase Price" in df.columns and "Quantity" in df.columns:
+    if "Item Name" in columns and "Purchase Price" in columns and "Quantity" in columns:
         # Use standardized template format
-        df = df.rename(columns={
+        return {
             "Item Name": "Ingredient",
             "Purchase Price": "Our Price (£)",
             "Quantity": "Pack Size"
-        })
-    else:
-        # Fallback to old mapping for backward compatibility
-        column_mapping = {}
-        
-        # Find ingredient column (various names)
-        for col in df.columns:
-            if any(word in col.lower() for word in ["ingredient", "name", "item"]):
-                column_mapping[col] = "Ingredient"
-                break
-        
-        # Find price column (various names)
-        for col in df.columns:
-            if any(word in col.lower() for word in ["price", "cost", "our price"]):
-                column_mapping[col] = "Our Price (£)"
-                break
-        
-        # Find pack size column (various names)
-        for col in df.columns:
-            if any(word in col.lower() for word in ["pack", "quantity", "size"]):
-                column_mapping[col] = "Pack Size"
-                break
+        }
+    
+    # Fallback to old mapping for backward compatibility
+    column_mapping = {}
+    
+    # Find ingredient column (various names)
+    for col in columns:
+        if any(word in col.lower() for word in ["ingredient", "name", "item"]):
+            column_mapping[col] = "Ingredient"
+            break
+    
+    # Find price column (various names)
+    for col in columns:
+        if any(word in col.lower() for word in ["price", "cost", "our price"]):
+            column_mapping[col] = "Our Price (£)"
+            break
+    
+    # Find pack size column (various names)
+    for col in columns:
+        if any(word in col.lower() for word in ["pack", "quantity", "size"]):
+            column_mapping[col] = "Pack Size"
+            break
+    
+    return column_mapping
+
+def parse_costings(df: pd.DataFrame, mapping: dict = None) -> pd.DataFrame:
+    """
+    Parse and normalize costings data.
+    Expects standardized template: Item Name, Purchase Price, Quantity, Unit
+    
+    Args:
+        df: Raw costings DataFrame
+        mapping: Column mapping from resolve_costings_columns (resolved here if omitted)
         
-        # Rename columns
-        df = df.rename(columns=column_mapping)
+    Returns:
+        pd.DataFrame: Normalized costings data with unit costs
+    """
+    # Clean column names
+    df.columns = df.columns.str.strip()
+    
+    # Rename columns
+    if mapping is None:
+        mapping = resolve_costings_columns(df.columns)
+    df = df.rename(columns=mapping)
     
     # Check if we have the required columns
     required_cols = ["Ingredient", "Our Price (£)", "Pack Size"]
@@ -53,9 +70,10 @@ def parse_costings(df: pd.DataFrame) -> pd.DataFrame:
     if missing_cols:
         raise ValueError(f"Missing required columns: {missing_cols}. Available columns: {list(df.columns)}")
     
-    # Convert price and quantity to numeric
-    df["Our Price (£)"] = pd.to_numeric(df["Our Price (£)"], errors='coerce')
-    df["Pack Size"] = pd.to_numeric(df["Pack Size"], errors='coerce')
+    # Convert price and quantity to numeric (skipped when the reader typed them)
+    for col in ["Our Price (£)", "Pack Size"]:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
     
     # Remove rows with invalid data
     df = df.dropna(subset=["Our Price (£)", "Pack Size"])
@@ -1,12 +1,50 @@
 import pandas as pd
 
-def parse_menu_prices(df: pd.DataFrame) -> pd.DataFrame:
+def resolve_menu_columns(columns) -> dict:
+    """
+    Map raw menu headers to standard names.
+    
+    Args:
+        columns: Stripped header names
+        
+    Returns:
+        dict: {raw column: standard column}
+    """
+    columns = list(columns)
+    
+    # Check if we have the standardized template columns
+    if "Item Name" in columns and "Selling Price" in columns:
+        # Use standardized template format
+        return {
+            "Item Name": "Menu Item",
+            "Selling Price": "Selling Price (£)"
+        }
+    
+    # Fallback to old mapping for backward compatibility
+    column_mapping = {}
+    
+    # Find menu item column (various names)
+    for col in columns:
+        if any(word in col.lower() for word in ["menu item", "name", "item"]):
+            column_mapping[col] = "Menu Item"
+            break
+    
+    # Find selling price column (various names)
+    for col in columns:
+        if any(word in col.lower() for word in ["selling price", "price"]):
+            column_mapping[col] = "Selling Price (£)"
+            break
+    
+    return column_mapping
+
+def parse_menu_prices(df: pd.DataFrame, mapping: dict = None) -> pd.DataFrame:
     """
     Parse and normalize menu prices data.
     Expects standardized template: Item Name, Selling Price
     
     Args:
         df: Raw menu prices DataFrame
+        mapping: Column mapping from resolve_menu_columns (resolved here if omitted)
         
     Returns:
         pd.DataFrame: Normalized menu prices data
@@ -14,38 +52,17 @@ def parse_menu_prices(df: pd.DataFrame) -> pd.DataFrame:
     # Clean column names
     df.columns = df.columns.str.strip()
     
-    # Check if we have the standardized template columns
-    if "Item Name" in df.columns and "Selling Price" in df.columns:
-        # Use standardized template format
-        df = df.rename(columns={
-            "Item Name": "Menu Item",
-            "Selling Price": "Selling Price (£)"
-        })
-        
-        # Add default category if missing
-        if "Category" not in df.columns:
-            df["Category"] = "Unknown"
-    else:
-        # Fallback to old mapping for backward compatibility
-        column_mapping = {}
-        
-        # Find menu item column (various names)
-        for col in df.columns:
-            if any(word in col.lower() for word in ["menu item", "name", "item"]):
-                column_mapping[col] = "Menu Item"
-                break
-        
-        # Find selling price column (various names)
-        for col in df.columns:
-            if any(word in col.lower() for word in ["selling price", "price"]):
-                column_mapping[col] = "Selling Price (£)"
-                break
-        
-        # Rename columns
-        df = df.rename(columns=column_mapping)
+    # Rename columns
+    if mapping is None:
+        mapping = resolve_menu_columns(df.columns)
+    df = df.rename(columns=mapping)
+    
+    # Add default category if missing (standardized template)
+    if "Item Name" in mapping and "Category" not in df.columns:
+        df["Category"] = "Unknown"
     
-    # Convert selling price to numeric
-    if "Selling Price (£)" in df.columns:
+    # Convert selling price to numeric (skipped when the reader typed it)
+    if "Selling Price (£)" in df.columns and not pd.api.types.is_numeric_dtype(df["Selling Price (£)"]):
         df["Selling Price (£)"] = pd.to_numeric(df["Selling Price (£)"], errors='coerce')
     
     return df
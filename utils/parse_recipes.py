@@ -1,36 +1,105 @@
 import pandas as pd
+from utils.calculator import add_recipe_lines, normalize_recipe_columns, resolve_recipe_columns
 
-def parse_recipes(df: pd.DataFrame) -> pd.DataFrame:
+# Usable share of an ingredient after trim/waste ("80" or "0.8" = 80%)
+YIELD_COLUMNS = ["yield %", "yield (%)", "yield"]
+
+# Output of a batch (prep) recipe, in the units menu items use it in
+BATCH_COLUMNS = ["batch yield", "batch portions", "batch size"]
+
+def _find_column(df: pd.DataFrame, names: list) -> str:
+    for col in df.columns:
+        if col.lower() in names:
+            return col
+    return None
+
+def parse_yield(values: pd.Series) -> pd.Series:
+    """
+    Convert yield values to fractions: "80", "80%" and 0.8 all become 0.8.
+    Missing or non-positive yields become 1 (no loss).
+    """
+    values = pd.to_numeric(values.astype(str).str.replace("%", "", regex=False).str.strip(), errors="coerce")
+    values = values.where(values <= 1, values / 100)
+    return values.where(values > 0, 1.0).fillna(1.0)
+
+def _format_quantity(qty: float) -> str:
+    # Plain decimal (never scientific notation) so the qty+unit string parses back
+    return f"{qty:.10f}".rstrip("0").rstrip(".")
+
+def _is_long_template(columns) -> bool:
+    return "Menu Item" in columns and "Ingredient" in columns and "Quantity" in columns
+
+def resolve_recipes_columns(columns) -> dict:
+    """
+    Map raw recipes headers to standard names (nothing to map for the
+    long Menu Item/Ingredient/Quantity template).
+    """
+    columns = list(columns)
+    if _is_long_template(columns):
+        return {}
+    return resolve_recipe_columns(columns)
+
+def parse_recipes(df: pd.DataFrame, mapping: dict = None) -> pd.DataFrame:
     """
     Parse and normalize recipes data.
     Expects standardized template: Menu Item, Brand, Category, Ingredient, Quantity, Unit
     
+    Optional columns:
+    - Yield %: usable share of an ingredient line; its quantity is scaled up
+      to the amount bought (0.3 kg at 75% yield costs as 0.4 kg). On the
+      ingredients-string format it applies to the whole item.
+    - Batch Yield (or Batch Portions): marks a batch (prep) recipe and how
+      many units it makes; menu items reference it by name like an ingredient.
+    
     Args:
         df: Raw recipes DataFrame
+        mapping: Column mapping from resolve_recipes_columns (resolved here if omitted)
         
     Returns:
-        pd.DataFrame: Normalized recipes data
+        pd.DataFrame: Normalized recipes data, with each item's parsed
+        ingredient lines in "Recipe Lines"
     """
     # Clean column names
     df.columns = df.columns.str.strip()
     
+    yield_col = _find_column(df, YIELD_COLUMNS)
+    batch_col = _find_column(df, BATCH_COLUMNS)
+    if batch_col:
+        df = df.rename(columns={batch_col: "Batch Yield"})
+        df["Batch Yield"] = pd.to_numeric(df["Batch Yield"], errors="coerce")
+    
     # Check if we have the standardized template columns
-    if "Menu Item" in df.columns and "Ingredient" in df.columns and "Quantity" in df.columns:
+    if _is_long_template(df.columns):
         # Use standardized template format - convert to ingredients string format
-        df["Ingredients (qty+unit)"] = df["Ingredient"] + ": " + df["Quantity"].astype(str) + " " + df["Unit"]
+        quantity = df["Quantity"].astype(str)
+        if yield_col:
+            # Cost the amount bought, not the amount used
+            bought = pd.to_numeric(df["Quantity"], errors="coerce") / parse_yield(df[yield_col])
+            quantity = quantity.where(bought.isna(), bought.map(_format_quantity))
+        df["Ingredients (qty+unit)"] = df["Ingredient"] + ": " + quantity + " " + df["Unit"]
         
         # Group by menu item to combine ingredients
-        grouped = df.groupby("Menu Item").agg({
+        aggregations = {
             "Brand": "first",
             "Category": "first", 
             "Ingredients (qty+unit)": lambda x: "; ".join(x)
-        }).reset_index()
+        }
+        if batch_col:
+            aggregations["Batch Yield"] = "first"
+        grouped = df.groupby("Menu Item").agg(aggregations).reset_index()
         
-        return grouped
+        return add_recipe_lines(grouped)
     else:
         # Fallback to old format for backward compatibility
         if "Ingredients (qty+unit)" in df.columns:
             df["Ingredients (qty+unit)"] = df["Ingredients (qty+unit)"].astype(str)
             df["Ingredients (qty+unit)"] = df["Ingredients (qty+unit)"].replace('nan', '')
+        
+        # Whole-item yield as a fraction, applied to the item's food cost by calculate_gp
+        if yield_col:
+            df = df.rename(columns={yield_col: "Yield"})
+            df["Yield"] = parse_yield(df["Yield"])
     
-    return df
+    # Map column names, convert wide sheets and parse the ingredient lines
+    # once here, not on every calculation
+    return add_recipe_lines(normalize_recipe_columns(df, mapping))
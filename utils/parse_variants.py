@@ -0,0 +1,94 @@
+import pandas as pd
+
+def resolve_variant_columns(columns) -> dict:
+    """
+    Map raw variants headers to standard names.
+
+    Args:
+        columns: Stripped header names
+
+    Returns:
+        dict: {raw column: standard column}
+    """
+    columns = list(columns)
+
+    # Check if we have the standardized template columns
+    if "Base Item Name" in columns and "Variant Name" in columns:
+        # Use standardized template format
+        return {
+            "Base Item Name": "Base Item",
+            "Variant Name": "Menu Item",
+            "Selling Price": "Selling Price (£)",
+            "Extra Ingredients": "Delta Ingredients"
+        }
+
+    # Fallback mapping for other header spellings
+    column_mapping = {}
+
+    # Find base item column (various names)
+    for col in columns:
+        if "base" in col.lower():
+            column_mapping[col] = "Base Item"
+            break
+
+    # Find variant name column (various names)
+    for col in columns:
+        if "variant" in col.lower() and col not in column_mapping:
+            column_mapping[col] = "Menu Item"
+            break
+
+    # Find selling price column (various names)
+    for col in columns:
+        if "price" in col.lower():
+            column_mapping[col] = "Selling Price (£)"
+            break
+
+    # Find delta recipe column (various names)
+    for col in columns:
+        if any(word in col.lower() for word in ["extra", "delta", "ingredient"]):
+            column_mapping[col] = "Delta Ingredients"
+            break
+
+    return column_mapping
+
+def parse_variants(df: pd.DataFrame, mapping: dict = None) -> pd.DataFrame:
+    """
+    Parse and normalize item variants data.
+    Expects standardized template: Base Item Name, Variant Name, Selling Price
+    Optional: Extra Ingredients (delta recipe, e.g. "BBQ Sauce: 0.05 liter"), Brand, Category
+
+    Args:
+        df: Raw variants DataFrame
+        mapping: Column mapping from resolve_variant_columns (resolved here if omitted)
+
+    Returns:
+        pd.DataFrame: Normalized variants data
+    """
+    # Clean column names
+    df.columns = df.columns.str.strip()
+
+    # Rename columns
+    if mapping is None:
+        mapping = resolve_variant_columns(df.columns)
+    df = df.rename(columns=mapping)
+
+    # Check if we have the required columns
+    required_cols = ["Base Item", "Menu Item"]
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing required columns: {missing_cols}. Available columns: {list(df.columns)}")
+
+    # Add defaults for optional columns
+    if "Selling Price (£)" not in df.columns:
+        df["Selling Price (£)"] = float("nan")
+    if "Delta Ingredients" not in df.columns:
+        df["Delta Ingredients"] = ""
+
+    # Convert selling price to numeric (skipped when the reader typed it)
+    if not pd.api.types.is_numeric_dtype(df["Selling Price (£)"]):
+        df["Selling Price (£)"] = pd.to_numeric(df["Selling Price (£)"], errors='coerce')
+
+    df["Delta Ingredients"] = df["Delta Ingredients"].fillna("").astype(str)
+    df = df.dropna(subset=["Base Item", "Menu Item"])
+
+    return df
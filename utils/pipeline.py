@@ -0,0 +1,235 @@
+import os
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from utils.detect_type import detect_file_type, detect_sheet_type, has_type_hint
+from utils.readers import read_upload, read_workbook, read_headers
+from utils.limits import check_table_size
+from utils.parse_costings import parse_costings, resolve_costings_columns
+from utils.parse_recipes import parse_recipes, resolve_recipes_columns
+from utils.parse_menu import parse_menu_prices, resolve_menu_columns
+from utils.parse_variants import parse_variants, resolve_variant_columns
+from utils.sourcing import tag_supplier, resolve_sources
+from utils.schema_cache import SchemaCache, SCHEMA_CACHE_ENABLED, header_fingerprint
+
+PARSERS = {
+    "costings": parse_costings,
+    "recipes": parse_recipes,
+    "menu": parse_menu_prices,
+    "variants": parse_variants,
+}
+
+# Column-mapping heuristics of each parser, run once per new header layout
+RESOLVERS = {
+    "costings": resolve_costings_columns,
+    "recipes": resolve_recipes_columns,
+    "menu": resolve_menu_columns,
+    "variants": resolve_variant_columns,
+}
+
+# Standard columns each parsed table must have for costing to use it
+REQUIRED_COLUMNS = {
+    "costings": ["Ingredient", "Our Price (£)", "Pack Size"],
+    "recipes": ["Menu Item", "Ingredients (qty+unit)"],
+    "menu": ["Menu Item", "Selling Price (£)"],
+    "variants": ["Base Item", "Menu Item"],
+}
+
+schema_cache = SchemaCache()
+
+# Threads used to run the parsers over the tables of an upload
+PARSE_WORKERS = int(os.environ.get("FOOD_COST_PARSE_WORKERS", "4"))
+
+def read_tables(filename: str, content: bytes) -> list:
+    """
+    Detect and read the tables in one uploaded file.
+
+    CSV and legacy Excel files hold a single table. .xlsx workbooks are
+    opened once and every sheet is classified by its name and header row;
+    only sheets of a known type are read.
+
+    Header layouts seen before are looked up in the schema cache: a known
+    CSV layout skips type detection and is read with the dtypes recorded
+    for it, and its column mapping is handed to the parser.
+
+    Returns:
+        list: (label, file_type, DataFrame, fingerprint, cached entry) tuples;
+        fingerprint is None when the cache is disabled
+    """
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        fingerprints = {}
+
+        def classify(sheet_name, header):
+            # Generic tab names ("Sheet1") carry no hint; use the file name instead
+            name = sheet_name if has_type_hint(sheet_name) else filename
+            if SCHEMA_CACHE_ENABLED:
+                fingerprint = header_fingerprint(header, name)
+                fingerprints[sheet_name] = fingerprint
+                entry = schema_cache.get(fingerprint)
+                if entry:
+                    return entry["file_type"]
+            return detect_sheet_type(name, header)
+
+        tables = []
+        for name, file_type, df in read_workbook(content, classify):
+            fingerprint = fingerprints.get(name)
+            entry = schema_cache.get(fingerprint) if fingerprint else None
+            tables.append((f"{filename} [{name}]", file_type, df, fingerprint, entry))
+        return tables
+
+    fingerprint = entry = None
+    if SCHEMA_CACHE_ENABLED and filename.lower().endswith(".csv"):
+        headers = read_headers(content)
+        if headers is not None:
+            fingerprint = header_fingerprint(headers, filename)
+            entry = schema_cache.get(fingerprint)
+
+    if entry:
+        file_type = entry["file_type"]
+        print(f"File {filename} matches a cached {file_type} layout")
+        df = read_upload(content, filename, file_type, entry.get("dtypes"))
+    else:
+        file_type = detect_file_type(content, filename)
+        # Parse based on file extension, typed by the detected template
+        df = read_upload(content, filename, file_type)
+    return [(filename, file_type, df, fingerprint, entry)]
+
+def _column_dtypes(df: pd.DataFrame) -> dict:
+    """
+    Record the float and text columns of a table as read, for typed reads of
+    the same layout later. Integer columns are left to inference so a
+    column with blanks in a later file still reads.
+    """
+    dtypes = {}
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]):
+            dtypes[str(col)] = "float64"
+        elif pd.api.types.is_object_dtype(df[col]):
+            dtypes[str(col)] = "object"
+    return dtypes
+
+def _parse_table(table: tuple) -> pd.DataFrame:
+    label, file_type, df, fingerprint, entry = table
+    parser = PARSERS.get(file_type)
+    if not parser:
+        return None
+    if fingerprint is None:
+        return parser(df)
+
+    # Parsers rename columns in place; keep what the reader produced
+    dtypes = _column_dtypes(df)
+    if entry and entry["file_type"] == file_type:
+        try:
+            parsed = parser(df.copy(deep=False), entry["mapping"])
+            missing = _missing_columns(parsed, file_type)
+            if not missing:
+                return parsed
+            raise KeyError(f"missing {missing}")
+        except (KeyError, ValueError) as e:
+            # The layout hashed the same but no longer parses this way
+            print(f"Cached column mapping failed for {label} ({e}), resolving again")
+            schema_cache.discard(fingerprint)
+
+    mapping = RESOLVERS[file_type](df.columns.str.strip())
+    parsed = parser(df, mapping)
+    # Only layouts that yield every standard column are worth reusing
+    if not _missing_columns(parsed, file_type):
+        schema_cache.put(fingerprint, file_type, mapping, dtypes)
+    return parsed
+
+def _missing_columns(df: pd.DataFrame, file_type: str) -> list:
+    return [col for col in REQUIRED_COLUMNS[file_type] if col not in df.columns]
+
+def parse_file(filename: str, content: bytes) -> list:
+    """
+    Detect, read and parse the tables of one file on its own.
+
+    Returns:
+        list: (label, file_type, parsed DataFrame) for every table of a known type
+    """
+    parsed = []
+    for table in read_tables(filename, content):
+        check_table_size(table[2], table[0])
+        df = _parse_table(table)
+        if df is None:
+            print(f"Warning: Could not detect type for {table[0]}")
+            continue
+        if table[1] == "costings":
+            df = tag_supplier(df, table[0])
+        parsed.append((table[0], table[1], df))
+    return parsed
+
+def load_uploads(uploads: list, progress=None, sourcing: dict = None) -> dict:
+    """
+    Detect, read and parse a set of uploaded files.
+
+    Costings from several files are kept side by side, each row tagged with
+    its supplier, and one row per ingredient is picked by resolve_sources.
+
+    Args:
+        uploads: List of (filename, content) tuples
+        progress: Optional callback receiving a progress event dict per file
+        sourcing: resolve_sources options ("policy", "preferred", "tolerance_pct")
+
+    Returns:
+        dict: Parsed "costings" (one row per ingredient), "costings_all"
+        (every supplier's rows), "recipes", "menu" and "variants" DataFrames (None if absent)
+    """
+    data = {"costings": None, "recipes": None, "menu": None, "variants": None}
+
+    tables = []
+    for i, (filename, content) in enumerate(uploads):
+        print(f"Processing file {i+1}: {filename}")
+        file_tables = read_tables(filename, content)
+        for label, file_type, df, fingerprint, entry in file_tables:
+            check_table_size(df, label)
+            print(f"File {label} detected as: {file_type}")
+            print(f"File {label} has {len(df)} rows and columns: {list(df.columns)}")
+            tables.append((i, label, file_type, df, fingerprint, entry))
+
+        if progress:
+            progress({
+                "stage": "file", "file": filename,
+                "types": [table[1] for table in file_tables],
+                "rows": sum(len(table[2]) for table in file_tables),
+                "index": i + 1, "total": len(uploads),
+            })
+
+    # Parsers are independent, so run them side by side
+    with ThreadPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+        parsed = list(pool.map(_parse_table, [t[1:] for t in tables]))
+
+    # Store based on detected type: sheets of one workbook are combined,
+    # a later file replaces an earlier one of the same type, except costings,
+    # where every file is another supplier's list
+    sources = {}
+    for (file_index, label, file_type, *_), df in zip(tables, parsed):
+        if df is None:
+            print(f"Warning: Could not detect type for {label}")
+            continue
+        if file_type == "costings":
+            df = tag_supplier(df, label)
+        if sources.get(file_type) == file_index or (file_type == "costings" and data["costings"] is not None):
+            data[file_type] = pd.concat([data[file_type], df], ignore_index=True)
+        else:
+            data[file_type] = df
+        sources[file_type] = file_index
+        print(f"Stored {file_type} data: {len(data[file_type])} rows")
+
+    data["costings_all"] = data["costings"]
+    if data["costings"] is not None:
+        data["costings"] = resolve_sources(data["costings"], **(sourcing or {}))
+        suppliers = data["costings_all"]["Supplier"].nunique()
+        print(f"Resolved {len(data['costings_all'])} costings rows from {suppliers} supplier(s) to {len(data['costings'])} ingredients")
+
+    # Debug: Check what we have
+    print(f"Final state - Costings: {data['costings'] is not None}, Recipes: {data['recipes'] is not None}, Menu: {data['menu'] is not None}, Variants: {data['variants'] is not None}")
+
+    return data
+
+def missing_data_error(data: dict) -> str:
+    """
+    Describe missing required inputs, or return None if costing can proceed.
+    """
+    if data["costings"] is None or data["recipes"] is None:
+        return f"Need at least costings and recipes data. Got: costings={data['costings'] is not None}, recipes={data['recipes'] is not None}, menu={data['menu'] is not None}"
+    return None
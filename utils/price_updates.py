@@ -0,0 +1,241 @@
+import pandas as pd
+from utils.calculator import normalize_recipe_columns, is_batch_recipe
+
+# Column names accepted as a supplier SKU / product code
+SKU_COLUMNS = ["sku", "product code", "supplier code", "code"]
+
+def sku_column(df: pd.DataFrame) -> str:
+    """
+    Find the SKU column of a costings table, or None if it has none.
+    """
+    for col in df.columns:
+        if str(col).strip().lower() in SKU_COLUMNS:
+            return col
+    return None
+
+def upsert_costings(cost_df: pd.DataFrame, updates: pd.DataFrame) -> tuple:
+    """
+    Upsert parsed price-update rows into the costings table.
+
+    Rows are matched by SKU when both tables have one and the update row's
+    SKU is set, otherwise by normalized ingredient name (and supplier, when
+    both tables have a "Supplier" column). Matched rows take
+    the update's non-blank values, unmatched rows are appended. Unit costs come from
+    parse_costings, so they are only computed for the update rows.
+
+    Args:
+        cost_df: Current costings DataFrame
+        updates: Parsed costings DataFrame holding only the changed rows
+
+    Returns:
+        tuple: (new costings DataFrame, set of changed normalized names,
+        number of updated rows, number of added rows)
+    """
+    result = cost_df.reset_index(drop=True)
+
+    update_sku = sku_column(updates)
+    current_sku = sku_column(result)
+    by_sku = {}
+    if update_sku is not None and current_sku is not None:
+        for pos, sku in enumerate(result[current_sku]):
+            if pd.notna(sku):
+                by_sku.setdefault(str(sku).strip().lower(), pos)
+    # Several suppliers can list the same ingredient; match within the supplier
+    by_supplier = "Supplier" in updates.columns and "Supplier" in result.columns
+    def name_key(df, pos):
+        name = df["Ingredient_norm"].iat[pos]
+        return (str(df["Supplier"].iat[pos]).strip().lower(), name) if by_supplier else name
+
+    by_name = {}
+    for pos in range(len(result)):
+        by_name.setdefault(name_key(result, pos), pos)
+
+    matched_pos, matched_idx, new_idx = [], [], []
+    changed = set()
+    for idx, name in enumerate(updates["Ingredient_norm"]):
+        pos = None
+        sku = updates[update_sku].iat[idx] if update_sku is not None else None
+        if by_sku and pd.notna(sku):
+            pos = by_sku.get(str(sku).strip().lower())
+        if pos is None:
+            pos = by_name.get(name_key(updates, idx))
+
+        changed.add(name)
+        if pos is None:
+            new_idx.append(idx)
+        else:
+            # A renamed SKU changes what the old name matches too
+            changed.add(result["Ingredient_norm"].iat[pos])
+            matched_pos.append(pos)
+            matched_idx.append(idx)
+
+    if matched_pos:
+        for col in updates.columns:
+            if col == update_sku and current_sku is not None:
+                target = current_sku
+            elif col in result.columns:
+                target = col
+            else:
+                continue
+            # Blank cells in the update keep the current value (e.g. a missing SKU)
+            values = updates[col].iloc[matched_idx].reset_index(drop=True)
+            current = result.loc[matched_pos, target].reset_index(drop=True)
+            result.loc[matched_pos, target] = values.where(values.notna(), current).to_numpy()
+
+    if new_idx:
+        added = updates.iloc[new_idx]
+        if update_sku is not None and current_sku is not None and update_sku != current_sku:
+            added = added.rename(columns={update_sku: current_sku})
+        result = pd.concat([result, added], ignore_index=True)
+
+    return result, changed, len(matched_pos), len(new_idx)
+
+def _token_names(ingredients) -> list:
+    """Lowercased names in an ingredients (qty+unit) string."""
+    if not isinstance(ingredients, str):
+        return []
+    return [token.split(":")[0].strip().lower() for token in ingredients.split(";") if ":" in token]
+
+def _uses_ingredient(name: str, changed: set, aliases: dict) -> bool:
+    """
+    Could this recipe ingredient name resolve to a changed costings row?
+    Mirrors the exact / contains / word matching of find_ingredient_match,
+    erring on the side of too many.
+    """
+    if name in changed or aliases.get(name) in changed:
+        return True
+    parts = [part for part in name.split() if len(part) > 2]
+    return any(name in norm or any(part in norm for part in parts) for norm in changed)
+
+def dirty_menu_items(rec_df: pd.DataFrame, variants_df: pd.DataFrame, changed: set, aliases: dict = None) -> tuple:
+    """
+    Find the menu items whose cost can depend on changed costings rows.
+
+    Batch recipes using a changed ingredient (or a dirty batch) are dirty
+    first; items using a changed ingredient or dirty batch are dirty, then
+    variants of dirty base items (or with a delta using one), then meal
+    deals referencing a changed ingredient or a dirty item. Bases of dirty
+    variants are included so the variant pass can see them.
+
+    Args:
+        rec_df: Recipes DataFrame
+        variants_df: Item variants DataFrame (may be None)
+        changed: Normalized ingredient names that changed
+        aliases: Stored {recipe_name: costings ingredient} lookup (optional)
+
+    Returns:
+        tuple: (lowercased recipe item names, lowercased variant names) to recalculate
+    """
+    aliases = aliases or {}
+    rec_df = normalize_recipe_columns(rec_df.copy())
+    batch_mask = is_batch_recipe(rec_df)
+
+    # Batches can use batches; repeat until no more become dirty
+    batches = dict(zip(rec_df.loc[batch_mask, "Menu Item"].astype(str).str.lower().str.strip(), rec_df.loc[batch_mask, "Ingredients (qty+unit)"]))
+    dirty_batches = set()
+    grew = True
+    while grew:
+        grew = False
+        for name, ingredients in batches.items():
+            if name not in dirty_batches and any(_uses_ingredient(token, changed, aliases) or token in dirty_batches for token in _token_names(ingredients)):
+                dirty_batches.add(name)
+                grew = True
+
+    def uses_changed(token: str) -> bool:
+        return token in dirty_batches or _uses_ingredient(token, changed, aliases)
+
+    rec_df = rec_df[~batch_mask]
+    names = rec_df["Menu Item"].astype(str).str.lower()
+    is_meal = rec_df["Menu Item"].str.contains("Meal:", na=False)
+
+    dirty = set()
+    recipe_names = set()
+    for name, ingredients, meal in zip(names, rec_df["Ingredients (qty+unit)"], is_meal):
+        if not meal:
+            recipe_names.add(name)
+            if any(uses_changed(token) for token in _token_names(ingredients)):
+                dirty.add(name)
+
+    dirty_variants = set()
+    if variants_df is not None and not variants_df.empty:
+        for name, base, delta in zip(variants_df["Menu Item"].astype(str).str.lower(), variants_df["Base Item"].astype(str).str.lower().str.strip(), variants_df["Delta Ingredients"]):
+            # Variants shadowed by a full recipe never reach the results
+            if name in recipe_names:
+                continue
+            if base in dirty or any(uses_changed(token) for token in _token_names(delta)):
+                dirty_variants.add(name)
+                if base in recipe_names:
+                    dirty.add(base)
+
+    # Meal deals look up components as ingredients first, then as menu items
+    dirty_items = dirty | dirty_variants
+    for name, ingredients, meal in zip(names, rec_df["Ingredients (qty+unit)"], is_meal):
+        if meal:
+            for token in _token_names(ingredients):
+                if uses_changed(token) or any(token in item or item in token for item in dirty_items):
+                    dirty.add(name)
+                    break
+
+    return dirty, dirty_variants
+
+def recipes_to_recalculate(rec_df: pd.DataFrame, dirty: set) -> pd.DataFrame:
+    """
+    Recipe rows for the dirty items, plus every batch recipe they may use.
+    """
+    rec_df = normalize_recipe_columns(rec_df.copy())
+    return rec_df[rec_df["Menu Item"].astype(str).str.lower().isin(dirty) | is_batch_recipe(rec_df)]
+
+def splice_results(brand_groups: dict, partial: dict) -> dict:
+    """
+    Replace the records of recalculated items in grouped results, keeping
+    their positions; records not present before are appended to their brand.
+    """
+    replacements = {}
+    for brand, items in partial.items():
+        for item in items:
+            replacements.setdefault((brand, item["Menu Item"]), []).append(item)
+
+    spliced = {}
+    for brand, items in brand_groups.items():
+        spliced[brand] = []
+        for item in items:
+            new_items = replacements.get((brand, item["Menu Item"]))
+            spliced[brand].append(new_items.pop(0) if new_items else item)
+    for (brand, _), new_items in replacements.items():
+        spliced.setdefault(brand, []).extend(new_items)
+    return spliced
+
+def changed_ingredients(old_df: pd.DataFrame, new_df: pd.DataFrame) -> set:
+    """
+    Normalized names of ingredients added, removed or repriced between two
+    resolved costings tables.
+    """
+    old = old_df.drop_duplicates("Ingredient_norm").set_index("Ingredient_norm")["UnitCost"]
+    new = new_df.drop_duplicates("Ingredient_norm").set_index("Ingredient_norm")["UnitCost"]
+    both = old.index.intersection(new.index)
+    repriced = both[~(old.loc[both].to_numpy() == new.loc[both].to_numpy())]
+    return set(old.index.symmetric_difference(new.index)) | set(repriced)
+
+def recalculate_dirty(brand_groups: dict, item_costs: dict, cost_df: pd.DataFrame, rec_df: pd.DataFrame,
+                      menu_df: pd.DataFrame, variants_df: pd.DataFrame, aliases: dict, changed: set) -> tuple:
+    """
+    Recalculate only the menu items that can depend on changed costings rows
+    and splice them into the results. item_costs is updated in place; the
+    unchanged items keep their stored costs, so meal deals still see them.
+
+    Returns:
+        tuple: (spliced results, or None when nothing is dirty; sorted dirty
+        item names; number of records recalculated)
+    """
+    from utils.calculator import calculate_gp
+
+    dirty, dirty_variants = dirty_menu_items(rec_df, variants_df, changed, aliases)
+    if not dirty and not dirty_variants:
+        return None, [], 0
+
+    recipes = recipes_to_recalculate(rec_df, dirty)
+    if variants_df is not None:
+        variants_df = variants_df[variants_df["Menu Item"].astype(str).str.lower().isin(dirty_variants)]
+    partial = calculate_gp(cost_df, recipes, menu_df, aliases, variants_df, known_costs=item_costs)
+    recalculated = sum(len(items) for items in partial.values())
+    return splice_results(brand_groups, partial), sorted(dirty | dirty_variants), recalculated
@@ -0,0 +1,223 @@
+import pandas as pd
+import io
+import os
+from itertools import islice
+from utils.limits import MAX_ROWS, MAX_COLUMNS, UploadTooLargeError
+
+# CSV reader backend: "c" is the pandas default, "pyarrow" parses on every core
+CSV_ENGINE = os.environ.get("FOOD_COST_CSV_ENGINE", "c").lower()
+
+# Explicit dtypes for the known templates (standardized and legacy headers)
+TEMPLATE_SCHEMAS = {
+    "costings": {
+        "Item Name": "object",
+        "Purchase Price": "float64",
+        "Quantity": "float64",
+        "Unit": "object",
+        "Ingredient": "object",
+        "Our Price (£)": "float64",
+        "Pack Size": "float64",
+    },
+    "recipes": {
+        "Menu Item": "object",
+        "Brand": "object",
+        "Category": "object",
+        "Ingredient": "object",
+        "Quantity": "float64",
+        "Unit": "object",
+        "Ingredients (qty+unit)": "object",
+    },
+    "menu": {
+        "Item Name": "object",
+        "Menu Item": "object",
+        "Brand": "object",
+        "Category": "object",
+        "Selling Price": "float64",
+        "Selling Price (£)": "float64",
+    },
+    "variants": {
+        "Base Item Name": "object",
+        "Variant Name": "object",
+        "Selling Price": "float64",
+        "Extra Ingredients": "object",
+        "Brand": "object",
+        "Category": "object",
+    },
+}
+
+def _csv_engine() -> str:
+    """
+    Resolve the configured CSV engine, falling back to the C engine
+    when pyarrow is not installed.
+    """
+    if CSV_ENGINE == "pyarrow":
+        try:
+            import pyarrow  # noqa: F401
+            return "pyarrow"
+        except ImportError:
+            print("pyarrow not installed, using the C CSV engine")
+    return "c"
+
+def _dedupe_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rename repeated headers to "Qty", "Qty.1", ... as the C engine does.
+    Wide recipe sheets repeat the Qty header and pyarrow keeps duplicates.
+    """
+    seen = {}
+    columns = []
+    for col in df.columns:
+        if col in seen:
+            seen[col] += 1
+            columns.append(f"{col}.{seen[col]}")
+        else:
+            seen[col] = 0
+            columns.append(col)
+    df.columns = columns
+    return df
+
+def read_csv_bytes(content: bytes, file_type: str = None, schema: dict = None) -> pd.DataFrame:
+    """
+    Read CSV bytes with the configured engine and the template schema.
+
+    Args:
+        content: Raw file content as bytes
+        file_type: Detected file type used to pick the dtype schema
+        schema: Explicit {column: dtype} to use instead of the template's
+
+    Returns:
+        pd.DataFrame: Parsed data, numeric template columns already typed
+    """
+    engine = _csv_engine()
+    schema = schema or TEMPLATE_SCHEMAS.get(file_type)
+    # Stop one row past the cap so oversized files are rejected without a full parse
+    # (the pyarrow engine has no nrows; the byte limit bounds it instead)
+    row_cap = {"nrows": MAX_ROWS + 1} if engine == "c" else {}
+    df = None
+    if schema:
+        try:
+            df = pd.read_csv(io.BytesIO(content), engine=engine, dtype=schema, **row_cap)
+        except ValueError as e:
+            # Non-numeric values in a numeric column; parsers coerce instead
+            print(f"Typed read failed ({e}), reading without schema")
+    if df is None:
+        df = pd.read_csv(io.BytesIO(content), engine=engine, **row_cap)
+    if engine == "pyarrow":
+        df = _dedupe_columns(df)
+    return df
+
+def read_excel_bytes(content: bytes, file_type: str = None, schema: dict = None) -> pd.DataFrame:
+    """
+    Read the first sheet of an Excel workbook with the template schema.
+
+    Args:
+        content: Raw file content as bytes
+        file_type: Detected file type used to pick the dtype schema
+        schema: Explicit {column: dtype} to use instead of the template's
+
+    Returns:
+        pd.DataFrame: Parsed data, numeric template columns already typed
+    """
+    schema = schema or TEMPLATE_SCHEMAS.get(file_type)
+    if schema:
+        try:
+            return pd.read_excel(io.BytesIO(content), dtype=schema, nrows=MAX_ROWS + 1)
+        except ValueError as e:
+            print(f"Typed read failed ({e}), reading without schema")
+    return pd.read_excel(io.BytesIO(content), nrows=MAX_ROWS + 1)
+
+def read_upload(content: bytes, filename: str, file_type: str = None, schema: dict = None) -> pd.DataFrame:
+    """
+    Read an uploaded CSV/XLSX file, choosing the reader by extension.
+    """
+    if filename.endswith(".csv"):
+        return read_csv_bytes(content, file_type, schema)
+    return read_excel_bytes(content, file_type, schema)
+
+def _sheet_frame(rows: list, header: list) -> pd.DataFrame:
+    """
+    Build a DataFrame from raw sheet rows, dropping blank rows and columns.
+    """
+    keep = [i for i, h in enumerate(header) if h is not None and str(h).strip()]
+    columns = [str(header[i]).strip() for i in keep]
+    data = [[row[i] if i < len(row) else None for i in keep] for row in rows]
+    df = pd.DataFrame(data, columns=columns)
+    df = df.mask(df == "").dropna(how="all").reset_index(drop=True)
+    # Cells are already typed by Excel; let whole-number/float columns become numeric
+    return _dedupe_columns(df.infer_objects())
+
+def _check_header_width(sheet_name: str, header):
+    """
+    Reject a sheet with too many columns before any data rows are read.
+    """
+    width = sum(1 for h in header if h is not None and str(h).strip())
+    if width > MAX_COLUMNS:
+        raise UploadTooLargeError(f"Sheet {sheet_name} has {width} columns (limit {MAX_COLUMNS})")
+
+def read_workbook(content: bytes, classify, wanted=("costings", "recipes", "menu", "variants")) -> list:
+    """
+    Open a workbook once, classify every sheet by its header row and read
+    only the sheets of a wanted type.
+
+    Uses python-calamine when installed, otherwise openpyxl in read-only
+    (streaming) mode.
+
+    Args:
+        content: Raw .xlsx content as bytes
+        classify: Callable(sheet_name, header) -> file type
+        wanted: File types whose sheets are materialized
+
+    Returns:
+        list: (sheet_name, file_type, DataFrame) for each wanted sheet
+    """
+    sheets = []
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        CalamineWorkbook = None
+
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_filelike(io.BytesIO(content))
+        for name in workbook.sheet_names:
+            sheet = workbook.get_sheet_by_name(name)
+            header_rows = sheet.to_python(nrows=1)
+            if not header_rows:
+                continue
+            file_type = classify(name, header_rows[0])
+            if file_type in wanted:
+                _check_header_width(name, header_rows[0])
+                rows = sheet.to_python(nrows=MAX_ROWS + 2)
+                sheets.append((name, file_type, _sheet_frame(rows[1:], rows[0])))
+        return sheets
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            file_type = classify(worksheet.title, list(header))
+            if file_type in wanted:
+                _check_header_width(worksheet.title, header)
+                sheets.append((worksheet.title, file_type, _sheet_frame(list(islice(rows, MAX_ROWS + 1)), list(header))))
+    finally:
+        workbook.close()
+    return sheets
+
+def read_headers(content: bytes) -> list:
+    """
+    Read only the header row of a CSV or Excel file.
+
+    Returns:
+        list: Column names, or None if the content cannot be read
+    """
+    try:
+        return list(pd.read_csv(io.BytesIO(content), nrows=0).columns)
+    except Exception as e:
+        try:
+            return list(pd.read_excel(io.BytesIO(content), nrows=0).columns)
+        except Exception as e2:
+            print(f"Failed to read file: CSV error: {e}, Excel error: {e2}")
+            return None
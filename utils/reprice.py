@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from utils.calculator import result_record
+from utils.rollups import GPRollup
+
+# Default price endings: round up to the next .49 or .99
+DEFAULT_ENDINGS = [0.49, 0.99]
+
+# Rounding slack so a price already on a price point is kept
+EPSILON = 1e-9
+
+def target_prices(food_costs: np.ndarray, gp_pct: np.ndarray) -> np.ndarray:
+    """Prices at which each food cost gives exactly its target GP %."""
+    return food_costs / (1 - gp_pct / 100)
+
+def round_to_endings(prices: np.ndarray, endings: list) -> np.ndarray:
+    """
+    Round every price up to the nearest price ending (e.g. .49 / .99), so
+    the rounded price never drops below the target.
+    """
+    endings = np.asarray(sorted(endings), dtype=float)
+    whole = np.floor(prices)
+    candidates = whole[:, None] + endings[None, :]
+    candidates = np.where(candidates >= prices[:, None] - EPSILON, candidates, candidates + 1)
+    return candidates.min(axis=1)
+
+def round_to_ladder(prices: np.ndarray, ladder: list) -> tuple:
+    """
+    Round every price up to the next rung of a fixed price ladder.
+
+    Returns:
+        tuple: (rounded prices, mask of prices above the top rung, left as NaN)
+    """
+    ladder = np.unique(np.asarray(ladder, dtype=float))
+    positions = np.searchsorted(ladder, prices - EPSILON, side="left")
+    above = positions >= len(ladder)
+    rounded = np.where(above, np.nan, ladder[np.minimum(positions, len(ladder) - 1)])
+    return rounded, above
+
+def _rule_targets(records: pd.DataFrame, rules: list, default_gp_pct) -> np.ndarray:
+    """
+    Target GP % per item: the most specific matching rule (brand and
+    category, then category, then brand), else the default; NaN for none.
+    """
+    brands = records["Brand"].astype(str).str.strip().str.lower()
+    categories = records["Category"].astype(str).str.strip().str.lower()
+    targets = np.full(len(records), np.nan if default_gp_pct is None else float(default_gp_pct))
+    specificity = np.zeros(len(records), dtype=int)
+    for rule in rules:
+        mask = np.ones(len(records), dtype=bool)
+        level = 0
+        if rule.get("brand"):
+            mask &= (brands == str(rule["brand"]).strip().lower()).to_numpy()
+            level += 1
+        if rule.get("category"):
+            mask &= (categories == str(rule["category"]).strip().lower()).to_numpy()
+            level += 2
+        # Later rules of the same specificity override earlier ones
+        mask &= specificity <= level
+        targets[mask] = float(rule["gp_pct"])
+        specificity[mask] = level
+    return targets
+
+def validate_options(rules: list, default_gp_pct, endings: list, ladder: list):
+    """
+    Check repricing options.
+
+    Raises:
+        ValueError: If a GP % is outside [0, 100), a rule has no GP %, or
+            an ending or ladder price is invalid
+    """
+    for rule in rules:
+        if not isinstance(rule, dict) or "gp_pct" not in rule:
+            raise ValueError(f"Every rule needs a gp_pct: {rule!r}")
+    for value in [rule["gp_pct"] for rule in rules] + ([] if default_gp_pct is None else [default_gp_pct]):
+        if not isinstance(value, (int, float)) or not 0 <= value < 100:
+            raise ValueError(f"Target GP % must be a number from 0 to below 100, got {value!r}")
+    if endings is not None and (not endings or any(not isinstance(e, (int, float)) or not 0 <= e < 1 for e in endings)):
+        raise ValueError("Price endings must be fractions from 0 to below 1, e.g. [0.49, 0.99]")
+    if ladder is not None and (not ladder or any(not isinstance(p, (int, float)) or p <= 0 for p in ladder)):
+        raise ValueError("Price ladder must be a list of positive prices")
+
+def reprice(brand_groups: dict, item_costs: dict, rules: list = None, default_gp_pct: float = None,
+            endings: list = None, ladder: list = None, only_increase: bool = False) -> dict:
+    """
+    Solve new selling prices for every item from its computed food cost.
+
+    Each item's target GP % comes from the most specific rule matching its
+    brand and category (or default_gp_pct). The exact target price is
+    rounded up to a price ending, or to the next rung of a price ladder when
+    one is given (items above the top rung fall back to the endings). Items
+    without a target or without a food cost keep their price.
+
+    Args:
+        brand_groups: Results from calculate_gp
+        item_costs: Unrounded {menu item: food cost}; rounded record costs
+            are used for items not in it (meal deals)
+        rules: [{"brand": ..., "category": ..., "gp_pct": 70}], brand and
+            category optional
+        default_gp_pct: Target for items no rule matches
+        endings: Price endings, DEFAULT_ENDINGS when not given
+        ladder: Allowed prices, overriding endings where they reach
+        only_increase: Never lower a current price
+
+    Returns:
+        dict: "items" with current and new prices per item, "changed" and
+        "unpriced" counts, and "current" / "projected" GP rollups
+    """
+    rules = rules or []
+    endings = DEFAULT_ENDINGS if endings is None else endings
+    validate_options(rules, default_gp_pct, endings, ladder)
+
+    items = [item for group in brand_groups.values() for item in group]
+    records = pd.DataFrame.from_records(items, columns=["Brand", "Menu Item", "Category", "Food Cost (£)", "Selling Price (£)", "GP %", "Notes"])
+    costs = np.array([item_costs.get(item["Menu Item"], item["Food Cost (£)"]) for item in items], dtype=float)
+    current = records["Selling Price (£)"].to_numpy(dtype=float)
+    targets = _rule_targets(records, rules, default_gp_pct)
+
+    solvable = ~np.isnan(targets) & (costs > 0)
+    exact = np.where(solvable, target_prices(costs, np.nan_to_num(targets)), 0.0)
+    rounded = round_to_endings(exact, endings)
+    above_ladder = np.zeros(len(items), dtype=bool)
+    if ladder is not None:
+        on_ladder, above_ladder = round_to_ladder(exact, ladder)
+        rounded = np.where(above_ladder, rounded, on_ladder)
+    if only_increase:
+        rounded = np.maximum(rounded, current)
+    new = np.round(np.where(solvable, rounded, current), 2)
+
+    results = []
+    projected = {}
+    for i, item in enumerate(items):
+        record = result_record(item["Brand"], item["Menu Item"], item["Category"], costs[i], new[i], [note for note in item["Notes"].split("; ") if note])
+        projected.setdefault(item["Brand"], []).append(record)
+        change = new[i] - current[i]
+        results.append({
+            "brand": item["Brand"],
+            "item": item["Menu Item"],
+            "category": item["Category"],
+            "food_cost": item["Food Cost (£)"],
+            "target_gp_pct": None if np.isnan(targets[i]) else float(targets[i]),
+            "current_price": float(current[i]),
+            "new_price": float(new[i]),
+            "change": round(float(change), 2),
+            "change_pct": round(float(change / current[i] * 100), 2) if current[i] else None,
+            "current_gp_pct": item["GP %"],
+            "new_gp_pct": record["GP %"],
+            "above_ladder": bool(above_ladder[i]),
+        })
+
+    return {
+        "items": results,
+        "changed": int((np.abs(new - current) >= 0.005).sum()),
+        "unpriced": int((~solvable).sum()),
+        "current": GPRollup.from_results(brand_groups).to_dict(),
+        "projected": GPRollup.from_results(projected).to_dict(),
+    }
@@ -0,0 +1,83 @@
+HIGH_GP_PCT = 70  # At or above: high margin
+LOW_GP_PCT = 65   # Below: low margin
+
+def _new_bucket() -> dict:
+    return {"count": 0, "gp_pct_sum": 0.0, "high_margin": 0, "low_margin": 0,
+            "food_cost": 0.0, "sales": 0.0, "gp": 0.0}
+
+def _add_to_bucket(bucket: dict, item: dict):
+    gp_pct = item["GP %"]
+    bucket["count"] += 1
+    bucket["gp_pct_sum"] += gp_pct
+    bucket["high_margin"] += gp_pct >= HIGH_GP_PCT
+    bucket["low_margin"] += gp_pct < LOW_GP_PCT
+    bucket["food_cost"] += item["Food Cost (£)"]
+    bucket["sales"] += item["Selling Price (£)"]
+    bucket["gp"] += item["GP £"]
+
+def _merge_bucket(bucket: dict, other: dict):
+    for key, value in other.items():
+        bucket[key] += value
+
+def _bucket_summary(bucket: dict) -> dict:
+    count = bucket["count"]
+    sales = bucket["sales"]
+    return {
+        "count": count,
+        "avg_gp_pct": round(bucket["gp_pct_sum"] / count, 2) if count else 0,
+        "high_margin": int(bucket["high_margin"]),
+        "low_margin": int(bucket["low_margin"]),
+        "total_food_cost": round(bucket["food_cost"], 2),
+        "total_sales": round(sales, 2),
+        "total_gp": round(bucket["gp"], 2),
+        "food_cost_pct": round(bucket["food_cost"] / sales * 100, 2) if sales else 0,
+    }
+
+class GPRollup:
+    """
+    Running GP aggregates per brand, per category and overall.
+
+    Items are added one at a time as results are produced, so summaries
+    never rescan the results; partial rollups from brand partitions are
+    combined with merge().
+    """
+    def __init__(self):
+        self.overall = _new_bucket()
+        self.brands = {}
+        self.categories = {}
+
+    def add(self, item: dict):
+        """Add one result item (a calculate_gp record)."""
+        _add_to_bucket(self.overall, item)
+        _add_to_bucket(self.brands.setdefault(item["Brand"], _new_bucket()), item)
+        _add_to_bucket(self.categories.setdefault(str(item.get("Category", "")), _new_bucket()), item)
+
+    def merge(self, other: "GPRollup"):
+        """Fold another rollup (e.g. from a worker process) into this one."""
+        _merge_bucket(self.overall, other.overall)
+        for name, bucket in other.brands.items():
+            _merge_bucket(self.brands.setdefault(name, _new_bucket()), bucket)
+        for name, bucket in other.categories.items():
+            _merge_bucket(self.categories.setdefault(name, _new_bucket()), bucket)
+
+    def brand_summary(self, brand: str) -> dict:
+        return _bucket_summary(self.brands.get(brand, _new_bucket()))
+
+    def overall_summary(self) -> dict:
+        return _bucket_summary(self.overall)
+
+    def to_dict(self) -> dict:
+        return {
+            "overall": _bucket_summary(self.overall),
+            "brands": {name: _bucket_summary(bucket) for name, bucket in self.brands.items()},
+            "categories": {name: _bucket_summary(bucket) for name, bucket in self.categories.items()},
+        }
+
+    @classmethod
+    def from_results(cls, brand_groups: dict) -> "GPRollup":
+        """Build a rollup from already grouped results."""
+        rollup = cls()
+        for brand_items in brand_groups.values():
+            for item in brand_items:
+                rollup.add(item)
+        return rollup
@@ -0,0 +1,293 @@
+import os
+import numpy as np
+import pandas as pd
+from utils.limits import MAX_ROWS, check_table_size
+
+# Rows read per chunk of a sales export; bounds memory whatever the file size
+SALES_CHUNK_ROWS = int(os.environ.get("FOOD_COST_SALES_CHUNK_ROWS", "250000"))
+
+# Partial aggregate rows held before they are combined
+COMPACT_ROWS = 1_000_000
+
+# Accepted header names (lowercased) for each sales column
+SALES_COLUMNS = {
+    "Item": ["item", "menu item", "item name", "product", "product name", "description"],
+    "Date": ["date", "business date", "transaction date", "sale date", "datetime", "timestamp"],
+    "Site": ["site", "location", "store", "outlet", "venue"],
+    "Qty": ["qty", "quantity", "units", "qty sold", "units sold", "count"],
+    "Net Revenue": ["net revenue", "net sales", "net", "revenue", "net amount", "sales"],
+}
+
+PERIODS = {"D": "D", "W": "W-SUN", "M": "M"}
+
+# Menu-engineering popularity rule: an item is popular when its share of
+# the brand's units is at least 70% of an equal share
+POPULARITY_FACTOR = 0.7
+
+KEYS = ["Item_norm", "Site", "Period"]
+
+def resolve_sales_columns(columns) -> dict:
+    """
+    Map raw sales headers to Item, Date, Site, Qty and Net Revenue.
+
+    Raises:
+        ValueError: If there is no item or quantity column
+    """
+    mapping = {}
+    for standard, names in SALES_COLUMNS.items():
+        for col in columns:
+            if str(col).strip().lower() in names and col not in mapping:
+                mapping[col] = standard
+                break
+    missing = [col for col in ["Item", "Qty"] if col not in mapping.values()]
+    if missing:
+        raise ValueError(f"Sales file is missing columns: {missing}. Available columns: {list(columns)}")
+    return mapping
+
+def _normalize_names(values: pd.Series) -> pd.Series:
+    # POS exports repeat a few hundred names; normalize each distinct one once
+    codes, uniques = pd.factorize(values)
+    names = pd.Index(uniques).astype(str).str.strip().str.lower()
+    return pd.Series(np.asarray(names, dtype=object)[codes], index=values.index).where(codes >= 0)
+
+def _to_number(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(values):
+        return values
+    # Currency symbols and thousands separators in exported amounts
+    return pd.to_numeric(values.astype(str).str.replace(r"[£$€,\s]", "", regex=True), errors="coerce")
+
+def _period_starts(values: pd.Series, period: str) -> pd.Series:
+    # Dates repeat across lines too: parse the distinct strings only
+    codes, uniques = pd.factorize(values)
+    dates = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce", dayfirst=True, format="mixed")
+    starts = dates.dt.to_period(PERIODS[period]).dt.start_time.dt.strftime("%Y-%m-%d").to_numpy(dtype=object)
+    return pd.Series(starts[codes], index=values.index).where(codes >= 0)
+
+class SalesAggregator:
+    """
+    Running item/site/period totals over chunks of sales lines.
+
+    Chunks are grouped as they arrive and the partial totals are combined
+    whenever they pass COMPACT_ROWS, so memory depends on the number of
+    distinct items, sites and periods rather than on the number of lines.
+
+    Args:
+        period: "D", "W" (weeks starting Monday) or "M"
+    """
+    def __init__(self, period: str = "W"):
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period {period!r}; use one of {list(PERIODS)}")
+        self.period = period
+        self.lines = 0
+        self.skipped = 0
+        self._partials = []
+        self._partial_rows = 0
+
+    def add_chunk(self, chunk: pd.DataFrame):
+        """Add a chunk of sales lines with standard column names."""
+        self.lines += len(chunk)
+        revenue = _to_number(chunk["Net Revenue"]) if "Net Revenue" in chunk else pd.Series(np.nan, index=chunk.index)
+        frame = pd.DataFrame({
+            "Item_norm": _normalize_names(chunk["Item"]),
+            "Site": chunk["Site"].fillna("All").astype(str).str.strip() if "Site" in chunk else "All",
+            "Period": _period_starts(chunk["Date"], self.period) if "Date" in chunk else "All",
+            "Qty": _to_number(chunk["Qty"]),
+            # Missing revenue is counted so it can be told apart from zero
+            "Net Revenue": revenue.fillna(0.0),
+            "Revenue Lines": revenue.notna().astype(np.int64),
+            "Lines": 1,
+        })
+        valid = frame["Item_norm"].notna() & frame["Qty"].notna() & frame["Period"].notna()
+        self.skipped += int((~valid).sum())
+        self._append(frame[valid])
+
+    def _append(self, frame: pd.DataFrame):
+        grouped = _group(frame)
+        self._partials.append(grouped)
+        self._partial_rows += len(grouped)
+        if self._partial_rows > COMPACT_ROWS:
+            self._partials = [_group(pd.concat(self._partials, ignore_index=True))]
+            self._partial_rows = len(self._partials[0])
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: One row per item, site and period with Qty,
+            Net Revenue (NaN when the export had none) and Lines
+        """
+        if not self._partials:
+            return pd.DataFrame({"Item_norm": [], "Site": [], "Period": [], "Qty": [], "Net Revenue": [], "Lines": []})
+        sales = _group(pd.concat(self._partials, ignore_index=True))
+        sales["Net Revenue"] = sales["Net Revenue"].where(sales["Revenue Lines"] > 0)
+        return sales.drop(columns="Revenue Lines")
+
+def _group(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.groupby(KEYS, sort=False, as_index=False)[["Qty", "Net Revenue", "Revenue Lines", "Lines"]].sum()
+
+def read_sales(source, filename: str, period: str = "W", chunk_rows: int = SALES_CHUNK_ROWS) -> tuple:
+    """
+    Stream a POS sales export into item/site/period totals.
+
+    CSV (optionally .csv.gz) exports are read chunk_rows lines at a time,
+    loading only the mapped columns; Excel sheets are read whole, so they
+    are held to the MAX_ROWS limit of uploaded sheets.
+
+    Args:
+        source: Binary file object (or path) holding the export
+        filename: Original file name, used to pick the reader
+        period: Period the dates are bucketed into ("D", "W" or "M")
+        chunk_rows: Lines read per chunk
+
+    Returns:
+        tuple: (aggregated DataFrame, stats dict)
+
+    Raises:
+        UploadTooLargeError: If an Excel sheet has more than MAX_ROWS rows
+    """
+    aggregator = SalesAggregator(period)
+    name = filename.lower()
+    if name.endswith((".xlsx", ".xlsm", ".xls")):
+        mapping = resolve_sales_columns(pd.read_excel(source, nrows=0).columns)
+        if hasattr(source, "seek"):
+            source.seek(0)
+        # One row past the limit is enough to reject the sheet
+        df = pd.read_excel(source, usecols=list(mapping), nrows=MAX_ROWS + 1)
+        check_table_size(df, filename)
+        df = df.rename(columns=mapping)
+        for start in range(0, len(df), chunk_rows):
+            aggregator.add_chunk(df.iloc[start:start + chunk_rows])
+    else:
+        compression = "gzip" if name.endswith(".gz") else None
+        header = pd.read_csv(source, nrows=0, compression=compression).columns
+        mapping = resolve_sales_columns(header)
+        if hasattr(source, "seek"):
+            source.seek(0)
+        # Text columns stay text; numbers are inferred so "12.50" and "£12.50" both load
+        dtypes = {raw: "object" for raw, standard in mapping.items() if standard not in ("Qty", "Net Revenue")}
+        reader = pd.read_csv(source, usecols=list(mapping), dtype=dtypes, chunksize=chunk_rows, compression=compression)
+        for chunk in reader:
+            aggregator.add_chunk(chunk.rename(columns=mapping))
+
+    sales = aggregator.result()
+    periods = sales.loc[sales["Period"] != "All", "Period"]
+    stats = {
+        "lines": aggregator.lines,
+        "skipped_lines": aggregator.skipped,
+        "items": int(sales["Item_norm"].nunique()),
+        "sites": sorted(sales["Site"].unique().tolist()),
+        "periods": int(sales["Period"].nunique()),
+        "first_period": periods.min() if len(periods) else None,
+        "last_period": periods.max() if len(periods) else None,
+        "period": period,
+    }
+    return sales, stats
+
+def filter_sales(sales: pd.DataFrame, site: str = None, start: str = None, end: str = None) -> pd.DataFrame:
+    """Restrict aggregated sales to a site and to periods starting in [start, end]."""
+    mask = pd.Series(True, index=sales.index)
+    if site:
+        mask &= sales["Site"].str.lower() == site.strip().lower()
+    if start:
+        mask &= sales["Period"] >= start
+    if end:
+        mask &= sales["Period"] <= end
+    return sales[mask]
+
+def period_volumes(sales: pd.DataFrame, item: str = None) -> list:
+    """
+    Units, revenue and lines per period, for one item or the whole menu.
+    """
+    if item:
+        sales = sales[sales["Item_norm"] == item.strip().lower()]
+    grouped = sales.groupby("Period", sort=True).agg(
+        Qty=("Qty", "sum"), Revenue=("Net Revenue", lambda x: x.sum(min_count=1)), Lines=("Lines", "sum"),
+    )
+    return [
+        {"period": period, "qty": float(row.Qty), "net_revenue": None if pd.isna(row.Revenue) else round(float(row.Revenue), 2), "lines": int(row.Lines)}
+        for period, row in zip(grouped.index, grouped.itertuples(index=False))
+    ]
+
+def _quadrant(popular: np.ndarray, profitable: np.ndarray) -> np.ndarray:
+    return np.select(
+        [popular & profitable, popular & ~profitable, ~popular & profitable],
+        ["Star", "Plowhorse", "Puzzle"],
+        "Dog",
+    )
+
+def menu_engineering(brand_groups: dict, sales: pd.DataFrame, unmatched_limit: int = 50) -> dict:
+    """
+    Join item sales with the costed results and classify every menu item.
+
+    Contribution is net revenue less food cost times units sold (menu price
+    times units when the export has no revenue). Per brand, an item is
+    popular when its share of units is at least 70% of an equal share, and
+    profitable when its contribution per unit is at least the brand's
+    sales-weighted average, giving the Star / Plowhorse / Puzzle / Dog
+    quadrants.
+
+    Args:
+        brand_groups: Grouped calculate_gp results
+        sales: Aggregated sales (from read_sales, optionally filtered)
+        unmatched_limit: Most unmatched sales items listed
+
+    Returns:
+        dict: {"brands": {brand: totals, thresholds and items}, "unmatched": [...]}
+    """
+    results = pd.DataFrame.from_records([item for items in brand_groups.values() for item in items])
+    results["Item_norm"] = results["Menu Item"].astype(str).str.strip().str.lower()
+
+    item_sales = sales.groupby("Item_norm", sort=False).agg(
+        Qty=("Qty", "sum"), Revenue=("Net Revenue", lambda x: x.sum(min_count=1)),
+    )
+    merged = results.join(item_sales, on="Item_norm")
+    qty = merged["Qty"].fillna(0.0).to_numpy()
+    food_cost = merged["Food Cost (£)"].to_numpy(dtype=float)
+    price = merged["Selling Price (£)"].to_numpy(dtype=float)
+    revenue = merged["Revenue"].fillna(pd.Series(price * qty, index=merged.index)).to_numpy(dtype=float)
+    contribution = revenue - food_cost * qty
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unit_contribution = np.where(qty > 0, contribution / qty, price - food_cost)
+        item_gp_pct = np.where(revenue > 0, contribution / revenue * 100, 0.0)
+
+    merged = merged.assign(Qty=qty, Revenue=revenue, Contribution=contribution, Unit=unit_contribution, WeightedGP=item_gp_pct)
+
+    brands = {}
+    for brand, group in merged.groupby("Brand", sort=False):
+        total_qty = group["Qty"].sum()
+        total_revenue = group["Revenue"].sum()
+        total_contribution = group["Contribution"].sum()
+        mix = group["Qty"].to_numpy() / total_qty * 100 if total_qty else np.zeros(len(group))
+        popularity_threshold = 100 / len(group) * POPULARITY_FACTOR
+        margin_threshold = total_contribution / total_qty if total_qty else group["Unit"].mean()
+        quadrants = _quadrant(mix >= popularity_threshold, group["Unit"].to_numpy() >= margin_threshold)
+
+        items = [
+            {
+                "Menu Item": name, "Category": category, "Qty Sold": float(units), "Mix %": round(float(share), 2),
+                "Net Revenue (£)": round(float(rev), 2), "Food Cost (£)": round(float(cost), 2),
+                "Unit Contribution (£)": round(float(unit), 2), "Contribution (£)": round(float(contrib), 2),
+                "GP %": round(float(gp), 2), "Quadrant": quadrant,
+            }
+            for name, category, units, share, rev, cost, unit, contrib, gp, quadrant in zip(
+                group["Menu Item"], group["Category"], group["Qty"], mix, group["Revenue"], group["Food Cost (£)"],
+                group["Unit"], group["Contribution"], group["WeightedGP"], quadrants,
+            )
+        ]
+        items.sort(key=lambda item: item["Contribution (£)"], reverse=True)
+        brands[brand] = {
+            "total_qty": float(total_qty),
+            "total_net_revenue": round(float(total_revenue), 2),
+            "total_contribution": round(float(total_contribution), 2),
+            "weighted_gp_pct": round(float(total_contribution / total_revenue * 100), 2) if total_revenue else 0,
+            "popularity_threshold_pct": round(popularity_threshold, 2),
+            "margin_threshold": round(float(margin_threshold), 2),
+            "quadrants": {name: int((quadrants == name).sum()) for name in ["Star", "Plowhorse", "Puzzle", "Dog"]},
+            "items": items,
+        }
+
+    unmatched = item_sales[~item_sales.index.isin(results["Item_norm"])].sort_values("Qty", ascending=False)
+    return {
+        "brands": brands,
+        "unmatched": [{"item": name, "qty": float(units)} for name, units in zip(unmatched.index[:unmatched_limit], unmatched["Qty"][:unmatched_limit])],
+        "unmatched_items": len(unmatched),
+    }
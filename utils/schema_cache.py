@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+from utils.detect_type import NAME_KEYWORDS
+
+# Header fingerprint -> resolved file type, column mapping and dtypes
+SCHEMA_CACHE_PATH = os.environ.get("FOOD_COST_SCHEMA_CACHE_PATH", "data/schema_cache.json")
+SCHEMA_CACHE_ENABLED = os.environ.get("FOOD_COST_SCHEMA_CACHE", "1") != "0"
+
+def header_fingerprint(columns, name: str = "") -> str:
+    """
+    Hash a header row together with the type keyword in its file or sheet name.
+
+    The keyword is included because the same headers can mean costings in
+    "Supplier - Product list" and menu prices in "Brand - menu". Headers
+    keep their case, since cached mappings are keyed by the raw names.
+
+    Args:
+        columns: Header row values
+        name: File or sheet name
+
+    Returns:
+        str: Hex digest identifying the layout
+    """
+    normalized = [str(c).strip() for c in columns if c is not None and str(c).strip()]
+    name_lower = (name or "").lower()
+    hint = next((word for word in NAME_KEYWORDS if word in name_lower), "")
+    return hashlib.sha1("\x1f".join([hint] + normalized).encode("utf-8")).hexdigest()
+
+class SchemaCache:
+    """
+    Persistent map from header fingerprints to the file type, column mapping
+    and dtypes resolved the first time a layout was seen and parsed.
+
+    Entries are only stored after a successful parse, and are dropped when
+    a later parse with the cached mapping fails.
+    """
+    def __init__(self, path: str = SCHEMA_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _ensure_loaded(self):
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: ignoring unreadable schema cache: {e}")
+
+    def get(self, fingerprint: str) -> dict:
+        """Get the cached entry for a header fingerprint, or None."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._entries.get(fingerprint)
+
+    def put(self, fingerprint: str, file_type: str, mapping: dict, dtypes: dict = None):
+        """
+        Store a validated layout.
+
+        Args:
+            fingerprint: From header_fingerprint
+            file_type: Detected type ('costings', 'recipes', 'menu', 'variants')
+            mapping: {raw column: standard column} used by the parser
+            dtypes: {raw column: dtype} for the typed reader (optional)
+        """
+        entry = {"file_type": file_type, "mapping": mapping, "dtypes": dtypes}
+        with self._lock:
+            self._ensure_loaded()
+            if self._entries.get(fingerprint) == entry:
+                return
+            self._entries[fingerprint] = entry
+            self._save()
+
+    def discard(self, fingerprint: str):
+        """Forget a layout whose cached mapping no longer parses."""
+        with self._lock:
+            self._ensure_loaded()
+            if self._entries.pop(fingerprint, None) is not None:
+                self._save()
+
+    def _save(self):
+        # Written atomically; a read-only filesystem just means no caching
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not save schema cache: {e}")
@@ -0,0 +1,168 @@
+import re
+import numpy as np
+import pandas as pd
+from utils.parse_costings import parse_costings
+from utils.calculator import result_record, find_menu_item_cost
+from utils.rollups import GPRollup
+
+# Column names accepted as the site of an override row
+SITE_COLUMNS = ["site", "location", "store", "outlet", "venue"]
+
+# Meal-deal notes quote the referenced item's cost, which differs per site
+REFERENCED_NOTE = re.compile(r"^REFERENCED: (?P<name>.+) \(menu item cost: £[-\d\.]+\)$")
+
+def parse_site_overrides(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse a per-site price file: a site column plus the usual costings
+    columns, holding only the rows whose price differs from the base list.
+
+    Returns:
+        pd.DataFrame: Site, Ingredient, Ingredient_norm and UnitCost, one
+        row per site and ingredient (the last one listed wins)
+
+    Raises:
+        ValueError: If there is no site column, a row has no site or
+            costings columns are missing
+    """
+    df.columns = df.columns.str.strip()
+    site_col = next((col for col in df.columns if col.lower() in SITE_COLUMNS), None)
+    if site_col is None:
+        raise ValueError(f"Site price file needs a Site column. Available columns: {list(df.columns)}")
+    sites = df[site_col].where(df[site_col].notna(), "").astype(str).str.strip()
+    # Row numbers as in the file, after the header row
+    blank = [str(i + 2) for i, site in enumerate(sites) if not site]
+    if blank:
+        rows = ", ".join(blank[:10]) + (", ..." if len(blank) > 10 else "")
+        raise ValueError(f"Site price file has rows without a site: {rows}")
+    costings = parse_costings(df.drop(columns=site_col))
+    overrides = pd.DataFrame({
+        "Site": sites.loc[costings.index],
+        "Ingredient": costings["Ingredient"],
+        "Ingredient_norm": costings["Ingredient_norm"],
+        "UnitCost": costings["UnitCost"].astype(float),
+    })
+    return overrides.drop_duplicates(["Site", "Ingredient_norm"], keep="last").reset_index(drop=True)
+
+class SiteCosts:
+    """
+    Food costs of every item at every site, as the base costs plus the
+    effect of each site's overrides.
+
+    Only the overridden ingredients become matrix columns: the usage of
+    those K ingredients by the N items (N x K) times the K x S matrix of
+    per-site unit-cost changes gives every site's cost changes in one
+    product. Memory grows with the overrides, not with sites × catalogue.
+
+    Args:
+        brand_groups: Base results from calculate_gp
+        item_costs: Unrounded base {menu item: food cost}
+        item_usage: {menu item: {Ingredient_norm: quantity}} from ingredient_usage
+        cost_df: Base costings
+        overrides: Parsed site overrides (parse_site_overrides)
+    """
+    def __init__(self, brand_groups: dict, item_costs: dict, item_usage: dict, cost_df: pd.DataFrame, overrides: pd.DataFrame):
+        self.records = [item for items in brand_groups.values() for item in items]
+        self.sites = list(dict.fromkeys(overrides["Site"]))
+
+        base_unit = cost_df.drop_duplicates("Ingredient_norm").set_index("Ingredient_norm")["UnitCost"]
+        known = overrides["Ingredient_norm"].isin(base_unit.index)
+        self.unknown = sorted(overrides.loc[~known, "Ingredient"].astype(str).unique())
+        overrides = overrides[known]
+
+        ingredients = list(dict.fromkeys(overrides["Ingredient_norm"]))
+        column = {name: k for k, name in enumerate(ingredients)}
+        site_index = {site: s for s, site in enumerate(self.sites)}
+
+        # K x S unit-cost changes; sites without an override keep zeros
+        self.deltas = np.zeros((len(ingredients), len(self.sites)))
+        self.deltas[overrides["Ingredient_norm"].map(column).to_numpy(), overrides["Site"].map(site_index).to_numpy()] = (
+            overrides["UnitCost"].to_numpy() - base_unit.loc[overrides["Ingredient_norm"]].to_numpy()
+        )
+
+        # N x K usage of the overridden ingredients only
+        self.usage = np.zeros((len(self.records), len(ingredients)))
+        for i, item in enumerate(self.records):
+            for name, qty in item_usage.get(item["Menu Item"], {}).items():
+                k = column.get(name)
+                if k is not None:
+                    self.usage[i, k] = qty
+
+        # Meal deals are not in item_costs; cost them from their usage
+        def base_cost(name):
+            if name in item_costs:
+                return item_costs[name]
+            return sum(qty * base_unit.get(ingredient, 0.0) for ingredient, qty in item_usage.get(name, {}).items())
+        self.base = np.array([base_cost(item["Menu Item"]) for item in self.records], dtype=float)
+        self.item_costs = item_costs
+        self.prices = np.array([item["Selling Price (£)"] for item in self.records], dtype=float)
+        self.override_counts = overrides["Site"].value_counts()
+
+    def cost_changes(self, sites: list = None) -> np.ndarray:
+        """N x S food cost changes for the given sites (all by default)."""
+        columns = [self.sites.index(site) for site in sites] if sites is not None else slice(None)
+        return self.usage @ self.deltas[:, columns]
+
+    def overview(self) -> list:
+        """
+        Per-site totals computed for all sites at once: items whose cost
+        changes, total food cost and average GP % against the base menu.
+        """
+        changes = self.cost_changes()
+        costs = self.base[:, None] + changes
+        priced = self.prices[:, None] > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gp_pct = np.where(priced, np.round((self.prices[:, None] - costs) / self.prices[:, None] * 100, 1), 0.0)
+        base_gp = np.array([item["GP %"] for item in self.records], dtype=float)
+        base_avg = base_gp.mean() if len(base_gp) else 0.0
+        changed = np.abs(np.round(costs, 2) - np.round(self.base[:, None], 2)) > 0
+
+        overview = []
+        for s, site in enumerate(self.sites):
+            avg_gp = gp_pct[:, s].mean() if len(gp_pct) else 0.0
+            overview.append({
+                "site": site,
+                "overrides": int(self.override_counts.get(site, 0)),
+                "items_changed": int(changed[:, s].sum()),
+                "total_food_cost": round(float(costs[:, s].sum()), 2),
+                "food_cost_change": round(float(changes[:, s].sum()), 2),
+                "avg_gp_pct": round(float(avg_gp), 2),
+                "gp_pct_change": round(float(avg_gp - base_avg), 2),
+            })
+        return overview
+
+    def site_results(self, site: str) -> dict:
+        """
+        Full results for one site, grouped by brand: base records, with the
+        items its overrides touch rebuilt at the site's cost.
+
+        Raises:
+            KeyError: If the site has no overrides
+        """
+        if site not in self.sites:
+            raise KeyError(site)
+        changes = self.cost_changes([site])[:, 0]
+        item_changes = {}
+        for item, change in zip(self.records, changes):
+            item_changes.setdefault(item["Menu Item"], change)
+        # Same names and order as the costs meal deals looked items up in
+        site_costs = {name: cost + item_changes.get(name, 0.0) for name, cost in self.item_costs.items()}
+
+        brand_groups = {}
+        for item, base, change in zip(self.records, self.base, changes):
+            if change:
+                notes = [self._site_note(note, site_costs) for note in item["Notes"].split("; ") if note]
+                item = result_record(item["Brand"], item["Menu Item"], item["Category"], base + change, item["Selling Price (£)"], notes)
+            brand_groups.setdefault(item["Brand"], []).append(item)
+        return brand_groups
+
+    @staticmethod
+    def _site_note(note: str, site_costs: dict) -> str:
+        match = REFERENCED_NOTE.match(note)
+        if not match:
+            return note
+        cost = find_menu_item_cost(match.group("name"), site_costs)
+        return note if cost is None else f"REFERENCED: {match.group('name')} (menu item cost: £{cost:.2f})"
+
+    def site_summary(self, site: str) -> dict:
+        """GP rollup of one site's results."""
+        return GPRollup.from_results(self.site_results(site)).to_dict()
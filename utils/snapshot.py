@@ -0,0 +1,268 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+from utils.calculator import RECIPE_LINES, parse_recipe_lines
+
+# Latest parsed and costed model, restored by new workers at startup
+SNAPSHOT_DIR = os.environ.get("FOOD_COST_SNAPSHOT_DIR", "data/snapshot")
+
+# Snapshot versions kept on disk; older ones are removed after each save
+KEEP_SNAPSHOTS = 2
+
+TABLES = ["costings", "costings_all", "recipes", "menu", "variants"]
+
+# Parsed from other columns when loaded rather than stored
+DERIVED_COLUMNS = [RECIPE_LINES]
+
+# (record field, snapshot column) pairs for the results
+RESULT_FIELDS = [
+    ("Brand", "brand"), ("Menu Item", "item"), ("Category", "category"),
+    ("Food Cost (£)", "food_cost"), ("Selling Price (£)", "price"),
+    ("GP £", "gp"), ("GP %", "gp_pct"), ("Notes", "notes"),
+]
+
+_VERSION_DIR = re.compile(r"^v(\d{6})$")
+_save_lock = threading.Lock()
+
+def _save_column(directory: str, name: str, values) -> dict:
+    """
+    Write one column as .npy files: numbers as one float/int array; anything
+    else as text, dictionary-encoded into int32 codes (-1 for missing) plus
+    the distinct strings as UTF-8 bytes and their offsets.
+    """
+    series = pd.Series(values)
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        np.save(os.path.join(directory, f"{name}.npy"), series.to_numpy())
+        return {"file": f"{name}.npy", "kind": "number"}
+
+    codes, uniques = pd.factorize(series)
+    encoded = [str(value).encode("utf-8") for value in uniques]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    np.save(os.path.join(directory, f"{name}.npy"), codes.astype(np.int32))
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+    np.save(os.path.join(directory, f"{name}.bytes.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    return {"file": f"{name}.npy", "kind": "strings", "offsets": f"{name}.offsets.npy", "bytes": f"{name}.bytes.npy"}
+
+def _load_column(directory: str, spec: dict):
+    """
+    Load one column saved by _save_column. Number columns are memory-mapped
+    copy-on-write and used as they are; text columns decode each distinct
+    string once and expand the mapped codes.
+    """
+    values = np.load(os.path.join(directory, spec["file"]), mmap_mode="c")
+    if spec["kind"] == "number":
+        return values
+    offsets = np.load(os.path.join(directory, spec["offsets"]), mmap_mode="r")
+    data = np.load(os.path.join(directory, spec["bytes"]), mmap_mode="r")
+    lookup = np.empty(len(offsets), dtype=object)
+    lookup[:-1] = [data[start:end].tobytes().decode("utf-8") for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+    lookup[-1] = np.nan  # code -1
+    return lookup.take(values)
+
+def _versions(path: str) -> list:
+    if not os.path.isdir(path):
+        return []
+    return sorted(int(m.group(1)) for m in map(_VERSION_DIR.match, os.listdir(path)) if m)
+
+def _read_manifest(directory: str) -> dict:
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+def _link_files(source: str, target: str, spec: dict):
+    for key in ["file", "offsets", "bytes"]:
+        if spec.get(key):
+            try:
+                os.link(os.path.join(source, spec[key]), os.path.join(target, spec[key]))
+            except OSError:
+                # Filesystems without hard links get a copy
+                shutil.copyfile(os.path.join(source, spec[key]), os.path.join(target, spec[key]))
+
+def save_snapshot(state: dict, path: str = SNAPSHOT_DIR, previous: dict = None) -> int:
+    """
+    Write the parsed tables, item costs, results and summary as a new
+    snapshot version.
+
+    Every column is stored as .npy files readers can memory-map; the
+    manifest lists tables, columns and column kinds. The version directory
+    is renamed into place and then CURRENT is switched to it, so readers
+    never see a partial snapshot.
+
+    Updates such as price patches leave most tables as they were: a table
+    that is the same object as in `previous` is hard-linked from that
+    version instead of written again.
+
+    Args:
+        state: Dict with "costings", "costings_all", "recipes", "menu", "variants" DataFrames
+            (or None), "item_costs", "results" and "summary"
+        path: Snapshot root directory
+        previous: {"version": n, "tables": {table: DataFrame}} of an earlier save
+
+    Returns:
+        int: The new snapshot version
+    """
+    with _save_lock:
+        os.makedirs(path, exist_ok=True)
+        version = (_versions(path) or [0])[-1] + 1
+        staging = os.path.join(path, f".v{version:06d}.{os.getpid()}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        manifest = {"version": version, "created": time.time(), "tables": {}, "summary": state.get("summary")}
+        reused, reused_manifest = None, None
+        if previous:
+            reused = os.path.join(path, f"v{previous['version']:06d}")
+            # Other workers may have pruned it since
+            reused_manifest = _read_manifest(reused) if os.path.isdir(reused) else None
+
+        for table in TABLES:
+            df = state.get(table)
+            if df is None:
+                manifest["tables"][table] = None
+                continue
+            unchanged = reused_manifest and reused_manifest["tables"].get(table)
+            if unchanged and previous["tables"].get(table) is df:
+                for spec in unchanged["columns"]:
+                    _link_files(reused, staging, spec)
+                manifest["tables"][table] = unchanged
+                continue
+            columns = []
+            for i, name in enumerate(df.columns):
+                if name in DERIVED_COLUMNS:
+                    continue
+                spec = _save_column(staging, f"{table}.{i}", df[name])
+                spec["name"] = str(name)
+                columns.append(spec)
+            manifest["tables"][table] = {"rows": len(df), "columns": columns}
+
+        item_costs = state.get("item_costs")
+        if item_costs is not None:
+            manifest["item_costs"] = {
+                "names": _save_column(staging, "item_costs.names", list(item_costs.keys())),
+                "costs": _save_column(staging, "item_costs.costs", np.array(list(item_costs.values()), dtype=np.float64)),
+            }
+
+        results = state.get("results")
+        if results is not None:
+            items = [item for brand_items in results.values() for item in brand_items]
+            manifest["results"] = {
+                "rows": len(items),
+                "columns": {column: _save_column(staging, f"results.{column}", [item.get(field) for item in items]) for field, column in RESULT_FIELDS},
+            }
+
+        with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        final = os.path.join(path, f"v{version:06d}")
+        os.rename(staging, final)
+        pointer = os.path.join(path, f"CURRENT.{os.getpid()}.tmp")
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(f"v{version:06d}")
+        os.replace(pointer, os.path.join(path, "CURRENT"))
+
+        # Files of removed versions stay readable to processes that mapped them
+        for old in _versions(path)[:-KEEP_SNAPSHOTS]:
+            shutil.rmtree(os.path.join(path, f"v{old:06d}"), ignore_errors=True)
+
+    return version
+
+class SnapshotWriter:
+    """
+    Save snapshots in a background thread, off the request path.
+
+    Only the latest submitted state is kept: states submitted while a save
+    runs replace each other, and the newest is saved next. Tables unchanged
+    since the last save are linked rather than written again.
+    """
+    def __init__(self, path: str = SNAPSHOT_DIR):
+        self.path = path
+        self._saved = None  # {"version": n, "tables": {table: DataFrame}} of the last save
+        self._pending = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, state: dict):
+        """Queue state (as for save_snapshot) to be saved."""
+        with self._lock:
+            self._pending = state
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                state, self._pending = self._pending, None
+                if state is None:
+                    self._thread = None
+                    return
+            try:
+                version = save_snapshot(state, self.path, self._saved)
+                self._saved = {"version": version, "tables": {table: state.get(table) for table in TABLES}}
+                print(f"Saved model snapshot v{version}")
+            except OSError as e:
+                print(f"Warning: could not save model snapshot: {e}")
+
+    def flush(self):
+        """Wait until every submitted state is saved."""
+        while True:
+            with self._lock:
+                thread = self._thread
+            if thread is None:
+                return
+            thread.join()
+
+def load_snapshot(path: str = SNAPSHOT_DIR) -> dict:
+    """
+    Load the current snapshot, memory-mapping its column files.
+
+    Returns:
+        dict: "costings", "costings_all", "recipes", "menu", "variants" DataFrames (or None),
+        "item_costs", "results", "summary", "version" and "created";
+        None when there is no snapshot
+    """
+    current = os.path.join(path, "CURRENT")
+    if not os.path.exists(current):
+        return None
+    with open(current, encoding="utf-8") as f:
+        directory = os.path.join(path, f.read().strip())
+    manifest = _read_manifest(directory)
+
+    state = {"version": manifest["version"], "created": manifest["created"], "summary": manifest.get("summary")}
+
+    for table in TABLES:
+        # Snapshots from before a table existed just lack it
+        spec = manifest["tables"].get(table)
+        if spec is None:
+            state[table] = None
+            continue
+        # copy=False keeps the mapped number columns as they are
+        state[table] = pd.DataFrame(
+            {column["name"]: _load_column(directory, column) for column in spec["columns"]},
+            index=pd.RangeIndex(spec["rows"]),
+            copy=False,
+        )
+        if table == "recipes" and "Ingredients (qty+unit)" in state[table].columns:
+            state[table][RECIPE_LINES] = [parse_recipe_lines(value) for value in state[table]["Ingredients (qty+unit)"]]
+
+    state["item_costs"] = None
+    if "item_costs" in manifest:
+        names = _load_column(directory, manifest["item_costs"]["names"])
+        costs = _load_column(directory, manifest["item_costs"]["costs"])
+        state["item_costs"] = dict(zip(names.tolist(), costs.tolist()))
+
+    state["results"] = None
+    if "results" in manifest:
+        columns = {column: _load_column(directory, spec).tolist() for column, spec in manifest["results"]["columns"].items()}
+        brand_groups = {}
+        for row in range(manifest["results"]["rows"]):
+            item = {field: columns[column][row] for field, column in RESULT_FIELDS}
+            brand_groups.setdefault(item["Brand"], []).append(item)
+        state["results"] = brand_groups
+
+    return state
@@ -0,0 +1,155 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Default sourcing: "cheapest" (lowest normalized unit cost) or "contract"
+# (the preferred supplier's price, cheapest where no preferred supplier lists it)
+SOURCING_POLICY = os.environ.get("FOOD_COST_SOURCING_POLICY", "cheapest").lower()
+
+# Preferred (contract) suppliers, highest priority first
+PREFERRED_SUPPLIERS = [name.strip() for name in os.environ.get("FOOD_COST_PREFERRED_SUPPLIERS", "").split(",") if name.strip()]
+
+POLICIES = ["cheapest", "contract"]
+
+# Column names accepted as the supplier of a costings row
+SUPPLIER_COLUMNS = ["supplier", "vendor", "supplier name", "wholesaler"]
+
+# Unit -> (dimension, size in the dimension's base unit: g, ml or each)
+UNIT_FACTORS = {
+    "mg": ("mass", 0.001), "g": ("mass", 1.0), "gram": ("mass", 1.0), "grams": ("mass", 1.0),
+    "kg": ("mass", 1000.0), "kilo": ("mass", 1000.0), "kilos": ("mass", 1000.0),
+    "oz": ("mass", 28.3495), "lb": ("mass", 453.592), "lbs": ("mass", 453.592),
+    "ml": ("volume", 1.0), "cl": ("volume", 10.0), "l": ("volume", 1000.0),
+    "liter": ("volume", 1000.0), "litre": ("volume", 1000.0), "liters": ("volume", 1000.0), "litres": ("volume", 1000.0),
+    "each": ("count", 1.0), "ea": ("count", 1.0), "unit": ("count", 1.0), "units": ("count", 1.0),
+    "pc": ("count", 1.0), "pcs": ("count", 1.0), "piece": ("count", 1.0), "pieces": ("count", 1.0),
+}
+
+def supplier_from_filename(filename: str) -> str:
+    """
+    Supplier name implied by an upload's file name:
+    "Bidfood - Product list.xlsx [Dairy]" becomes "Bidfood".
+    """
+    name = os.path.basename(filename.split(" [")[0])
+    name = os.path.splitext(name)[0]
+    return name.split(" - ")[0].strip() or name
+
+def tag_supplier(cost_df: pd.DataFrame, filename: str) -> pd.DataFrame:
+    """
+    Give parsed costings a "Supplier" column: the file's own supplier
+    column when it has one, otherwise the name from supplier_from_filename.
+    """
+    for col in cost_df.columns:
+        if str(col).strip().lower() in SUPPLIER_COLUMNS:
+            supplier = cost_df[col].astype(str).str.strip().where(cost_df[col].notna())
+            return cost_df.assign(Supplier=supplier.fillna(supplier_from_filename(filename)))
+    return cost_df.assign(Supplier=supplier_from_filename(filename))
+
+def unit_factors(units: pd.Series) -> tuple:
+    """
+    Dimension and base-unit size of each costings unit.
+
+    Unknown units ("slices", "tray") are their own dimension, so they only
+    compare with rows using the same unit.
+
+    Returns:
+        tuple: (dimension array, factor array)
+    """
+    names = units.fillna("").astype(str).str.strip().str.lower()
+    codes, uniques = pd.factorize(names)
+    known = [UNIT_FACTORS.get(unit, (unit, 1.0)) for unit in uniques]
+    dimensions = np.array([dimension for dimension, _ in known] or [""], dtype=object)
+    factors = np.array([factor for _, factor in known] or [1.0], dtype=float)
+    return dimensions[codes], factors[codes]
+
+def resolve_sources(cost_df: pd.DataFrame, policy: str = SOURCING_POLICY, preferred: list = None, tolerance_pct: float = 0.0) -> pd.DataFrame:
+    """
+    Pick one costings row per ingredient from several suppliers' lists.
+
+    Each ingredient's reference row is its highest-priority preferred
+    supplier's row, or its first listed row. Under "cheapest" the row with
+    the lowest cost per g / ml / each wins among rows of the reference
+    row's dimension; preferred suppliers win while they are within
+    tolerance_pct of the cheapest. Under "contract" the preferred
+    supplier's row wins, and ingredients no preferred supplier lists fall
+    back to the cheapest row as above. The winning row's pack size and
+    unit cost are expressed in the reference row's unit, so recipe
+    quantities keep their meaning.
+
+    Args:
+        cost_df: Parsed costings from every supplier (with a "Supplier" column)
+        policy: "cheapest" or "contract"
+        preferred: Preferred supplier names, highest priority first
+        tolerance_pct: Price premium accepted for a preferred supplier
+
+    Returns:
+        pd.DataFrame: One row per Ingredient_norm, in first-listed order
+
+    Raises:
+        ValueError: If the policy is unknown
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown sourcing policy {policy!r}; use one of {POLICIES}")
+    df = cost_df.reset_index(drop=True)
+    if df.empty:
+        return df
+    key = df["Ingredient_norm"]
+    units = df["Unit"] if "Unit" in df.columns else pd.Series("", index=df.index)
+    dimensions, factors = unit_factors(units)
+    base_cost = df["UnitCost"].to_numpy(dtype=float) / factors
+
+    priority = {name.strip().lower(): rank for rank, name in enumerate(preferred or [])}
+    suppliers = df["Supplier"] if "Supplier" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    rank = suppliers.astype(str).str.strip().str.lower().map(priority).where(suppliers.notna())
+    is_preferred = rank.notna().to_numpy()
+
+    # Reference row per ingredient: best-ranked preferred supplier, else first listed
+    order = pd.DataFrame({"key": key, "rank": rank.fillna(np.inf)}).sort_values(["rank"], kind="stable")
+    reference = order.index.to_series().groupby(order["key"].to_numpy(), sort=False).first()
+    ref_pos = key.map(reference).to_numpy()
+
+    score = np.where(dimensions == dimensions[ref_pos], base_cost, np.inf)
+    score = np.where(is_preferred, score * (1 - tolerance_pct / 100), score)
+    score = np.where(np.isnan(score), np.inf, score)
+    winners = pd.Series(score, index=df.index).groupby(key.to_numpy(), sort=False).idxmin()
+    if policy == "contract":
+        # Contract rows where a preferred supplier lists the ingredient, else the cheapest
+        contracted = pd.Series(is_preferred, index=df.index).groupby(key.to_numpy(), sort=False).any()
+        winners = reference.where(contracted, winners)
+
+    # First-listed order, as the costings were uploaded
+    winners = winners.reindex(key.unique())
+    win_pos = winners.to_numpy()
+    result = df.loc[win_pos].reset_index(drop=True)
+
+    # Winners in another unit of the same dimension are converted to the reference unit
+    ref_of_winner = ref_pos[win_pos]
+    convert = factors[win_pos] != factors[ref_of_winner]
+    if convert.any():
+        scale = factors[win_pos][convert] / factors[ref_of_winner][convert]
+        result.loc[convert, "Pack Size"] = result.loc[convert, "Pack Size"].to_numpy() * scale
+        result.loc[convert, "UnitCost"] = result.loc[convert, "UnitCost"].to_numpy() / scale
+        if "Unit" in result.columns:
+            result.loc[convert, "Unit"] = units.to_numpy()[ref_of_winner][convert]
+    return result
+
+def supplier_choices(cost_df: pd.DataFrame, preferred: list = None, tolerance_pct: float = 0.0) -> pd.DataFrame:
+    """
+    Contract and cheapest supplier and unit cost for every ingredient listed
+    by more than one row, with the saving of switching.
+    """
+    listed = cost_df["Ingredient_norm"].value_counts()
+    multi = cost_df[cost_df["Ingredient_norm"].isin(listed.index[listed > 1])]
+    if multi.empty:
+        return pd.DataFrame(columns=["Ingredient", "Contract Supplier", "Contract Unit Cost", "Cheapest Supplier", "Cheapest Unit Cost", "Saving %"])
+    contract = resolve_sources(multi, "contract", preferred)
+    cheapest = resolve_sources(multi, "cheapest", preferred, tolerance_pct)
+    saving = (1 - cheapest["UnitCost"] / contract["UnitCost"]) * 100
+    return pd.DataFrame({
+        "Ingredient": contract["Ingredient"],
+        "Contract Supplier": contract["Supplier"],
+        "Contract Unit Cost": contract["UnitCost"],
+        "Cheapest Supplier": cheapest["Supplier"],
+        "Cheapest Unit Cost": cheapest["UnitCost"],
+        "Saving %": saving.where(np.isfinite(saving), 0.0),
+    })
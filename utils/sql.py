@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Most rows returned by one query, and seconds before a query is interrupted
+SQL_MAX_ROWS = int(os.environ.get("FOOD_COST_SQL_MAX_ROWS", "10000"))
+SQL_TIMEOUT = float(os.environ.get("FOOD_COST_SQL_TIMEOUT", "10"))
+
+class QueryTimeoutError(Exception):
+    """Raised when a query runs longer than its timeout."""
+
+def results_frame(brand_groups: dict) -> pd.DataFrame:
+    """Result records as one DataFrame, in brand order."""
+    return pd.DataFrame.from_records(
+        [item for items in brand_groups.values() for item in items],
+        columns=["Brand", "Menu Item", "Category", "Food Cost (£)", "Selling Price (£)", "GP £", "GP %", "Notes"],
+    )
+
+class SQLCatalog:
+    """
+    Read-only DuckDB view of the stored tables.
+
+    DataFrames are registered, not copied: DuckDB scans the pandas columns
+    in place. The connection has file and network access disabled and its
+    configuration locked, and only single SELECT (or WITH ... SELECT)
+    statements are run, so queries cannot read files, attach databases or
+    change settings. Queries run one at a time; a timer interrupts any that
+    outlive their timeout.
+
+    Args:
+        tables: {table name: DataFrame}; None values are skipped
+    """
+    def __init__(self, tables: dict):
+        if duckdb is None:
+            raise RuntimeError("SQL queries need duckdb (pip install duckdb)")
+        self.con = duckdb.connect(config={"enable_external_access": False})
+        self.con.execute("SET lock_configuration = true")
+        self.tables = {}
+        for name, df in tables.items():
+            if df is not None:
+                self.con.register(name, df)
+                self.tables[name] = df
+        self._lock = threading.Lock()
+
+    def schema(self) -> dict:
+        """{table: {"rows": n, "columns": {name: dtype}}} of the registered tables."""
+        return {
+            name: {"rows": len(df), "columns": {str(col): str(dtype) for col, dtype in df.dtypes.items()}}
+            for name, df in self.tables.items()
+        }
+
+    def query(self, sql: str, max_rows: int = SQL_MAX_ROWS, timeout: float = SQL_TIMEOUT) -> dict:
+        """
+        Run one read-only query.
+
+        Returns:
+            dict: "columns", "rows" (at most max_rows), "row_count",
+            "truncated" and "elapsed_ms"
+
+        Raises:
+            ValueError: If the text is not a single SELECT statement, or fails
+            QueryTimeoutError: If the query ran longer than timeout seconds
+        """
+        try:
+            statements = duckdb.extract_statements(sql)
+        except duckdb.Error as e:
+            raise ValueError(str(e))
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            raise ValueError("Only a single SELECT (or WITH ... SELECT) statement is allowed")
+
+        with self._lock:
+            timer = threading.Timer(timeout, self.con.interrupt)
+            start = time.perf_counter()
+            timer.start()
+            try:
+                cursor = self.con.execute(sql)
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchmany(max_rows + 1)
+            except duckdb.InterruptException:
+                raise QueryTimeoutError(f"Query stopped after the {timeout:g}s limit")
+            except duckdb.Error as e:
+                raise ValueError(str(e))
+            finally:
+                timer.cancel()
+            elapsed = time.perf_counter() - start
+
+        truncated = len(rows) > max_rows
+        rows = [list(row) for row in rows[:max_rows]]
+        return {
+            "columns": columns,
+            "rows": rows,
+            "row_count": len(rows),
+            "truncated": truncated,
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }
+
+    def close(self):
+        self.con.close()
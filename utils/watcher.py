@@ -0,0 +1,262 @@
+import os
+import hashlib
+import threading
+import time
+
+# Folder whose input files are watched and costed as they change (off when empty)
+WATCH_DIR = os.environ.get("FOOD_COST_WATCH_DIR", "")
+
+# Seconds between scans, and quiet seconds after the last change before processing
+WATCH_INTERVAL = float(os.environ.get("FOOD_COST_WATCH_INTERVAL", "2"))
+WATCH_DEBOUNCE = float(os.environ.get("FOOD_COST_WATCH_DEBOUNCE", "1"))
+
+# Extensions read as input files
+INPUT_EXTENSIONS = (".csv", ".xlsx", ".xlsm", ".xls")
+
+TABLE_TYPES = ["costings", "recipes", "menu", "variants"]
+
+def file_digest(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+class FolderWatcher:
+    """
+    Poll a directory tree for input files that were added, changed or removed.
+
+    A scan only stats files; a file whose modification time or size moved is
+    read and hashed, and counts as changed only if its content did (saving
+    a file unchanged does nothing). Changes are held back until no file has
+    changed for `debounce` seconds, so a burst of writes (a copy, an editor
+    saving twice, several files dropped together) is processed once.
+    """
+    def __init__(self, directory: str, interval: float = WATCH_INTERVAL, debounce: float = WATCH_DEBOUNCE, exclude: str = None):
+        self.directory = directory
+        self.exclude = os.path.abspath(exclude) if exclude else None
+        self.interval = interval
+        self.debounce = debounce
+        self.files = {}    # path -> (mtime_ns, size, digest) as last processed
+        self.pending = {}  # path -> (mtime_ns, size), or None when removed
+        self.last_change = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _scan(self) -> dict:
+        found = {}
+        for root, dirs, names in os.walk(self.directory):
+            # Hidden folders and the output folder (exclude) are not inputs
+            dirs[:] = [d for d in dirs if not d.startswith(".") and os.path.abspath(os.path.join(root, d)) != self.exclude]
+            for name in names:
+                # Skip hidden files and Office lock files
+                if name.startswith((".", "~$")) or not name.lower().endswith(INPUT_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def poll(self, now: float = None):
+        """
+        Scan once.
+
+        Returns:
+            tuple: ({path: content} of changed files, [removed paths]) once
+            the folder has been quiet for `debounce` seconds after a change,
+            otherwise None
+        """
+        now = time.monotonic() if now is None else now
+        stats = self._scan()
+        for path, stat in stats.items():
+            known = self.files.get(path)
+            if (known is None or known[:2] != stat) and self.pending.get(path) != stat:
+                self.pending[path] = stat
+                self.last_change = now
+        for path in set(self.files) | set(self.pending):
+            if path not in stats and self.pending.get(path, ()) is not None:
+                if path in self.files:
+                    self.pending[path] = None
+                    self.last_change = now
+                else:
+                    # Appeared and disappeared between two flushes
+                    del self.pending[path]
+
+        if not self.pending or now - self.last_change < self.debounce:
+            return None
+
+        changed, removed = {}, []
+        for path, stat in self.pending.items():
+            if stat is None:
+                removed.append(path)
+                del self.files[path]
+                continue
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+            except OSError:
+                continue
+            digest = file_digest(content)
+            if path in self.files and self.files[path][2] == digest:
+                self.files[path] = (*stat, digest)
+                continue
+            self.files[path] = (*stat, digest)
+            changed[path] = content
+        self.pending = {}
+        return (changed, sorted(removed)) if changed or removed else None
+
+    def run(self, callback):
+        """Poll until stop(), calling callback(changed, removed) for every batch."""
+        while not self._stop.is_set():
+            batch = self.poll()
+            if batch:
+                try:
+                    callback(*batch)
+                except Exception as e:
+                    print(f"Watch folder update failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self, callback):
+        """Poll in a background thread."""
+        self._thread = threading.Thread(target=self.run, args=(callback,), name="folder-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+class WatchedModel:
+    """
+    Inputs and results kept up to date from the files of a watched folder.
+
+    Every file's parsed tables are kept, so a change re-reads and re-parses
+    only the changed files; tables are then combined by type (costings files
+    are suppliers' lists; recipes, menus and variants files are added
+    together, e.g. one per brand). Results are updated as narrowly as the
+    change allows:
+
+    - only costings changed: the items that can use an ingredient whose
+      resolved price changed (as a price patch)
+    - only recipes changed: the brands with recipe rows in the changed files,
+      plus items elsewhere using a changed item or batch (meal deals,
+      variants, other brands' dishes using a batch)
+    - otherwise (menus, variants, the first load): everything
+
+    Files are read under their path relative to `root`, so the folders
+    above it do not steer type detection or name suppliers.
+    """
+    def __init__(self, root: str = None):
+        self.root = root
+        self.tables = {}  # path -> [(file_type, parsed DataFrame)]
+        self.data = {"costings": None, "costings_all": None, "recipes": None, "menu": None, "variants": None}
+        self.results = None
+        self.item_costs = None
+        self.rollup = None
+
+    def _combine(self, sourcing: dict) -> dict:
+        import pandas as pd
+        from utils.sourcing import resolve_sources
+
+        frames = {}
+        for path in sorted(self.tables):
+            for file_type, df in self.tables[path]:
+                frames.setdefault(file_type, []).append(df)
+        data = {file_type: pd.concat(frames[file_type], ignore_index=True) if file_type in frames else None for file_type in TABLE_TYPES}
+        data["costings_all"] = data["costings"]
+        if data["costings"] is not None:
+            data["costings"] = resolve_sources(data["costings"], **(sourcing or {}))
+        return data
+
+    def update(self, changed: dict, removed: list, aliases: dict = None, sourcing: dict = None) -> dict:
+        """
+        Apply one batch of file changes from FolderWatcher.poll.
+
+        Args:
+            changed: {path: content} of added or changed files
+            removed: Paths of removed files
+            aliases: Stored alias lookup
+            sourcing: resolve_sources options
+
+        Returns:
+            dict: files, removed, types touched, "mode" (full, costings,
+            brands, or none when there is nothing new to publish), records
+            recalculated, and per-file errors
+        """
+        from utils.pipeline import parse_file, missing_data_error
+        from utils.calculator import calculate_gp, is_batch_recipe
+        from utils.price_updates import changed_ingredients, recalculate_dirty, dirty_menu_items, splice_results
+        from utils.limits import UploadTooLargeError
+        from utils.rollups import GPRollup
+
+        summary = {"files": sorted(changed), "removed": list(removed), "types": [], "mode": "none", "recalculated": 0, "errors": {}}
+        touched = {}
+        for path in removed:
+            touched[path] = self.tables.pop(path, [])
+        for path, content in changed.items():
+            try:
+                name = os.path.relpath(path, self.root) if self.root else path
+                tables = [(file_type, df) for _, file_type, df in parse_file(name, content)]
+            except (ValueError, UploadTooLargeError) as e:
+                # A half-written or broken file keeps its last good tables
+                summary["errors"][path] = str(e)
+                continue
+            touched[path] = self.tables.get(path, []) + tables
+            self.tables[path] = tables
+        types = {file_type for tables in touched.values() for file_type, _ in tables}
+        summary["types"] = sorted(types)
+        if not types:
+            return summary
+
+        old = self.data
+        self.data = data = self._combine(sourcing)
+        if missing_data_error(data):
+            self.results = self.item_costs = self.rollup = None
+            summary["errors"]["inputs"] = missing_data_error(data)
+            return summary
+
+        if self.results is not None and types == {"costings"}:
+            changed_names = changed_ingredients(old["costings"], data["costings"])
+            # The published item costs are never written to
+            item_costs = dict(self.item_costs)
+            results, dirty, summary["recalculated"] = recalculate_dirty(
+                self.results, item_costs, data["costings"], data["recipes"], data["menu"], data["variants"], aliases, changed_names)
+            if results is not None:
+                self.results, self.rollup = results, None
+            # The costings changed even when no result did
+            self.item_costs = item_costs
+            summary["mode"] = "costings"
+            return summary
+
+        if self.results is not None and types == {"recipes"}:
+            touched_recipes = [df for tables in touched.values() for file_type, df in tables if file_type == "recipes"]
+            brands = {str(brand) for df in touched_recipes for brand in df["Brand"].unique()}
+            # Items elsewhere that use a changed item or batch (batches, meal
+            # deals, variants) depend on it like on a repriced ingredient
+            changed_names = {str(name).lower().strip() for df in touched_recipes for name in df["Menu Item"]}
+            dirty, dirty_variants = dirty_menu_items(data["recipes"], data["variants"], changed_names, aliases)
+            recipes = data["recipes"]
+            names = recipes["Menu Item"].astype(str).str.lower()
+            recipes = recipes[recipes["Brand"].astype(str).isin(brands) | names.isin(dirty) | is_batch_recipe(recipes)]
+            variants = data["variants"]
+            if variants is not None:
+                bases = set(recipes["Menu Item"].astype(str).str.lower())
+                variants = variants[variants["Base Item"].astype(str).str.lower().str.strip().isin(bases) | variants["Menu Item"].astype(str).str.lower().isin(dirty_variants)]
+            item_costs = dict(self.item_costs)
+            partial = calculate_gp(data["costings"], recipes, data["menu"], aliases, variants, known_costs=item_costs)
+            # Affected brands are replaced whole, so removed items disappear;
+            # dependents in other brands are spliced in place
+            results = {brand: partial.get(brand, []) if brand in brands else items for brand, items in self.results.items()}
+            results = splice_results(results, {brand: items for brand, items in partial.items() if brand not in brands})
+            results.update({brand: items for brand, items in partial.items() if brand in brands and brand not in results})
+            self.results = {brand: items for brand, items in results.items() if items}
+            self.item_costs, self.rollup = item_costs, None
+            summary["mode"] = "brands"
+            summary["recalculated"] = sum(len(items) for items in partial.values())
+            return summary
+
+        self.item_costs = {}
+        self.rollup = GPRollup()
+        self.results = calculate_gp(data["costings"], data["recipes"], data["menu"], aliases, data["variants"], self.rollup, self.item_costs)
+        summary["mode"] = "full"
+        summary["recalculated"] = sum(len(items) for items in self.results.values())
+        return summary